@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_JOURNAL_DIR = Path.home() / ".cache" / "plantuml-editor" / "journal"
+LOCK_NAME = "instance.lock"
+
+
+def _try_lock(f) -> bool:
+    """Lock esclusivo non bloccante su un file aperto; il sistema lo rilascia quando il processo termina"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _instance_alive(folder: Path) -> bool:
+    """True se l'istanza proprietaria della cartella del journal tiene ancora il suo lock"""
+    try:
+        with open(folder / LOCK_NAME, "r+b") as f:
+            return not _try_lock(f)
+    except FileNotFoundError:
+        return False  # istanza terminata prima di creare il lock
+    except OSError:
+        return True   # nel dubbio non si tocca
+
+
+class AutosaveJournal:
+    """Copia periodica dei documenti non salvati, per recuperarli dopo un crash.
+
+    Durante l'editing non si fa nulla: a ogni checkpoint() si confronta la
+    revisione di ogni documento modificato con quella già salvata nel
+    journal e solo i documenti cambiati vengono copiati, scritti in
+    background dal FileWriter. Ogni documento ha un file nella cartella
+    del journal (nome = hash del percorso): il recupero legge solo quella
+    cartella, senza toccare il progetto. La voce di un documento viene
+    eliminata quando il documento viene salvato o chiuso senza salvare.
+
+    Ogni istanza dell'editor scrive in una sua sottocartella (PID e ora di
+    avvio) su cui tiene un lock: entries() propone solo le voci di istanze
+    terminate, mai le modifiche in corso in un'altra finestra.
+    """
+    VERSION = 1
+
+    def __init__(self, writer, directory=None):
+        self.writer = writer
+        self.root = Path(directory or DEFAULT_JOURNAL_DIR)
+        self.directory = self.root / f"{os.getpid()}-{time.time_ns()}"
+        self._revisions = {}  # percorso -> revisione del documento già nel journal
+        self._lock_file = None  # aperto (e bloccato) con la cartella, fino a close()
+
+    def _entry_path(self, path: str) -> str:
+        name = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:20]
+        return str(self.directory / f"{name}.json")
+
+    # =========================
+    # SCRITTURA
+    # =========================
+    def checkpoint(self, editors):
+        """Mette nel journal i documenti modificati dall'ultimo checkpoint"""
+        for editor in editors:
+            path = editor.current_file
+            if not path or editor.loading:
+                continue
+            document = editor.document()
+            if not document.isModified():
+                if path in self._revisions:
+                    self.discard(path)
+                continue
+            revision = document.revision()
+            if self._revisions.get(path) == revision:
+                continue
+            self._revisions[path] = revision
+            entry = {
+                "version": self.VERSION,
+                "path": os.path.abspath(path),
+                "time": time.time(),
+                "disk": self._stamp(path),  # file su disco a cui si riferiscono le modifiche
+                "text": editor.toPlainText(),
+            }
+            self._claim_directory()
+            self.writer.write(self._entry_path(path), json.dumps(entry).encode("utf-8"))
+
+    def discard(self, path: str):
+        """Elimina la voce di `path` (documento salvato o modifiche scartate)"""
+        self._revisions.pop(path, None)
+        self.writer.remove(self._entry_path(path))
+
+    def _claim_directory(self):
+        if self._lock_file is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.directory / LOCK_NAME, "a+b")
+        _try_lock(self._lock_file)  # cartella nuova, nessun altro la usa
+
+    def close(self):
+        """Rilascia il lock (chiusura dell'editor): le voci rimaste diventano recuperabili"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @staticmethod
+    def _stamp(path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    # =========================
+    # RECUPERO
+    # =========================
+    def entries(self) -> list:
+        """Voci rimaste nel journal da istanze terminate (es. dopo un crash), dalla più recente.
+
+        Ogni voce ha "path", "time", "text", "file" (la voce su disco, per
+        discard_entry e adopt) e "disk_changed": True se il file su disco è
+        cambiato dopo l'ultima copia nel journal. Le cartelle vuote di
+        istanze terminate vengono rimosse.
+        """
+        entries = []
+        try:
+            folders = [entry for entry in os.scandir(self.root) if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return entries
+        # Le voci direttamente in root vengono dalle versioni con una sola cartella per tutti
+        for folder in [self.root] + [Path(entry.path) for entry in folders]:
+            if folder == self.directory or (folder != self.root and _instance_alive(folder)):
+                continue
+            found = self._read_folder(folder)
+            if not found and folder != self.root:
+                self._remove_folder(folder)
+            entries.extend(found)
+        entries.sort(key=lambda entry: entry["time"], reverse=True)
+        return entries
+
+    def _read_folder(self, folder: Path) -> list:
+        entries = []
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(folder / name, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(entry, dict) or entry.get("version") != self.VERSION:
+                continue
+            disk = entry.get("disk")
+            entry["disk_changed"] = disk is not None and self._stamp(entry["path"]) != disk
+            entry["file"] = str(folder / name)
+            entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _remove_folder(folder: Path):
+        try:
+            os.remove(folder / LOCK_NAME)
+        except OSError:
+            pass
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass  # contiene ancora qualcosa: resta per il prossimo avvio
+
+    def discard_entry(self, entry: dict):
+        """Elimina una voce di entries() (modifiche recuperabili rifiutate)"""
+        self.writer.remove(entry["file"])
+
+    def adopt(self, entry: dict):
+        """Sposta nella cartella di questa istanza una voce di entries() recuperata nell'editor"""
+        self._claim_directory()
+        try:
+            os.replace(entry["file"], self._entry_path(entry["path"]))
+        except OSError as e:
+            print("Errore spostando la voce del journal:", e)
+            return
+        # Se il documento torna non modificato, il prossimo checkpoint elimina la voce
+        self._revisions[entry["path"]] = None
@@ -0,0 +1,148 @@
+import time
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class BackgroundRenderQueue(QObject):
+    """Pre-render dei tab non attivi mentre l'utente non scrive.
+
+    Il documento attivo passa sempre per il render normale; qui finiscono
+    gli altri editor aperti, renderizzati nella cache con priorità bassa
+    quando l'editor è inattivo da `idle_ms`. Prima i file appena aperti (o
+    con un !include cambiato), poi gli altri tab dal più usato di recente.
+
+    Limiti: al più `concurrency` documenti alla volta (sempre almeno una JVM
+    resta libera per il documento attivo) e dopo ogni render una pausa
+    tale che il lavoro in background occupi al più la frazione `duty` del
+    tempo. A ogni modifica (pause()) i render in background vengono
+    interrotti: quanto già renderizzato resta in cache e il resto riprende
+    alla prossima pausa di scrittura.
+    """
+    OPENED = 0  # priorità: file appena aperto o da rigenerare
+    TAB = 1     # priorità: altri tab aperti
+
+    DEFAULTS = {
+        "enabled": 1,      # 0 = nessun pre-render
+        "idle_ms": 1000,   # inattività dopo cui si parte
+        "concurrency": 1,  # documenti renderizzati insieme in background
+        "duty": 0.5,       # frazione massima del tempo spesa a renderizzare in background
+    }
+
+    def __init__(self, renderer, settings: dict = None, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.settings = dict(self.DEFAULTS)
+        self.current = None
+        self._docs = {}     # id(documento) -> [documento, priorità, ultimo uso]
+        self._active = {}   # id(documento) -> (documento, inizio del render)
+        self._resume_at = 0.0
+        self.rendered = 0
+        self.interrupted = 0
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self._run)
+        renderer.render_finished.connect(self._on_finished)
+        self.configure(settings or {})
+
+    def configure(self, settings: dict):
+        """Applica le impostazioni del progetto (chiave "prerender" del file .tsp)"""
+        self.settings = dict(self.DEFAULTS)
+        for name, value in settings.items():
+            if name not in self.DEFAULTS:
+                continue
+            try:
+                self.settings[name] = float(value)
+            except (TypeError, ValueError):
+                print(f"Impostazione prerender non valida: {name}={value!r}")
+        self.settings["duty"] = min(1.0, max(0.05, self.settings["duty"]))
+        self.settings["concurrency"] = max(1, int(self.settings["concurrency"]))
+        if not self.settings["enabled"]:
+            self.pause()
+            self.idle_timer.stop()
+
+    # =========================
+    # DOCUMENTI
+    # =========================
+    def add(self, doc, priority: int = TAB):
+        """Mette `doc` in coda (la priorità più alta, cioè il numero più basso, resta)"""
+        entry = self._docs.get(id(doc))
+        if entry is None:
+            self._docs[id(doc)] = [doc, priority, time.monotonic()]
+        else:
+            entry[1] = min(entry[1], priority)
+        self._schedule()
+
+    def set_current(self, doc):
+        """`doc` diventa il documento attivo: esce dal background, il precedente torna in coda"""
+        previous, self.current = self.current, doc
+        if previous is not None and id(previous) in self._docs:
+            self._docs[id(previous)][2] = time.monotonic()
+        # Un render in background del nuovo documento attivo prosegue come render normale
+        self._active.pop(id(doc), None)
+        self._schedule()
+
+    def forget(self, doc):
+        self._docs.pop(id(doc), None)
+        self._active.pop(id(doc), None)
+        if self.current is doc:
+            self.current = None
+
+    # =========================
+    # ATTIVITÀ DELL'UTENTE
+    # =========================
+    def pause(self):
+        """L'utente sta scrivendo: interrompe il background e riparte dopo `idle_ms` di inattività"""
+        for doc, _ in list(self._active.values()):
+            self.renderer.cancel(doc)
+            self.interrupted += 1
+        self._active.clear()
+        self._schedule()
+
+    def _schedule(self):
+        if self.settings["enabled"]:
+            delay = self.settings["idle_ms"] / 1000
+            delay = max(delay, self._resume_at - time.monotonic())
+            self.idle_timer.start(int(delay * 1000))
+
+    def _run(self):
+        if not self.settings["enabled"]:
+            return
+        if self.current is not None and self.renderer.is_busy(self.current):
+            # Il documento attivo ha ancora un render in corso: prima quello
+            self._schedule()
+            return
+        # Almeno una JVM resta sempre libera per il documento attivo
+        limit = min(self.settings["concurrency"], max(1, self.renderer.processes - 1))
+        while len(self._active) < limit:
+            doc = self._next()
+            if doc is None:
+                return
+            self._active[id(doc)] = (doc, time.perf_counter())
+            self.renderer.refresh(doc.toPlainText(), doc, doc.document().revision())
+
+    def _needs_render(self, doc) -> bool:
+        return (doc is not self.current and not doc.loading and id(doc) not in self._active
+                and not doc.document().isEmpty() and self.renderer.needs_render(doc))
+
+    def _next(self):
+        candidates = [entry for entry in self._docs.values() if self._needs_render(entry[0])]
+        if not candidates:
+            return None
+        # Priorità più alta, poi il tab usato più di recente
+        return min(candidates, key=lambda entry: (entry[1], -entry[2]))[0]
+
+    def _on_finished(self, doc):
+        started = self._active.pop(id(doc), None)
+        if started is None:
+            return
+        entry = self._docs.get(id(doc))
+        if entry is not None:
+            entry[1] = self.TAB
+        self.rendered += 1
+        # Pausa proporzionale al render appena fatto: il background resta sotto `duty`
+        elapsed = time.perf_counter() - started[1]
+        duty = self.settings["duty"]
+        self._resume_at = time.monotonic() + elapsed * (1 - duty) / duty
+        delay = max(0.0, self._resume_at - time.monotonic())
+        self.idle_timer.start(int(delay * 1000))
@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.plantuml_process import (
+    PlantUMLProcessPool, PlantUMLError, PlantUMLCancelled, extract_blocks, jar_fingerprint, make_key
+)
+from app.plantuml_http import PlantUMLServerClient
+from app.project_manager import ProjectManager, find_puml_files
+from app.dependency_index import DependencyIndex, absolute_includes
+
+
+FORMATS = ("png", "svg", "pdf", "eps")
+
+
+def output_names(rel_path: str, count: int, fmt: str):
+    """Nomi dei file generati, come fa PlantUML: diagramma.png, diagramma_001.png, ..."""
+    base = os.path.splitext(rel_path)[0]
+    return [f"{base}.{fmt}"] + [f"{base}_{i:03d}.{fmt}" for i in range(1, count)]
+
+
+def write_atomic(path: str, data: bytes):
+    """Scrive in un file temporaneo e lo rinomina: chi legge l'output non vede mai un file a metà"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ExportResult:
+    """Esito dell'export di un singolo file"""
+    def __init__(self, rel_path: str, key: str = None, outputs=None, skipped=False, error=None, line=None,
+                 cancelled=False, path: str = None):
+        self.rel_path = rel_path
+        self.path = path  # percorso assoluto del sorgente
+        self.key = key
+        self.outputs = outputs or []  # [{"path", "size", "mtime_ns"}], percorsi relativi all'output
+        self.skipped = skipped
+        self.error = error
+        self.line = line
+        self.cancelled = cancelled
+
+
+class BatchExporter:
+    """Export headless dei diagrammi di un progetto, in parallelo e incrementale.
+
+    I file vengono renderizzati da un pool di JVM "calde" (una per job).
+    Un manifest accanto al .tsp ricorda hash del contenuto e file generati:
+    un file è saltato se l'hash non è cambiato e i suoi output sono ancora
+    quelli scritti l'ultima volta. L'hash comprende i file !include-ati,
+    così la modifica di uno stile condiviso rigenera solo chi lo usa.
+
+    cancel() può essere chiamato da un altro thread (es. la GUI): i file in
+    coda vengono saltati e i render in corso interrotti.
+
+    Con `server_url` i file vanno a un server di render (una connessione
+    keep-alive per job, i diagrammi di un file in pipeline) invece che a
+    JVM proprie; `server_start` lo avvia prima della prima connessione.
+    """
+
+    def __init__(self, project_dir: str, jar_path: str, fmt: str = "png", jobs: int = None,
+                 output_dir: str = None, manifest_path: str = None, force: bool = False, server_url: str = None,
+                 server_start=None):
+        self.project_dir = os.path.abspath(project_dir)
+        self.jar_path = jar_path
+        self.fmt = fmt
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        # Un percorso relativo è relativo alla cartella del progetto
+        self.output_dir = os.path.abspath(os.path.join(self.project_dir, output_dir or "export"))
+        self.manifest_path = manifest_path or os.path.join(self.project_dir, "export.manifest.json")
+        self.force = force
+        self.server_url = server_url
+        self.server_start = server_start
+        self.jar_version = f"server:{server_url}" if server_url else jar_fingerprint(jar_path)
+        self.manifest = {}
+        self.dependencies = DependencyIndex(self.project_dir)
+        self._built = set()  # file già nel grafo letto da affected(), per il run() successivo
+        self._cancel = None
+        self._pool = None
+
+    # =========================
+    # MANIFEST
+    # =========================
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.manifest = data.get(self.fmt, {}) if isinstance(data, dict) else {}
+        return data
+
+    def save_manifest(self, all_formats: dict):
+        all_formats[self.fmt] = self.manifest
+        write_atomic(self.manifest_path, json.dumps(all_formats, indent=1, sort_keys=True).encode("utf-8"))
+
+    def _is_up_to_date(self, entry: dict, key: str) -> bool:
+        if not entry or entry.get("key") != key:
+            return False
+        for output in entry.get("outputs", []):
+            try:
+                st = os.stat(os.path.join(self.output_dir, output["path"]))
+            except OSError:
+                return False
+            if st.st_size != output["size"] or st.st_mtime_ns != output["mtime_ns"]:
+                return False
+        return True
+
+    # =========================
+    # EXPORT
+    # =========================
+    def discover(self):
+        """File .puml del progetto (stessa ricerca dell'albero file), escluso l'output"""
+        return sorted(find_puml_files(self.project_dir, [self.output_dir]))
+
+    def affected(self, changed) -> list:
+        """Diagrammi del progetto da rigenerare quando cambiano i file `changed`"""
+        files = self.discover()
+        self.dependencies.build(files)
+        self._built = set(map(os.path.abspath, files))
+        targets = self.dependencies.affected(changed)
+        return [path for path in files if os.path.abspath(path) in targets]
+
+    def run(self, files=None, progress=None, cancel: threading.Event = None, texts: dict = None):
+        """Esporta `files` (default: tutto il progetto) e aggiorna il manifest.
+
+        `progress(result, done, total)` viene chiamato per ogni file completato,
+        dal thread del job; `cancel` interrompe i render in corso. Chi lo crea
+        prima di avviare l'export (es. la GUI) può annullare anche durante la
+        ricerca dei file: run() termina senza render e senza toccare il
+        manifest. `texts` (percorso -> testo) sostituisce il contenuto su
+        disco, es. per le modifiche non salvate degli editor aperti.
+        """
+        self._cancel = cancel = cancel or threading.Event()
+        all_formats = self.load_manifest()
+        full_export = files is None
+        files = self.discover() if full_export else list(files)
+        texts = texts or {}
+        # I file appena letti da affected() non si rileggono (export --changed)
+        built, self._built = self._built, set()
+        if not cancel.is_set():
+            self.dependencies.build(path for path in files if os.path.abspath(path) not in built)
+        if cancel.is_set():
+            return []
+        if self.server_url:
+            pool = PlantUMLServerClient(self.server_url, fmt=self.fmt, size=self.jobs, start=self.server_start)
+        else:
+            pool = PlantUMLProcessPool(self.jar_path, fmt=self.fmt, size=self.jobs, cwd=self.project_dir)
+        self._pool = pool
+        results = []
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [executor.submit(self._export_file, pool, path, cancel, texts.get(path))
+                           for path in files]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    result = future.result()
+                    results.append(result)
+                    if progress:
+                        progress(result, done, len(files))
+        finally:
+            self._pool = None
+            pool.close()
+
+        for result in results:
+            if result.cancelled:
+                continue  # manifest invariato: l'output precedente, se c'è, è ancora valido
+            if result.error is None and not result.skipped:
+                self.manifest[result.rel_path] = {"key": result.key, "outputs": result.outputs}
+            elif result.error is not None:
+                self.manifest.pop(result.rel_path, None)
+        if full_export:
+            # Export completo: dimentica i file che non esistono più
+            existing = {r.rel_path for r in results}
+            for rel_path in list(self.manifest):
+                if rel_path not in existing:
+                    del self.manifest[rel_path]
+        self.save_manifest(all_formats)
+        return results
+
+    def cancel(self):
+        """Annulla l'export in corso; sicuro da chiamare da qualunque thread"""
+        cancel, pool = self._cancel, self._pool
+        if cancel is None:
+            return
+        if pool is not None:
+            pool.cancel(cancel)  # imposta il token e uccide le JVM che stanno renderizzando
+        else:
+            cancel.set()
+
+    def _export_file(self, pool, path: str, cancel: threading.Event,
+                     text: str = None) -> ExportResult:
+        rel_path = os.path.relpath(path, self.project_dir)
+        if rel_path.startswith(os.pardir):
+            # File fuori dal progetto: l'output resta comunque dentro la cartella di output
+            rel_path = os.path.basename(path)
+        if cancel.is_set():
+            return ExportResult(rel_path, error="Export annullato", cancelled=True, path=path)
+        if text is None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                return ExportResult(rel_path, error=str(e), path=path)
+
+        options = {"format": self.fmt}
+        signature = self.dependencies.signature(path)
+        if signature:
+            options["includes"] = signature
+        key = make_key(text, options, self.jar_version)
+        previous = self.manifest.get(rel_path)
+        if not self.force and self._is_up_to_date(previous, key):
+            return ExportResult(rel_path, key, previous["outputs"], skipped=True, path=path)
+
+        if not extract_blocks(text):
+            return ExportResult(rel_path, key, error="Nessun blocco @startuml ... @enduml trovato", path=path)
+
+        try:
+            process = pool.acquire()
+        except PlantUMLError as e:
+            return ExportResult(rel_path, key, error=str(e), path=path)
+        try:
+            images = process.render_all(absolute_includes(text, path, self.project_dir), cancel)
+        except PlantUMLCancelled:
+            return ExportResult(rel_path, key, error="Export annullato", cancelled=True, path=path)
+        except PlantUMLError as e:
+            if cancel.is_set():
+                return ExportResult(rel_path, key, error="Export annullato", cancelled=True, path=path)
+            return ExportResult(rel_path, key, error=str(e), line=e.line, path=path)
+        finally:
+            pool.release(process)
+
+        outputs = []
+        try:
+            for name, data in zip(output_names(rel_path, len(images), self.fmt), images):
+                target = os.path.join(self.output_dir, name)
+                write_atomic(target, data)
+                st = os.stat(target)
+                outputs.append({"path": name, "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+        except OSError as e:
+            return ExportResult(rel_path, key, error=f"Scrittura non riuscita: {e}", path=path)
+
+        # Rimuove gli output in più di un export precedente (diagrammi eliminati dal file)
+        for old in (previous or {}).get("outputs", []):
+            if old["path"] not in {o["path"] for o in outputs}:
+                try:
+                    os.remove(os.path.join(self.output_dir, old["path"]))
+                except OSError:
+                    pass
+        return ExportResult(rel_path, key, outputs, path=path)
+
+
+def manifest_path(project) -> str:
+    """Manifest degli export di un progetto (ProjectManager aperto), accanto al .tsp"""
+    return os.path.splitext(project.project_file)[0] + ".export.json"
+
+
+# =========================
+# CLI
+# =========================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py export", description="Esporta tutti i diagrammi di un progetto")
+    parser.add_argument("project", help="file .tsp del progetto (o la sua cartella)")
+    parser.add_argument("-j", "--jobs", type=int, help="render in parallelo (JVM, default: un core ciascuna)")
+    parser.add_argument("-f", "--format", choices=FORMATS)
+    parser.add_argument("-o", "--output", help="cartella di output (default: <progetto>/export)")
+    parser.add_argument("--jar", default="tools/plantuml.jar", help="percorso di plantuml.jar")
+    parser.add_argument("--force", action="store_true", help="ignora il manifest e renderizza tutto")
+    parser.add_argument("--server", help='server di render (URL o "local"; default: "render_server" del .tsp)')
+    parser.add_argument("--changed", nargs="+", metavar="FILE",
+                        help="esporta solo i diagrammi che sono (o includono) questi file")
+    args = parser.parse_args(argv)
+
+    project = ProjectManager()
+    try:
+        if os.path.isdir(args.project):
+            project.open_project(args.project)
+        else:
+            project.open_project(os.path.dirname(os.path.abspath(args.project)), args.project)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Progetto non valido: {e}", file=sys.stderr)
+        return 2
+
+    # Le opzioni non indicate vengono dalla chiave "export" del .tsp (le stesse dell'export dalla GUI)
+    settings = project.get_setting("export", {})
+    output = os.path.abspath(args.output) if args.output else settings.get("output")
+    fmt = args.format or settings.get("format", "png")
+    if fmt not in FORMATS:
+        print(f"Formato di export non valido: {fmt}", file=sys.stderr)
+        return 2
+    from app.render_server import resolve_server
+    server_url = resolve_server(args.server or project.get_setting("render_server"), args.jar)
+    exporter = BatchExporter(project.project_dir, args.jar, fmt, args.jobs or settings.get("jobs"),
+                             output, manifest_path(project), args.force, server_url)
+
+    def progress(result, done, total):
+        if result.error:
+            where = f":{result.line}" if result.line else ""
+            print(f"[{done}/{total}] ERRORE {result.rel_path}{where}: {result.error}", file=sys.stderr)
+        elif not result.skipped:
+            print(f"[{done}/{total}] {result.rel_path}")
+
+    start = time.perf_counter()
+    files = exporter.affected(args.changed) if args.changed else None
+    results = exporter.run(files, progress=progress)
+    elapsed = time.perf_counter() - start
+
+    rendered = sum(1 for r in results if r.error is None and not r.skipped)
+    skipped = sum(1 for r in results if r.skipped)
+    failed = sum(1 for r in results if r.error)
+    print(f"{rendered} renderizzati, {skipped} invariati, {failed} errori in {elapsed:.2f} s")
+    return 1 if failed else 0
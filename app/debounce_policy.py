@@ -0,0 +1,57 @@
+class AdaptiveDebounce:
+    """Debounce adattivo per la live preview.
+
+    Per ogni documento mantiene una media mobile esponenziale dei tempi di
+    render; il ritardo è `factor * media`, limitato tra `min_ms` e `max_ms`.
+    Con factor = 1 un documento lento passa al massimo metà del tempo a
+    renderizzare mentre si scrive, quindi non satura un core.
+    """
+    DEFAULTS = {
+        "min_ms": 20,       # ritardo minimo (diagrammi piccoli: quasi immediato)
+        "max_ms": 5000,     # ritardo massimo (diagrammi enormi)
+        "factor": 1.0,      # ritardo = factor * tempo medio di render
+        "initial_ms": 150,  # ritardo per un documento mai renderizzato
+        "alpha": 0.3,       # peso dell'ultimo campione nella media mobile
+    }
+
+    def __init__(self, settings: dict = None):
+        self.settings = dict(self.DEFAULTS)
+        self._averages = {}  # id(documento) -> media mobile in ms
+        self.configure(settings or {})
+
+    def configure(self, settings: dict):
+        """Applica le impostazioni del progetto (chiave "debounce" del file .tsp)"""
+        self.settings = dict(self.DEFAULTS)
+        for name, value in settings.items():
+            if name not in self.DEFAULTS:
+                continue
+            try:
+                self.settings[name] = float(value)
+            except (TypeError, ValueError):
+                print(f"Impostazione debounce non valida: {name}={value!r}")
+        if self.settings["max_ms"] < self.settings["min_ms"]:
+            self.settings["max_ms"] = self.settings["min_ms"]
+        self.settings["alpha"] = min(1.0, max(0.01, self.settings["alpha"]))
+
+    def record(self, doc, elapsed_ms: float):
+        """Aggiorna la media con la durata di un render completato"""
+        previous = self._averages.get(id(doc))
+        if previous is None:
+            self._averages[id(doc)] = elapsed_ms
+        else:
+            alpha = self.settings["alpha"]
+            self._averages[id(doc)] = alpha * elapsed_ms + (1 - alpha) * previous
+
+    def average(self, doc):
+        return self._averages.get(id(doc))
+
+    def delay_for(self, doc) -> int:
+        average = self._averages.get(id(doc))
+        if average is None:
+            delay = self.settings["initial_ms"]
+        else:
+            delay = self.settings["factor"] * average
+        return int(min(self.settings["max_ms"], max(self.settings["min_ms"], delay)))
+
+    def forget(self, doc):
+        self._averages.pop(id(doc), None)
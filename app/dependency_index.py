@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import threading
+from collections import deque
+
+# !include, !include_many, !include_once, !includesub e !import con il percorso del file.
+# !includeurl e le librerie standard (<C4/C4_Container>) non sono file del progetto.
+INCLUDE_RE = re.compile(r"^[ \t]*!(?:include(?:_many|_once|sub)?|import)[ \t]+(.+?)[ \t]*$", re.MULTILINE)
+
+
+def parse_includes(text: str):
+    """Percorsi (così come scritti) dei file inclusi o importati da `text`"""
+    targets = []
+    for match in INCLUDE_RE.finditer(text):
+        target = match.group(1).strip().strip('"')
+        if not target or target.startswith("<") or "://" in target:
+            continue
+        # file.iuml!NOME (includesub) o file.iuml!2 (n-esimo diagramma)
+        target = target.split("!", 1)[0]
+        if target:
+            targets.append(target)
+    return targets
+
+
+def resolve_include(path: str, target: str, project_dir: str = None) -> str:
+    """Percorso assoluto di `target` incluso da `path`: relativo al file, poi alla cartella del progetto"""
+    candidate = os.path.join(os.path.dirname(os.path.abspath(path)), target)
+    if not os.path.exists(candidate) and project_dir:
+        in_project = os.path.join(project_dir, target)
+        if os.path.exists(in_project):
+            candidate = in_project
+    return os.path.abspath(candidate)
+
+
+def absolute_includes(text: str, path: str, project_dir: str = None) -> str:
+    """`text` con i percorsi relativi degli !include resi assoluti, risolti come nel grafo.
+
+    Una JVM -pipe risolve i percorsi relativi rispetto alla propria
+    cartella di lavoro (la stessa per tutti i file) e un server di render
+    rispetto alla sua: il testo inviato al render contiene quindi gli
+    stessi file che DependencyIndex segue e firma. Righe e numerazione
+    non cambiano, la chiave di cache resta quella del testo originale.
+    """
+    if not path or "!" not in text:
+        return text
+
+    def replace(match):
+        raw = match.group(1)
+        target = raw.strip().strip('"')
+        if not target or target.startswith("<") or "://" in target:
+            return match.group(0)
+        name, bang, suffix = target.partition("!")
+        if not name or os.path.isabs(name):
+            return match.group(0)
+        resolved = resolve_include(path, name, project_dir) + bang + suffix
+        if raw.startswith('"'):
+            resolved = f'"{resolved}"'
+        start, end = match.span(1)
+        line = match.group(0)
+        return line[:start - match.start()] + resolved + line[end - match.start():]
+
+    return INCLUDE_RE.sub(replace, text)
+
+
+class DependencyIndex:
+    """Grafo delle dipendenze !include / !includesub / !import del progetto.
+
+    Per ogni file si memorizzano i file che include direttamente e, al
+    contrario, chi lo include: dependents() restituisce tutti i diagrammi
+    (anche indiretti) da invalidare quando un file cambia. Il grafo si
+    costruisce in background con build() e si aggiorna file per file con
+    update_file() a ogni salvataggio. È thread-safe e non dipende da Qt.
+    """
+
+    def __init__(self, project_dir: str = None):
+        self.project_dir = os.path.abspath(project_dir) if project_dir else None
+        self._deps = {}      # file -> file inclusi direttamente
+        self._rdeps = {}     # file -> file che lo includono direttamente
+        self._lock = threading.Lock()
+
+    # =========================
+    # COSTRUZIONE
+    # =========================
+    def build(self, files):
+        """Indicizza `files` e, a cascata, i file che includono (es. .iuml condivisi)"""
+        for path in files:
+            self.update_file(path)
+
+    def update_file(self, path: str, text: str = None) -> bool:
+        """Rilegge le dipendenze di `path`; True se gli archi sono cambiati"""
+        path = os.path.abspath(path)
+        pending = deque([(path, text)])
+        changed = False
+        while pending:
+            current, current_text = pending.popleft()
+            deps = self._read_dependencies(current, current_text)
+            with self._lock:
+                old = self._deps.get(current)
+                if old == deps:
+                    continue
+                changed = True
+                self._deps[current] = deps
+                for dep in (old or frozenset()) - deps:
+                    self._rdeps.get(dep, set()).discard(current)
+                for dep in deps - (old or frozenset()):
+                    self._rdeps.setdefault(dep, set()).add(current)
+                new_files = [dep for dep in deps if dep not in self._deps]
+            pending.extend((dep, None) for dep in new_files)
+        return changed
+
+    def remove_file(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            for dep in self._deps.pop(path, frozenset()):
+                self._rdeps.get(dep, set()).discard(path)
+
+    def _read_dependencies(self, path: str, text: str = None) -> frozenset:
+        if text is None:
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                return frozenset()
+        return frozenset(self._resolve(path, target) for target in parse_includes(text))
+
+    def _resolve(self, path: str, target: str) -> str:
+        # Stessa risoluzione del testo inviato al render (absolute_includes)
+        return resolve_include(path, target, self.project_dir)
+
+    # =========================
+    # INTERROGAZIONI
+    # =========================
+    def dependencies(self, path: str) -> set:
+        """Tutti i file inclusi da `path`, direttamente o indirettamente"""
+        return self._walk(os.path.abspath(path), self._deps)
+
+    def dependents(self, path: str) -> set:
+        """Tutti i file che includono `path`, direttamente o indirettamente"""
+        return self._walk(os.path.abspath(path), self._rdeps)
+
+    def affected(self, paths) -> set:
+        """File da rigenerare quando cambiano `paths`: loro stessi e chi li include"""
+        result = set()
+        for path in paths:
+            result.add(os.path.abspath(path))
+            result |= self.dependents(path)
+        return result
+
+    def _walk(self, start: str, edges: dict) -> set:
+        seen = set()
+        with self._lock:
+            stack = list(edges.get(start, ()))
+            while stack:
+                node = stack.pop()
+                if node in seen or node == start:
+                    continue
+                seen.add(node)
+                stack.extend(edges.get(node, ()))
+        return seen
+
+    def signature(self, path: str) -> str:
+        """Impronta dei file inclusi (dimensione + data di modifica), "" se non ne include.
+
+        Entra nella chiave di cache dei render: quando un file incluso
+        cambia, cambiano le chiavi dei soli diagrammi che lo usano.
+        """
+        deps = sorted(self.dependencies(path))
+        if not deps:
+            return ""
+        h = hashlib.sha256()
+        for dep in deps:
+            try:
+                st = os.stat(dep)
+                stamp = f"{st.st_size}-{st.st_mtime_ns}"
+            except OSError:
+                stamp = "missing"
+            h.update(f"{dep}\0{stamp}\0".encode("utf-8"))
+        return h.hexdigest()
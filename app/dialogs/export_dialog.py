@@ -0,0 +1,262 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QRadioButton,
+    QComboBox, QSpinBox, QCheckBox, QProgressBar, QListWidget, QListWidgetItem, QButtonGroup
+)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QColor
+import os
+import threading
+import time
+
+from app.batch_export import BatchExporter, FORMATS
+
+
+class ExportSignals(QObject):
+    progress = pyqtSignal(object, int, int)  # ExportResult, file completati, totale
+    finished = pyqtSignal(list, float, str)  # risultati, secondi, errore ("" se nessuno)
+
+
+class ExportWorker(QRunnable):
+    """Esegue BatchExporter.run fuori dal thread della GUI"""
+    def __init__(self, exporter: BatchExporter, files, texts: dict, cancel: threading.Event = None):
+        super().__init__()
+        self.exporter = exporter
+        self.files = files
+        self.texts = texts
+        self.cancel = cancel
+        self.signals = ExportSignals()
+
+    def run(self):
+        start = time.perf_counter()
+        results, error = [], ""
+        try:
+            results = self.exporter.run(self.files, progress=self.signals.progress.emit, cancel=self.cancel,
+                                        texts=self.texts)
+        except (OSError, ValueError) as e:
+            print("Errore durante l'export:", e)
+            error = str(e)
+        self.signals.finished.emit(results, time.perf_counter() - start, error)
+
+
+class ExportDialog(QDialog):
+    """Export in PNG, SVG, PDF o EPS del file corrente, dei file selezionati o del progetto.
+
+    I file vengono renderizzati da BatchExporter in background, su un pool
+    limitato di JVM (una per job); l'esito di ogni file compare man mano,
+    con gli errori in rosso (doppio clic per aprire il file alla riga).
+    La finestra non è modale: si può continuare a scrivere durante l'export.
+    """
+    open_requested = pyqtSignal(str, object)  # percorso, riga dell'errore (o None)
+    settings_changed = pyqtSignal(dict)       # impostazioni "export" da salvare nel progetto
+
+    def __init__(self, project_dir: str, jar_path: str, manifest_path: str = None, settings: dict = None,
+                 server_url: str = None, server_start=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Diagrams")
+        self.setMinimumSize(560, 480)
+        self.project_dir = project_dir
+        self.jar_path = jar_path
+        self.manifest_path = manifest_path
+        self.server_url = server_url  # server di render del progetto (None = JVM locali)
+        self.server_start = server_start  # avvio del server locale, nel thread dell'export
+        self.exporter = None
+        self.cancel_event = None  # creato prima del worker: Cancel vale anche durante la ricerca dei file
+        self.texts = {}
+        self.targets = {}  # scope -> file da esportare (None = tutto il progetto)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        settings = settings or {}
+
+        # =========================
+        # OPZIONI
+        # =========================
+        self.scopes = QButtonGroup(self)
+        self.scope_buttons = {}
+        scope_layout = QHBoxLayout()
+        for scope, label in (("current", "Current file"), ("selection", "Selected files"),
+                             ("project", "Whole project")):
+            button = QRadioButton(label)
+            self.scopes.addButton(button)
+            self.scope_buttons[scope] = button
+            scope_layout.addWidget(button)
+
+        self.format = QComboBox()
+        for fmt in FORMATS:
+            self.format.addItem(fmt.upper(), fmt)
+        index = self.format.findData(settings.get("format", "png"))
+        self.format.setCurrentIndex(max(0, index))
+
+        self.output = QLineEdit(settings.get("output", "export"))
+        browse_btn = QPushButton("Browse...")
+        browse_btn.clicked.connect(self._browse)
+
+        self.jobs = QSpinBox()
+        self.jobs.setRange(1, max(1, 2 * (os.cpu_count() or 1)))
+        self.jobs.setValue(settings.get("jobs") or os.cpu_count() or 1)
+        self.force = QCheckBox("Re-export unchanged files")
+
+        # =========================
+        # AVANZAMENTO
+        # =========================
+        self.progress = QProgressBar()
+        self.status = QLabel()
+        self.results = QListWidget()
+        self.results.itemActivated.connect(self._open_item)
+
+        self.export_btn = QPushButton("Export")
+        self.export_btn.setDefault(True)
+        self.export_btn.clicked.connect(self.start)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+
+        layout = QVBoxLayout()
+        layout.addLayout(scope_layout)
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("Format"))
+        options_layout.addWidget(self.format)
+        options_layout.addWidget(QLabel("Parallel jobs"))
+        options_layout.addWidget(self.jobs)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+
+        layout.addWidget(QLabel("Output folder (relative to the project)"))
+        dir_layout = QHBoxLayout()
+        dir_layout.addWidget(self.output)
+        dir_layout.addWidget(browse_btn)
+        layout.addLayout(dir_layout)
+        layout.addWidget(self.force)
+
+        layout.addWidget(self.progress)
+        layout.addWidget(self.status)
+        layout.addWidget(self.results)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.export_btn)
+        buttons.addWidget(self.cancel_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+
+    @property
+    def running(self) -> bool:
+        return self.exporter is not None
+
+    def set_targets(self, current: str, selection: list, project: bool, texts: dict, scope: str = "current"):
+        """File esportabili per ogni ambito; `texts` sono le modifiche non salvate (percorso -> testo)"""
+        self.texts = texts
+        self.targets = {
+            "current": [current] if current else [],
+            "selection": selection,
+            "project": None if project else [],
+        }
+        self.scope_buttons["current"].setText(
+            f"Current file ({os.path.basename(current)})" if current else "Current file"
+        )
+        self.scope_buttons["selection"].setText(f"Selected files ({len(selection)})")
+        for name, button in self.scope_buttons.items():
+            button.setEnabled(self.targets[name] != [])
+        if not self.scope_buttons[scope].isEnabled():
+            scope = next((name for name, button in self.scope_buttons.items() if button.isEnabled()), scope)
+        self.scope_buttons[scope].setChecked(True)
+
+    def _browse(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select output folder", self._output_dir())
+        if folder:
+            # Dentro il progetto il percorso resta relativo, così il .tsp funziona anche altrove
+            rel_path = os.path.relpath(folder, self.project_dir)
+            self.output.setText(folder if rel_path.startswith(os.pardir) else rel_path)
+
+    def _output_dir(self) -> str:
+        return os.path.join(self.project_dir, self.output.text().strip() or "export")
+
+    # =========================
+    # EXPORT
+    # =========================
+    def start(self):
+        if self.running:
+            return
+        scope = next(name for name, button in self.scope_buttons.items() if button.isChecked())
+        files = self.targets.get(scope)
+        fmt = self.format.currentData()
+        output = self.output.text().strip() or "export"
+        self.settings_changed.emit({"output": output, "format": fmt, "jobs": self.jobs.value()})
+
+        self.exporter = BatchExporter(self.project_dir, self.jar_path, fmt, self.jobs.value(), output,
+                                      self.manifest_path, self.force.isChecked(), self.server_url,
+                                      self.server_start)
+        self.results.clear()
+        self.progress.setRange(0, len(files) if files is not None else 0)  # progetto: totale ancora ignoto
+        self.progress.setValue(0)
+        self.status.setText("Exporting...")
+        self.export_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+
+        self.cancel_event = threading.Event()
+        worker = ExportWorker(self.exporter, files, self.texts, self.cancel_event)
+        worker.signals.progress.connect(self._on_progress)
+        worker.signals.finished.connect(self._on_finished)
+        self.pool.start(worker)
+
+    def cancel(self):
+        if self.exporter is not None:
+            self.cancel_event.set()  # il worker potrebbe non aver ancora chiamato run()
+            self.exporter.cancel()
+            self.status.setText("Cancelling...")
+            self.cancel_btn.setEnabled(False)
+
+    def shutdown(self, timeout_ms: int = 5000):
+        """Annulla l'export in corso e attende la chiusura delle JVM (chiusura della finestra principale)"""
+        self.cancel()
+        self.pool.waitForDone(timeout_ms)
+
+    def _on_progress(self, result, done: int, total: int):
+        self.progress.setRange(0, total)
+        self.progress.setValue(done)
+        if result.cancelled:
+            return
+        if result.error:
+            where = f":{result.line}" if result.line else ""
+            item = QListWidgetItem(f"✗ {result.rel_path}{where} — {result.error.splitlines()[0]}")
+            item.setForeground(QColor("#ff5555"))
+            item.setData(Qt.ItemDataRole.UserRole, (result.path, result.line))
+        elif result.skipped:
+            item = QListWidgetItem(f"= {result.rel_path} (unchanged)")
+        else:
+            item = QListWidgetItem(f"✓ {result.rel_path}")
+        self.results.addItem(item)
+        self.status.setText(f"{done}/{total} files")
+
+    def _on_finished(self, results: list, seconds: float, error: str):
+        self.exporter = None
+        self.export_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        if error:
+            self.status.setText(f"Export failed: {error}")
+            return
+        if not results and self.cancel_event.is_set():
+            self.status.setText("Export cancelled")
+            self.progress.setRange(0, 1)
+            self.progress.setValue(0)
+            return
+        exported = sum(1 for r in results if r.error is None and not r.skipped)
+        unchanged = sum(1 for r in results if r.skipped)
+        cancelled = sum(1 for r in results if r.cancelled)
+        failed = sum(1 for r in results if r.error and not r.cancelled)
+        summary = f"{exported} exported, {unchanged} unchanged, {failed} failed"
+        if cancelled:
+            summary += f", {cancelled} cancelled"
+        self.status.setText(f"{summary} in {seconds:.1f} s — {self._output_dir()}")
+        if not results:
+            self.progress.setRange(0, 1)
+        self.progress.setValue(self.progress.maximum())
+
+    def _open_item(self, item):
+        target = item.data(Qt.ItemDataRole.UserRole)
+        if target and target[0]:
+            self.open_requested.emit(target[0], target[1])
@@ -0,0 +1,69 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel
+)
+from PyQt6.QtCore import Qt
+import os
+import time
+
+
+class SymbolSearchDialog(QDialog):
+    """Ricerca fuzzy dei simboli del progetto; restituisce il simbolo scelto"""
+    def __init__(self, index, query="", candidates=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Go to Symbol")
+        self.setMinimumSize(520, 380)
+        self.index = index
+        self.selected = None
+
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("Symbol name")
+        self.results = QListWidget()
+        self.status = QLabel()
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.query)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status)
+        self.setLayout(layout)
+
+        self.query.textChanged.connect(self._search)
+        self.query.returnPressed.connect(self._accept_current)
+        self.results.itemActivated.connect(self._accept_item)
+
+        self.query.setText(query)
+        if candidates is not None:
+            # Più definizioni per lo stesso nome (go-to-definition)
+            self._show(candidates)
+
+    def _search(self, text):
+        start = time.perf_counter()
+        symbols = self.index.search(text) if text.strip() else []
+        self._show(symbols, (time.perf_counter() - start) * 1000)
+
+    def _show(self, symbols, elapsed_ms=None):
+        self.results.clear()
+        for symbol in symbols:
+            rel_path = os.path.relpath(symbol.path, self.index.project_dir)
+            item = QListWidgetItem(f"{symbol.name}  ({symbol.kind})  —  {rel_path}:{symbol.line}")
+            item.setData(Qt.ItemDataRole.UserRole, symbol)
+            self.results.addItem(item)
+        if symbols:
+            self.results.setCurrentRow(0)
+        timing = f" in {elapsed_ms:.1f} ms" if elapsed_ms is not None else ""
+        self.status.setText(f"{len(symbols)} results{timing}")
+
+    def _accept_current(self):
+        item = self.results.currentItem()
+        if item is not None:
+            self._accept_item(item)
+
+    def _accept_item(self, item):
+        self.selected = item.data(Qt.ItemDataRole.UserRole)
+        self.accept()
+
+    def keyPressEvent(self, event):
+        # Frecce su/giù dalla casella di ricerca muovono la selezione
+        if event.key() in (Qt.Key.Key_Up, Qt.Key.Key_Down):
+            self.results.keyPressEvent(event)
+            return
+        super().keyPressEvent(event)
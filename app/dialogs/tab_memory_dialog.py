@@ -0,0 +1,102 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox, QCheckBox, QTableWidget, QTableWidgetItem,
+    QHeaderView
+)
+from PyQt6.QtCore import Qt, pyqtSignal
+import os
+
+from app.memory_usage import current_rss, format_bytes
+from app.tab_hibernation import HibernatedTab
+
+
+class TabMemoryDialog(QDialog):
+    """Memoria stimata di ogni tab aperto e limite degli editor "vivi" (vedi TabHibernator)"""
+    settings_changed = pyqtSignal(dict)  # impostazioni "hibernation" da applicare e salvare nel progetto
+
+    COLUMNS = ("File", "State", "Text", "Document", "Preview", "Total")
+
+    def __init__(self, hibernator, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Tab Memory Usage")
+        self.setMinimumSize(640, 420)
+        self.hibernator = hibernator
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.summary = QLabel()
+
+        self.enabled = QCheckBox("Hibernate inactive tabs")
+        self.enabled.setChecked(bool(hibernator.settings["enabled"]))
+        self.limit = QSpinBox()
+        self.limit.setRange(1, 500)
+        self.limit.setValue(hibernator.settings["max_live_tabs"])
+        apply_btn = QPushButton("Apply")
+        apply_btn.clicked.connect(self._apply)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+
+        options = QHBoxLayout()
+        options.addWidget(self.enabled)
+        options.addWidget(QLabel("Live tabs limit"))
+        options.addWidget(self.limit)
+        options.addStretch()
+        options.addWidget(apply_btn)
+        options.addWidget(close_btn)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addWidget(self.summary)
+        layout.addLayout(options)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        tabs = self.hibernator.tab_widget
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(tabs.count())
+        totals = {"live": 0, "hibernated": 0}
+        counts = {"live": 0, "hibernated": 0}
+        for row in range(tabs.count()):
+            widget = tabs.widget(row)
+            state = "hibernated" if isinstance(widget, HibernatedTab) else "live"
+            usage = widget.memory_usage()
+            total = sum(usage.values())
+            totals[state] += total
+            counts[state] += 1
+            name = os.path.basename(widget.current_file) if widget.current_file else tabs.tabText(row)
+            values = [name, state] + [usage["text"], usage["document"], usage["preview"], total]
+            for column, value in enumerate(values):
+                item = _SizeItem(value) if isinstance(value, int) else QTableWidgetItem(value)
+                if column == 0:
+                    item.setToolTip(widget.current_file or "")
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+        stats = self.hibernator.stats()
+        wake = f", average wake {stats['wake_avg_ms']:.0f} ms" if stats["wake_avg_ms"] is not None else ""
+        self.summary.setText(
+            f"{counts['live']} live tabs: ~{format_bytes(totals['live'])} — "
+            f"{counts['hibernated']} hibernated: {format_bytes(totals['hibernated'])}\n"
+            f"Process memory: {format_bytes(current_rss())} — "
+            f"{stats['hibernations']} hibernations, {stats['wakes']} wakes{wake}"
+        )
+
+    def _apply(self):
+        self.settings_changed.emit({"enabled": int(self.enabled.isChecked()), "max_live_tabs": self.limit.value()})
+        self.refresh()
+
+
+class _SizeItem(QTableWidgetItem):
+    """Cella con una dimensione: mostrata leggibile, ordinata per byte"""
+    def __init__(self, size: int):
+        super().__init__(format_bytes(size))
+        self.size = size
+        self.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+    def __lt__(self, other):
+        if isinstance(other, _SizeItem):
+            return self.size < other.size
+        return super().__lt__(other)
@@ -0,0 +1,83 @@
+import os
+import shutil
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+def atomic_write(path: str, data: bytes):
+    """Scrive `data` in un file temporaneo accanto a `path`, poi lo rinomina al suo posto.
+
+    Un'interruzione a metà scrittura lascia il file originale intatto.
+    I permessi del file esistente vengono mantenuti.
+    """
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class WriteSignals(QObject):
+    written = pyqtSignal(str, object)      # percorso, token
+    failed = pyqtSignal(str, object, str)  # percorso, token, messaggio
+
+
+class WriteWorker(QRunnable):
+    """Scrittura atomica (o cancellazione, con `data` None) fuori dal thread della GUI"""
+    def __init__(self, path: str, data, token, signals: WriteSignals):
+        super().__init__()
+        self.path = path
+        self.data = data
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.data is None:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            else:
+                atomic_write(self.path, self.data)
+        except OSError as e:
+            self.signals.failed.emit(self.path, self.token, str(e))
+            return
+        self.signals.written.emit(self.path, self.token)
+
+
+class FileWriter(QObject):
+    """Coda di scritture su disco eseguite da un unico thread di lavoro.
+
+    Le scritture vengono eseguite nell'ordine in cui sono richieste, quindi
+    due salvataggi ravvicinati dello stesso file non si sovrappongono mai.
+    `token` torna indietro con i segnali (es. l'editor salvato).
+    """
+    written = pyqtSignal(str, object)
+    failed = pyqtSignal(str, object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = WriteSignals()
+        self.signals.written.connect(self.written)
+        self.signals.failed.connect(self.failed)
+
+    def write(self, path: str, data: bytes, token=None):
+        self.pool.start(WriteWorker(path, data, token, self.signals))
+
+    def remove(self, path: str, token=None):
+        self.pool.start(WriteWorker(path, None, token, self.signals))
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Attende la fine delle scritture in coda (es. prima di uscire)"""
+        return self.pool.waitForDone(msecs)
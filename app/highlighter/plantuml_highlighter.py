@@ -1,10 +1,15 @@
 from PyQt6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
-import re
+
+from app.highlighter.tokens import (
+    NORMAL, IN_COMMENT, IN_NOTE, TOKEN_RE, NOTE_BLOCK_START_RE, NOTE_BLOCK_END_RE, state_after
+)
+
+UNFORMATTED = 0x100  # bit dello stato di blocco: stato calcolato, formati ancora da applicare
+
 
 class PlantUMLHighlighter(QSyntaxHighlighter):
     def __init__(self, parent):
         super().__init__(parent)
-        self.rules = []
 
         # ========================
         # Formati base
@@ -29,34 +34,83 @@ class PlantUMLHighlighter(QSyntaxHighlighter):
         self.note_format = fmt("#C586C0", italic=True)
         self.package_format = fmt("#D7BA7D", bold=True)
 
-        # ========================
-        # Regole regex
-        # ========================
-        self.rules += [
-            # Parole chiave principali
-            (re.compile(r"\b(@startuml|@enduml|class|interface|enum|abstract|package|note|skinparam)\b"), self.keyword_format),
-            # Commenti
-            (re.compile(r"//.*|'.*"), self.comment_format),
-            # Stringhe tra ""
-            (re.compile(r'"[^"]*"'), self.string_format),
-            # Relazioni
-            (re.compile(r"(-->|--\||\.\.>|<-+|<\|--|<\.\.|->|<->)"), self.arrow_format),
-            # Classi e interfacce (nome subito dopo class|interface)
-            (re.compile(r"\b(class|interface|enum|abstract)\s+(\w+)"), self.class_format),
-            # Metodi e attributi dentro {}
-            (re.compile(r"(\w+)\s*:\s*[\w<>]+"), self.attribute_format),
-            (re.compile(r"(\w+)\s*\(.*\)"), self.method_format),
-            # Note
-            (re.compile(r"note\s+(left|right|top|bottom)?\s*:.*"), self.note_format),
-            # Package
-            (re.compile(r"\bpackage\s+(\w+)\b"), self.package_format),
-        ]
+        # Formato per ogni tipo di token
+        self.token_formats = {
+            "block_comment": self.comment_format,
+            "block_comment_open": self.comment_format,
+            "comment": self.comment_format,
+            "string": self.string_format,
+            "note_line": self.note_format,
+            "keyword": self.keyword_format,
+            "arrow": self.arrow_format,
+            "method": self.method_format,
+            "attribute": self.attribute_format,
+        }
+        self.declaration_formats = {
+            "class_decl": self.class_format,
+            "package_decl": self.package_format,
+        }
+
+        # Modalità documento grande: se impostato (prima, ultima riga) evidenzia
+        # solo le righe in questo intervallo; delle altre calcola solo lo stato
+        self.visible_range = None
+
+    def needs_format(self, block) -> bool:
+        """True se la riga non è mai stata evidenziata (o ha solo lo stato)"""
+        state = block.userState()
+        return state == -1 or bool(state & UNFORMATTED)
 
     # ========================
     # Evidenziazione
     # ========================
     def highlightBlock(self, text):
-        for pattern, fmt in self.rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+        state = self.previousBlockState()
+        if state != -1:
+            state &= ~UNFORMATTED
+
+        if self.visible_range is not None:
+            number = self.currentBlock().blockNumber()
+            if not self.visible_range[0] <= number <= self.visible_range[1]:
+                # Solo lo stato, portato avanti fino alle righe visibili
+                self.setCurrentBlockState(state_after(text, state) | UNFORMATTED)
+                return
+
+        pos = 0
+
+        if state == IN_COMMENT:
+            end = text.find("'/")
+            if end == -1:
+                self.setFormat(0, len(text), self.comment_format)
+                self.setCurrentBlockState(IN_COMMENT)
+                return
+            pos = end + 2
+            self.setFormat(0, pos, self.comment_format)
+
+        elif state == IN_NOTE:
+            if NOTE_BLOCK_END_RE.match(text):
+                self.setFormat(0, len(text), self.keyword_format)
+                self.setCurrentBlockState(NORMAL)
+            else:
+                self.setFormat(0, len(text), self.note_format)
+                self.setCurrentBlockState(IN_NOTE)
+            return
+
+        next_state = NORMAL
+        for match in TOKEN_RE.finditer(text, pos):
+            kind = match.lastgroup
+            start, end = match.span()
+
+            if kind in self.declaration_formats:
+                # Parola chiave + nome dichiarato
+                keyword_len = len(match.group().split(None, 1)[0])
+                self.setFormat(start, keyword_len, self.keyword_format)
+                self.setFormat(start + keyword_len, end - start - keyword_len, self.declaration_formats[kind])
+                continue
+
+            self.setFormat(start, end - start, self.token_formats[kind])
+            if kind == "block_comment_open":
+                next_state = IN_COMMENT
+
+        if next_state == NORMAL and pos == 0 and NOTE_BLOCK_START_RE.match(text):
+            next_state = IN_NOTE
+        self.setCurrentBlockState(next_state)
@@ -0,0 +1,53 @@
+"""Tokenizer PlantUML senza dipendenze da Qt: usato dal PlantUMLHighlighter e dal SymbolIndex (anche da CLI)"""
+import re
+
+# Stati di blocco (riga) passati alla riga successiva
+NORMAL = 0
+IN_COMMENT = 1   # dentro /' ... '/
+IN_NOTE = 2      # dentro note ... end note
+
+# ========================
+# Tokenizer: una sola regex, un solo passaggio per riga.
+# L'ordine delle alternative è la priorità quando due token iniziano nello stesso punto.
+# ========================
+TOKEN_RE = re.compile(r"""
+      (?P<block_comment>/'.*?'/)
+    | (?P<block_comment_open>/'.*)
+    | (?P<comment>'.*|//.*)
+    | (?P<string>"[^"]*")
+    | (?P<note_line>\bnote\s+(?:left|right|top|bottom)?\s*:.*)
+    | (?P<class_decl>\b(?:class|interface|enum|abstract|component)\s+\w+)
+    | (?P<package_decl>\bpackage\s+\w+\b)
+    | (?P<keyword>@startuml\b|@enduml\b|\b(?:class|interface|enum|abstract|component|package|note|skinparam)\b)
+    | (?P<arrow><->|<\|--|-->|--\||\.\.>|<\.\.|<-+|->)
+    | (?P<method>\w+\s*\(.*\))
+    | (?P<attribute>\w+\s*:\s*[\w<>]+)
+""", re.VERBOSE)
+
+NOTE_BLOCK_START_RE = re.compile(r"^\s*[rh]?note\b[^:\"]*$")
+NOTE_BLOCK_END_RE = re.compile(r"^\s*end\s?[rh]?note\b")
+
+
+def state_after(text: str, state: int) -> int:
+    """Stato della riga dopo `text`, senza formati (come PlantUMLHighlighter.highlightBlock).
+
+    Serve alle righe fuori dalla finestra evidenziata: le prime righe
+    visibili ereditano così lo stato giusto (commento o nota aperti più su).
+    """
+    pos = 0
+    if state == IN_COMMENT:
+        end = text.find("'/")
+        if end == -1:
+            return IN_COMMENT
+        pos = end + 2
+    elif state == IN_NOTE:
+        return NORMAL if NOTE_BLOCK_END_RE.match(text) else IN_NOTE
+
+    # Il tokenizer serve solo se la riga può aprire un commento (/' dentro una stringa non conta)
+    if "/'" in text[pos:]:
+        for match in TOKEN_RE.finditer(text, pos):
+            if match.lastgroup == "block_comment_open":
+                return IN_COMMENT
+    if pos == 0 and NOTE_BLOCK_START_RE.match(text):
+        return IN_NOTE
+    return NORMAL
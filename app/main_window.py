@@ -1,29 +1,84 @@
 import os
+import time
 from PyQt6.QtWidgets import (
-    QMainWindow, QFileDialog, QSplitter, QMessageBox, QTabWidget
+    QMainWindow, QFileDialog, QSplitter, QMessageBox, QTabWidget, QDockWidget, QLabel
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QObject, QRunnable, QTimer, QThreadPool, QByteArray, pyqtSignal
 from PyQt6.QtGui import QAction, QKeySequence
 
-from app.project_manager import ProjectManager
+from app.project_manager import ProjectManager, find_puml_files
+from app.memory_usage import format_bytes
+from app.session import Session
+from app.file_writer import FileWriter
+from app.autosave_journal import AutosaveJournal
 
 from app.widgets.file_tree import FileTreeWidget
 from app.widgets.editor import EditorWidget
 from app.widgets.preview import PreviewWidget
 from app.plantuml_renderer import AsyncPlantUMLPreview
+from app.background_render import BackgroundRenderQueue
+from app.tab_hibernation import TabHibernator, HibernatedTab
 from app.widgets.topbar import TopBar
 
-from app.dialogs.new_project_dialog import NewProjectDialog
+# Pannello di ricerca e dialog vengono importati al primo uso, non all'avvio
+
+
+class DependencyUpdateSignals(QObject):
+    finished = pyqtSignal(object, set)  # grafo aggiornato, file da rigenerare
+
+
+class DependencyUpdateWorker(QRunnable):
+    """Rilegge gli !include dei file cambiati fuori dal thread della GUI.
+
+    I file da rigenerare sono quelli che includono i file cambiati e i
+    file cambiati stessi se i loro include sono diversi (nuova chiave).
+    """
+    def __init__(self, index, paths: list, removed: list = ()):
+        super().__init__()
+        self.index = index
+        self.paths = paths
+        self.removed = removed
+        self.signals = DependencyUpdateSignals()
+
+    def run(self):
+        affected = set()
+        for path in self.removed:
+            self.index.remove_file(path)
+        for path in self.paths:
+            if os.path.exists(path) and self.index.update_file(path):
+                affected.add(os.path.abspath(path))
+            affected |= self.index.dependents(path)
+        self.signals.finished.emit(self.index, affected)
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    LINT_DELAY_MS = 150  # debounce del controllo di sintassi, sempre prima del render
+
+    session_restored = pyqtSignal()  # sessione precedente ripristinata (o assente)
+
+    def __init__(self, session_path=None):
         super().__init__()
         self.setWindowTitle("PlantUML Editor")
         self.resize(1300, 800)
 
         self.project_manager = ProjectManager()
-        self.open_editors = {}  # path -> EditorWidget
+        self.open_editors = {}  # path -> EditorWidget (HibernatedTab se il tab è ibernato)
+        self.session = Session(session_path)
+
+        # Indici del progetto su un thread dedicato: una costruzione lunga non
+        # blocca le scansioni dell'albero e le letture nel pool globale
+        self.index_pool = QThreadPool(self)
+        self.index_pool.setMaxThreadCount(1)
+
+        # Salvataggi atomici in background e journal delle modifiche non salvate
+        self.file_writer = FileWriter(self)
+        self.file_writer.written.connect(self.on_file_written)
+        self.file_writer.failed.connect(self.on_write_failed)
+        self.journal = AutosaveJournal(self.file_writer)
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(5000)
+        self.autosave_timer.timeout.connect(lambda: self.journal.checkpoint(self.live_editors()))
+        self.autosave_timer.start()
 
         # =========================
         # Renderer asincrono
@@ -33,6 +88,13 @@ class MainWindow(QMainWindow):
             jar_path="tools/plantuml.jar",
             preview_widget=self.preview
         )
+        self.renderer.result_ready.connect(self.on_render_result)
+        self.renderer.render_failed.connect(self.on_render_failed)
+        self.renderer.timings_updated.connect(self.update_timings_label)
+        self.renderer.lint_finished.connect(self.on_lint_finished)
+        self.renderer.set_metrics_enabled(True)
+        # Tab non attivi renderizzati nella cache mentre non si scrive
+        self.background = BackgroundRenderQueue(self.renderer, parent=self)
 
         self.topbar = TopBar(self)
         self.setMenuBar(self.topbar.get_menu_bar())
@@ -40,17 +102,49 @@ class MainWindow(QMainWindow):
         self._create_layout()
         self._connect_signals()
 
-        self.render_timer = QTimer()
-        self.render_timer.setInterval(500)  # debounce per live preview
+        # Oltre un certo numero di editor i tab inattivi vengono ibernati
+        self.hibernator = TabHibernator(self.tab_widget, self._wake_editor, parent=self)
+        self.hibernator.hibernated.connect(self.on_tab_hibernated)
+        self.hibernator.woken.connect(self.on_tab_woken)
+
+        self.render_timer = QTimer()  # unico debounce della live preview
         self.render_timer.setSingleShot(True)
         self.render_timer.timeout.connect(self.render_preview)
-
+        self._render_requested_at = None  # prima modifica in attesa di render (per i tempi)
+        self.lint_timer = QTimer()
+        self.lint_timer.setSingleShot(True)
+        self.lint_timer.timeout.connect(self.lint_current)
+        self._render_after_lint = None  # editor il cui render aspetta l'esito del controllo
+
+        # Latenza dei render (p50/p95) sempre visibile nella barra di stato
+        self.timings_label = QLabel()
+        self.statusBar().addPermanentWidget(self.timings_label)
+
+        # La geometria si applica prima di mostrare la finestra, il resto
+        # della sessione al primo giro dell'event loop
+        if self.session.load():
+            self._restore_geometry(self.session.data)
+        QTimer.singleShot(0, self.restore_session)
+
+    def closeEvent(self, event):
+        self.save_session()
+        # Le modifiche non salvate restano nel journal, recuperabili al prossimo avvio
+        self.journal.checkpoint(self.live_editors())
+        self.file_writer.wait()
+        self.journal.close()
+        if self.export_dialog is not None:
+            self.export_dialog.shutdown()
+        if self.gallery is not None:
+            self.gallery.shutdown()
+        # Chiude la JVM PlantUML persistente prima di uscire
+        self.renderer.shutdown()
+        super().closeEvent(event)
 
     # =========================
     # LAYOUT
     # =========================
     def _create_layout(self):
-        main_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.main_splitter = main_splitter = QSplitter(Qt.Orientation.Horizontal)
 
         # File tree
         self.file_tree = FileTreeWidget()
@@ -71,56 +165,151 @@ class MainWindow(QMainWindow):
 
         self.setCentralWidget(main_splitter)
 
+        # Ricerca nei file: pannello in basso creato alla prima ricerca
+        self.search_panel = None
+        self.search_dock = None
+        self.export_dialog = None
+        # Galleria delle miniature: creata alla prima apertura
+        self.gallery = None
+        self.gallery_dock = None
+
     def _connect_signals(self):
         self.file_tree.itemClicked.connect(self.open_file)
-        self.tab_widget.currentChanged.connect(self.schedule_render)
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        self.file_tree.files_changed.connect(self.on_files_changed)
+
+    def _create_search_panel(self):
+        from app.widgets.search_panel import SearchPanel
+        self.search_panel = SearchPanel()
+        self.search_panel.set_index(self.project_manager.text_index)
+        self.search_panel.results.itemActivated.connect(self.open_file)
+        self.search_dock = QDockWidget("Search", self)
+        self.search_dock.setWidget(self.search_panel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.search_dock)
+
+    def _create_gallery(self):
+        from app.widgets.gallery import GalleryPanel
+        # Stessa cache della preview: i diagrammi già visti non si renderizzano di nuovo
+        self.gallery = GalleryPanel(self.renderer.jar_path, self.renderer.cache)
+        self.gallery.open_requested.connect(self.open_path)
+        self.gallery_dock = QDockWidget("Gallery", self)
+        self.gallery_dock.setWidget(self.gallery)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.gallery_dock)
+        self._configure_gallery()
+
+    def _configure_gallery(self):
+        self.gallery.set_project(self.project_manager.project_dir, self.project_manager.dependencies,
+                                 self.renderer.server_url, self.renderer.jar_version, self.renderer.server_start,
+                                 self.project_manager.excluded_dirs())
 
     # =========================
     # FILE HANDLING
     # =========================
     def open_file(self, item, column):
-        path = item.data(0, Qt.ItemDataRole.UserRole)
+        # Albero del progetto e risultati della ricerca: percorso ed eventuale riga
+        self.open_path(item.data(0, Qt.ItemDataRole.UserRole), item.data(0, FileTreeWidget.LINE_ROLE))
+
+    def open_path(self, path, line=None, column=0):
+        """Apre `path` in un tab (o passa a quello già aperto), opzionalmente alla riga `line`"""
         if not path or not os.path.exists(path):
             return
 
         if path in self.open_editors:
-            index = self.tab_widget.indexOf(self.open_editors[path])
-            self.tab_widget.setCurrentIndex(index)
+            self.tab_widget.setCurrentWidget(self.open_editors[path])
+            editor = self.open_editors[path]  # ricostruito se il tab era ibernato
+            if line is not None:
+                editor.go_to_line(line, column)
             return
 
-        editor = EditorWidget()
-        editor.load_file(path)
-        editor.textChanged.connect(self.schedule_render)
-        editor.textChanged.connect(lambda: self.mark_tab_dirty(editor))
+        # Include del file letti in background: se cambiano, il tab viene rigenerato
+        self.invalidate_dependents([path])
 
+        editor = self._create_editor(path)
         self.open_editors[path] = editor
+        # Se l'utente passa subito a un altro file, questo viene renderizzato in background
+        self.background.add(editor, BackgroundRenderQueue.OPENED)
         filename = os.path.basename(path)
         self.tab_widget.addTab(editor, filename)
         self.tab_widget.setCurrentWidget(editor)
+        if line is not None:
+            editor.go_to_line(line, column)
 
         self.schedule_render()
 
+    def _create_editor(self, path, placeholder=None):
+        """Editor collegato alla finestra, dal file su disco o da un tab ibernato"""
+        editor = EditorWidget()
+        editor.load_finished.connect(self.on_file_loaded)
+        if placeholder is None:
+            editor.load_file(path)
+        else:
+            editor.load_snapshot(path, placeholder.text(), placeholder.cursor, placeholder.scroll)
+        editor.textChanged.connect(self.schedule_render)
+        editor.textChanged.connect(self.background.pause)
+        editor.modificationChanged.connect(self.update_tab_title)
+        editor.cursorPositionChanged.connect(lambda: self.on_cursor_moved(editor))
+        return editor
+
+    def live_editors(self) -> list:
+        """Editor aperti non ibernati"""
+        return [editor for editor in self.open_editors.values() if isinstance(editor, EditorWidget)]
+
     def save_current_file(self):
         editor = self.tab_widget.currentWidget()
         if not editor or not editor.current_file:
             return
-        editor.save()
-        index = self.tab_widget.currentIndex()
-        filename = os.path.basename(editor.current_file)
-        self.tab_widget.setTabText(index, filename)
+        editor.save(self.file_writer)
+
+    def on_file_written(self, path, editor):
+        if not isinstance(editor, EditorWidget):
+            return  # voce del journal
+        editor.pending_writes -= 1
+        # Un editor già chiuso non va più interrogato: il file salvato è quello definitivo
+        if self.open_editors.get(path) is not editor or not editor.document().isModified():
+            self.journal.discard(path)
+        self.hibernator.schedule_check()
+        # Grafo e indici rileggono il file solo ora che è su disco
+        self.invalidate_dependents([path])
+        self.update_indexes([path])
+        if self.gallery is not None:
+            self.gallery.invalidate([path])
+
+    def on_write_failed(self, path, editor, message):
+        print("Errore salvando file:", message)
+        if isinstance(editor, EditorWidget):
+            editor.pending_writes -= 1
+            if self.open_editors.get(path) is editor:
+                editor.document().setModified(True)
+            QMessageBox.warning(self, "Error", f"Unable to save {os.path.basename(path)}: {message}")
+
+    def on_file_loaded(self, stats):
+        if not stats["large"]:
+            return
+        # Documento grande caricato in background: riporta tempi e memoria
+        self.statusBar().showMessage(
+            f"{os.path.basename(stats['path'])}: {format_bytes(stats['bytes'])}, "
+            f"{stats['lines']} righe in {stats['seconds']:.2f} s, "
+            f"memoria +{format_bytes(stats['memory_delta'])}"
+        )
+        self.schedule_render()
 
-    def mark_tab_dirty(self, editor):
+    def update_tab_title(self, modified):
+        """Asterisco sul tab dei documenti modificati (solo quando lo stato cambia)"""
+        editor = self.sender()
         index = self.tab_widget.indexOf(editor)
-        if index != -1:
-            tab_text = self.tab_widget.tabText(index)
-            if not tab_text.startswith("*"):
-                self.tab_widget.setTabText(index, "*" + tab_text)
+        if index == -1 or editor.loading:
+            return
+        filename = os.path.basename(editor.current_file)
+        self.tab_widget.setTabText(index, "*" + filename if modified else filename)
 
     def close_tab(self, index):
         editor = self.tab_widget.widget(index)
-        if editor:
-            tab_text = self.tab_widget.tabText(index)
-            if tab_text.startswith("*"):
+        if isinstance(editor, HibernatedTab):
+            # Mai modificato: niente da salvare né render da annullare
+            self.open_editors.pop(editor.current_file, None)
+            self.hibernator.forget(editor)
+        elif editor:
+            if editor.document().isModified() and not editor.loading:
                 res = QMessageBox.question(
                     self,
                     "Unsaved Changes",
@@ -128,19 +317,271 @@ class MainWindow(QMainWindow):
                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
                 )
                 if res == QMessageBox.StandardButton.Yes:
-                    editor.save()
+                    editor.save(self.file_writer)
+                else:
+                    self.journal.discard(editor.current_file)
             path = editor.current_file
             if path in self.open_editors:
                 del self.open_editors[path]
+            self.renderer.forget(editor)
+            self.background.forget(editor)
+            self.hibernator.forget(editor)
 
         self.tab_widget.removeTab(index)
+        if editor:
+            # removeTab non distrugge il widget: senza deleteLater resterebbe in memoria
+            editor.deleteLater()
+
+    # =========================
+    # DIPENDENZE (!include)
+    # =========================
+    def on_files_changed(self, added, removed):
+        self.invalidate_dependents(added + removed, removed)
+        self.update_indexes(added + removed)
+        if self.gallery is not None:
+            self.gallery.remove_files(removed)
+            self.gallery.add_files(added)
+            self.gallery.invalidate(added + removed)
+
+    def invalidate_dependents(self, paths, removed=()):
+        """Aggiorna il grafo per i file cambiati (su index_pool); on_dependencies_updated rigenera i tab"""
+        index = self.project_manager.dependencies
+        if index is None:
+            return
+        worker = DependencyUpdateWorker(index, list(paths), list(removed))
+        worker.signals.finished.connect(self.on_dependencies_updated)
+        self.index_pool.start(worker)
+
+    def on_dependencies_updated(self, index, affected):
+        """Rigenera solo i tab (e le miniature) dei file che includono quelli cambiati"""
+        if index is not self.project_manager.dependencies:
+            return  # grafo di un progetto non più aperto
+        if self.gallery is not None:
+            self.gallery.invalidate(affected)
+        current = self.tab_widget.currentWidget()
+        for path, editor in self.open_editors.items():
+            if os.path.abspath(path) not in affected or editor.loading or isinstance(editor, HibernatedTab):
+                continue  # un tab ibernato viene renderizzato quando si risveglia
+            if editor is current:
+                self.render_preview()
+            else:
+                # Tab in background: rigenerato dalla coda in background alla prima pausa
+                self.renderer.invalidate(editor)
+                self.background.add(editor, BackgroundRenderQueue.OPENED)
+
+    # =========================
+    # SIMBOLI E RICERCA
+    # =========================
+    def update_indexes(self, paths):
+        """Aggiorna in background indice dei simboli, indice di ricerca e sidecar"""
+        self.index_pool.start(lambda: self.project_manager.update_indexes(paths))
+
+    def go_to_definition(self):
+        editor = self.tab_widget.currentWidget()
+        symbols = self.project_manager.symbols
+        if editor is None or symbols is None:
+            return
+        name = editor.word_under_cursor()
+        definitions = symbols.definitions(name)
+        if not definitions:
+            self.statusBar().showMessage(f"Nessuna definizione per '{name}'", 3000)
+        elif len(definitions) == 1:
+            self.open_path(definitions[0].path, definitions[0].line)
+        else:
+            self.search_symbols(name, definitions)
+
+    def search_symbols(self, query="", candidates=None):
+        symbols = self.project_manager.symbols
+        if symbols is None:
+            return
+        from app.dialogs.symbol_search_dialog import SymbolSearchDialog
+        dialog = SymbolSearchDialog(symbols, query, candidates, self)
+        if dialog.exec() == dialog.DialogCode.Accepted and dialog.selected is not None:
+            self.open_path(dialog.selected.path, dialog.selected.line)
+
+    def show_search(self):
+        """Mostra il pannello di ricerca, precompilato con la selezione dell'editor"""
+        editor = self.tab_widget.currentWidget()
+        selected = editor.textCursor().selectedText() if editor is not None else ""
+        if self.search_panel is None:
+            self._create_search_panel()
+        self.search_dock.show()
+        self.search_panel.focus_query(selected if "\u2029" not in selected else None)
+
+    def show_gallery(self):
+        """Miniature di tutti i diagrammi del progetto, generate in background"""
+        if self.gallery is None:
+            self._create_gallery()
+        self.gallery_dock.show()
+        self.gallery_dock.raise_()
+        self.gallery.view.setFocus()
 
     # =========================
     # PREVIEW ASINCRONA
     # =========================
+    def on_tab_changed(self, index):
+        """Mostra subito l'ultimo risultato del tab; renderizza solo se il documento è cambiato"""
+        editor = self.tab_widget.widget(index)
+        woken = isinstance(editor, HibernatedTab)
+        if woken:
+            editor = self.hibernator.wake(editor)
+        self.hibernator.touch(editor)
+        self.background.set_current(editor)
+        if editor is None:
+            self.renderer.show_stored(None)
+            self.statusBar().clearMessage()
+            return
+
+        self.renderer.show_stored(editor)
+        self.on_cursor_moved(editor)
+        if editor.syntax_errors:
+            self.show_syntax_errors(editor)
+        elif editor.render_error:
+            self.show_render_error(editor)
+        else:
+            self.statusBar().clearMessage()
+        if woken and not editor.loading:
+            # Diagrammi quasi sempre in cache: nessun debounce
+            self.render_timer.stop()
+            self.lint_current()
+            self.render_preview()
+        elif self.renderer.needs_render(editor):
+            self.schedule_render()
+
+    # =========================
+    # IBERNAZIONE DEI TAB
+    # =========================
+    def _wake_editor(self, placeholder):
+        return self._create_editor(placeholder.current_file, placeholder)
+
+    def on_tab_hibernated(self, editor, placeholder):
+        self.open_editors[placeholder.current_file] = placeholder
+        self.renderer.forget(editor)
+        self.background.forget(editor)
+
+    def on_tab_woken(self, placeholder, editor):
+        self.open_editors[editor.current_file] = editor
+        self.background.add(editor)
+
+    def set_hibernation(self, settings):
+        """Applica (e salva nel progetto) limite e attivazione dell'ibernazione dei tab"""
+        self.hibernator.configure(settings)
+        self.hibernator.check()
+        self.project_manager.set_setting("hibernation", settings)
+
+    def show_tab_memory(self):
+        from app.dialogs.tab_memory_dialog import TabMemoryDialog
+        dialog = TabMemoryDialog(self.hibernator, self)
+        dialog.settings_changed.connect(self.set_hibernation)
+        dialog.exec()
+
+    def on_render_result(self, editor):
+        editor.set_diagnostics(editor.syntax_errors)
+        if editor is self.tab_widget.currentWidget() and not editor.syntax_errors:
+            self.statusBar().clearMessage()
+
+    def on_render_failed(self, editor, message, line):
+        if line and all(known != line for known, _ in editor.syntax_errors):
+            editor.set_diagnostics(editor.syntax_errors + [(line, message)])
+        if editor is self.tab_widget.currentWidget():
+            if editor.syntax_errors:
+                self.show_syntax_errors(editor)
+            else:
+                self.show_render_error(editor)
+
+    def on_cursor_moved(self, editor):
+        """Porta in vista il diagramma che contiene la riga del cursore"""
+        if editor is not self.tab_widget.currentWidget():
+            return
+        index = self.renderer.block_index(editor, editor.textCursor().blockNumber())
+        if index != self.preview.current_page:
+            self.preview.scroll_to_page(index)
+
+    def show_render_error(self, editor):
+        message, line = editor.render_error
+        where = f" (riga {line})" if line else ""
+        self.statusBar().showMessage(f"Errore PlantUML{where}: {message.splitlines()[0] if message else ''}")
+
+    def show_syntax_errors(self, editor):
+        line, message = editor.syntax_errors[0]
+        count = len(editor.syntax_errors)
+        summary = "1 errore di sintassi" if count == 1 else f"{count} errori di sintassi"
+        self.statusBar().showMessage(f"{summary} (riga {line}): {message.splitlines()[0] if message else ''}")
+
     def schedule_render(self):
-        """Debounce: avvia render asincrono dopo pochi ms di inattività"""
-        self.render_timer.start()
+        """Debounce adattivo: il ritardo segue il costo medio di render del documento.
+
+        Il controllo di sintassi parte prima (al più dopo LINT_DELAY_MS),
+        così un diagramma non valido non arriva mai al render.
+        """
+        editor = self.tab_widget.currentWidget()
+        if editor is not None and editor.loading:
+            return
+        if self._render_requested_at is None and self.renderer.metrics is not None:
+            self._render_requested_at = time.perf_counter()
+        delay = self.renderer.delay_for(editor)
+        self.lint_timer.start(min(self.LINT_DELAY_MS, delay))
+        self.render_timer.start(delay)
+
+    def lint_current(self):
+        editor = self.tab_widget.currentWidget()
+        if editor is None or editor.loading:
+            return
+        self.renderer.lint(editor.toPlainText(), editor, editor.document().revision())
+
+    def on_lint_finished(self, editor, revision, errors):
+        if revision != editor.document().revision():
+            return  # testo già cambiato: arriverà un controllo più recente
+        editor.syntax_errors = errors
+        editor.set_diagnostics(errors)
+        if editor is self.tab_widget.currentWidget():
+            if errors:
+                self.show_syntax_errors(editor)
+            elif not editor.render_error:
+                self.statusBar().clearMessage()
+        if self._render_after_lint is editor:
+            self._render_after_lint = None
+            self.render_preview()
+
+    # =========================
+    # TEMPI DI RENDER
+    # =========================
+    def update_timings_label(self):
+        metrics = self.renderer.metrics
+        self.timings_label.setText(metrics.status_text() if metrics is not None else "")
+
+    def set_render_metrics(self, enabled):
+        """Accende o spegne la raccolta dei tempi (spenta non costa nulla)"""
+        self.renderer.set_metrics_enabled(enabled)
+        self.topbar.render_metrics_action.setChecked(enabled)
+        self.update_timings_label()
+
+    def export_render_timings(self):
+        metrics = self.renderer.metrics
+        if metrics is None or not metrics.traces:
+            QMessageBox.information(self, "Render Timings", "No render timings collected yet")
+            return
+        path, selected = QFileDialog.getSaveFileName(
+            self, "Export Render Timings", "render-trace.json",
+            "Chrome trace (*.json);;JSON lines (*.jsonl)"
+        )
+        if not path:
+            return
+        try:
+            if path.endswith(".jsonl") or selected.startswith("JSON lines"):
+                metrics.export_jsonl(path)
+            else:
+                metrics.export_chrome_trace(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Unable to export timings: {e}")
+
+    def set_preview_format(self, fmt):
+        """Preview raster (png) o vettoriale a tasselli (svg)"""
+        if fmt == self.renderer.format:
+            return
+        self.renderer.set_format(fmt)
+        self.topbar.svg_preview_action.setChecked(fmt == "svg")
+        self.render_preview()
 
     def render_preview(self):
         """Chiama il renderer asincrono"""
@@ -148,19 +589,90 @@ class MainWindow(QMainWindow):
         if not editor:
             return
 
-        text = editor.toPlainText().strip()
-        if not text:
-            self.preview.update_image(None)
+        self._render_after_lint = None
+        if self.renderer.lint_pending(editor):
+            # Esito del controllo tra pochi ms: il render parte dopo, solo se il diagramma è valido
+            self._render_after_lint = editor
+            return
+
+        requested_at, self._render_requested_at = self._render_requested_at, None
+        text = editor.toPlainText()
+        revision = editor.document().revision()
+        if not text.strip():
+            editor.render_result = None
+            editor.render_error = None
+            editor.syntax_errors = []
+            editor.requested_render = (revision, self.renderer.format)
+            self.renderer.show_stored(editor)
             editor.clear_error_highlight()
             self.statusBar().clearMessage()
             return
 
-        self.renderer.render(text)  # aggiorna preview in background
+        # Solo i diagrammi cambiati vengono renderizzati, partendo da quello sotto il cursore
+        self.renderer.render(text, editor, revision, editor.textCursor().blockNumber(), requested_at)
+
+    # =========================
+    # EXPORT
+    # =========================
+    def on_export_settings_changed(self, settings: dict):
+        self.project_manager.set_setting("export", settings)
+        self.file_tree.set_excluded(self.project_manager.excluded_dirs())
+        if self.gallery is not None:
+            self.gallery.excluded = self.project_manager.excluded_dirs()
+            self.gallery.rescan()
+
+    def show_export(self, scope="current"):
+        """Export del file corrente, dei file selezionati nell'albero o dell'intero progetto"""
+        if self.export_dialog is not None and self.export_dialog.running:
+            self.export_dialog.show()
+            self.export_dialog.raise_()
+            return
+        editor = self.tab_widget.currentWidget()
+        current = editor.current_file if editor is not None else None
+        project_dir = self.project_manager.project_dir
+        if project_dir is None and current is None:
+            QMessageBox.information(self, "Export", "Open a project or a file to export")
+            return
+
+        from app.dialogs.export_dialog import ExportDialog
+        from app.batch_export import manifest_path
+        if project_dir is not None:
+            dialog = ExportDialog(project_dir, self.renderer.jar_path, manifest_path(self.project_manager),
+                                  self.project_manager.get_setting("export", {}), self.renderer.server_url,
+                                  self.renderer.server_start, self)
+            dialog.settings_changed.connect(self.on_export_settings_changed)
+        else:
+            # File fuori da un progetto: output e manifest accanto al file
+            dialog = ExportDialog(os.path.dirname(current), self.renderer.jar_path,
+                                  server_url=self.renderer.server_url, server_start=self.renderer.server_start,
+                                  parent=self)
+        dialog.open_requested.connect(self.open_path)
+        # Si esporta il testo degli editor, anche se non ancora salvato
+        texts = {open_editor.current_file: open_editor.toPlainText() for open_editor in self.live_editors()
+                 if open_editor.document().isModified() and not open_editor.loading}
+        dialog.set_targets(current, self.selected_files(), project_dir is not None, texts, scope)
+
+        if self.export_dialog is not None:
+            self.export_dialog.deleteLater()
+        self.export_dialog = dialog
+        dialog.show()
+
+    def selected_files(self) -> list:
+        """File .puml selezionati nell'albero; una cartella selezionata vale per tutti i suoi file"""
+        files = []
+        for item in self.file_tree.selectedItems():
+            folder = item.data(0, FileTreeWidget.DIR_ROLE)
+            if folder is not None:
+                files.extend(sorted(find_puml_files(folder, self.project_manager.excluded_dirs())))
+            elif item.data(0, Qt.ItemDataRole.UserRole):
+                files.append(item.data(0, Qt.ItemDataRole.UserRole))
+        return list(dict.fromkeys(files))
 
     # =========================
     # PROJECT HANDLING
     # =========================
     def create_project(self):
+        from app.dialogs.new_project_dialog import NewProjectDialog
         dialog = NewProjectDialog(self)
         if dialog.exec() != dialog.DialogCode.Accepted:
             return
@@ -203,6 +715,105 @@ class MainWindow(QMainWindow):
         self.load_project(folder)
 
 
-    def load_project(self, folder):
+    def load_project(self, folder, tree_snapshot=None):
         self.project_manager.open_project(folder)
-        self.file_tree.load_puml_files(folder)
+        self.renderer.set_dependencies(self.project_manager.dependencies)
+        from app.render_server import server_backend
+        # Il server locale (se serve) viene avviato dal primo render, non qui
+        self.renderer.set_server(*server_backend(self.project_manager.get_setting("render_server"),
+                                                 self.renderer.jar_path))
+        if self.search_panel is not None:
+            self.search_panel.set_index(self.project_manager.text_index)
+        if self.gallery is not None:
+            self._configure_gallery()
+        self.index_pool.start(self.project_manager.build_indexes)  # grafo e simboli in background
+        self.renderer.debounce.configure(self.project_manager.get_setting("debounce", {}))
+        self.background.configure(self.project_manager.get_setting("prerender", {}))
+        self.hibernator.configure(self.project_manager.get_setting("hibernation", {}))
+        self.set_preview_format(self.project_manager.get_setting("preview_format", self.renderer.format))
+        self.set_render_metrics(bool(self.project_manager.get_setting("render_metrics", True)))
+        self.file_tree.load_puml_files(folder, tree_snapshot, self.project_manager.excluded_dirs())
+
+    # =========================
+    # SESSIONE
+    # =========================
+    def save_session(self):
+        tabs = []
+        for index in range(self.tab_widget.count()):
+            editor = self.tab_widget.widget(index)
+            if not editor.current_file:
+                continue
+            line, column = editor.cursor_location()
+            tabs.append({"path": editor.current_file, "line": line, "column": column})
+        current = self.tab_widget.currentWidget()
+        project = self.project_manager.project_dir
+        self.session.save({
+            "project": os.path.abspath(project) if project else None,
+            "tabs": tabs,
+            "current": current.current_file if current is not None else None,
+            "tree": self.file_tree.snapshot() if project else None,
+            "geometry": bytes(self.saveGeometry().toBase64()).decode("ascii"),
+            "splitter": self.main_splitter.sizes(),
+        })
+
+    def _restore_geometry(self, data):
+        if data.get("geometry"):
+            self.restoreGeometry(QByteArray.fromBase64(data["geometry"].encode("ascii")))
+        if data.get("splitter"):
+            self.main_splitter.setSizes(data["splitter"])
+
+    def restore_session(self):
+        """Riapre progetto e tab dell'ultima sessione.
+
+        L'albero viene mostrato dall'istantanea salvata e verificato in
+        background; il tab corrente si renderizza subito, senza debounce,
+        così i diagrammi ancora in cache compaiono immediatamente.
+        """
+        data = self.session.data
+        folder = data.get("project")
+        if folder and os.path.isdir(folder) and self.project_manager.is_workspace(folder):
+            try:
+                self.load_project(folder, data.get("tree"))
+            except (OSError, ValueError, RuntimeError) as e:
+                print("Errore ripristinando il progetto:", e)
+            else:
+                for tab in data.get("tabs", []):
+                    self.open_path(tab.get("path"), tab.get("line"), tab.get("column", 0))
+                current = self.open_editors.get(data.get("current"))
+                if current is not None:
+                    self.tab_widget.setCurrentWidget(current)
+                if self.tab_widget.count() and not self.tab_widget.currentWidget().loading:
+                    self.render_timer.stop()
+                    self.render_preview()
+        self.recover_unsaved()
+        self.session_restored.emit()
+
+    def recover_unsaved(self):
+        """Propone di recuperare le modifiche rimaste nel journal (es. dopo un crash)"""
+        # Le voci di file non più esistenti restano nel journal, senza perderle
+        entries = [entry for entry in self.journal.entries() if os.path.exists(entry["path"])]
+        if not entries:
+            return
+        names = "\n".join(
+            os.path.basename(entry["path"]) + (" (changed on disk)" if entry["disk_changed"] else "")
+            for entry in entries
+        )
+        res = QMessageBox.question(
+            self,
+            "Recover Unsaved Changes",
+            f"Unsaved changes from a previous session were found:\n\n{names}\n\nRecover them?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        for entry in entries:
+            if res != QMessageBox.StandardButton.Yes:
+                self.journal.discard_entry(entry)
+                continue
+            self.journal.adopt(entry)
+            self.open_path(entry["path"])
+            editor = self.open_editors.get(entry["path"])
+            if editor is None:
+                continue
+            if editor.loading:
+                editor.load_finished.connect(lambda _, editor=editor, text=entry["text"]: editor.replace_text(text))
+            else:
+                editor.replace_text(entry["text"])
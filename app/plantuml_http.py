@@ -0,0 +1,358 @@
+import base64
+import queue
+import socket
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from app.plantuml_process import (
+    PlantUMLError, PlantUMLSyntaxError, PlantUMLTimeout, PlantUMLCancelled, extract_blocks
+)
+
+
+# Alfabeto base64 di PlantUML: stesse posizioni del base64 standard, caratteri sicuri negli URL
+_STANDARD = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_PLANTUML = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_"
+_ENCODE = bytes.maketrans(_STANDARD + b"=", _PLANTUML + b"0")
+_DECODE = bytes.maketrans(_PLANTUML, _STANDARD)
+
+MAX_URL_TEXT = 4000  # oltre, il testo va nel corpo di una POST (limite degli URL dei server)
+
+
+def encode_text(text: str) -> str:
+    """Codifica di PlantUML per gli URL: deflate senza intestazione zlib + base64 con alfabeto proprio"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    data = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return base64.b64encode(data).translate(_ENCODE).decode("ascii")
+
+
+def decode_text(encoded: str) -> str:
+    """Inverso di encode_text (gli zeri di riempimento finali vengono ignorati da inflate)"""
+    data = encoded.encode("ascii").translate(_DECODE)
+    data += b"=" * (-len(data) % 4)
+    try:
+        return zlib.decompressobj(-15).decompress(base64.b64decode(data, validate=True)).decode("utf-8")
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"Testo codificato non valido: {e}")
+
+
+class _Response:
+    def __init__(self, status: int, headers: dict, body: bytes, close: bool):
+        self.status = status
+        self.headers = headers  # nomi in minuscolo
+        self.body = body
+        self.close = close
+
+
+class PlantUMLServerConnection:
+    """Connessione HTTP/1.1 persistente a un server compatibile con PlantUML server.
+
+    È l'equivalente di una JVM "calda" di PlantUMLProcess: i blocchi
+    vanno a GET /<formato>/<testo codificato> (POST per i testi lunghi)
+    sulla stessa connessione keep-alive. render_all() usa il pipelining:
+    invia tutte le richieste e poi legge le risposte nell'ordine.
+
+    Gli errori di sintassi arrivano come stato 400 con le intestazioni
+    X-PlantUML-Diagram-Error e X-PlantUML-Diagram-Error-Line. Se il server
+    chiude la connessione (es. keep-alive scaduto) se ne apre una nuova e
+    le richieste senza risposta vengono ripetute una volta.
+
+    Con `fmt` "syntax" usa /syntax/ del server incluso (render_server):
+    un server che non lo conosce risponde 404 e check_block non segnala nulla.
+
+    `start` (opzionale) viene chiamata una volta prima della prima
+    connessione, nel thread del render: es. l'avvio del server locale.
+    """
+
+    def __init__(self, url: str, fmt: str = "png", timeout: float = 60.0, start=None):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        if parts.scheme != "http":
+            raise PlantUMLError(f"Server PlantUML non supportato: {url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.fmt = fmt
+        self.timeout = timeout
+        self.start = start
+
+        self.requests = 0
+        self.reconnects = 0
+        self.supported = True  # False se il server non conosce il formato (404)
+        self._sock = None
+        self._reader = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._active_token = None
+
+    # =========================
+    # CICLO DI VITA
+    # =========================
+    def _ensure_connected(self):
+        if self._closed:
+            raise PlantUMLError("Renderer PlantUML chiuso")
+        if self._sock is not None:
+            return
+        if self.start is not None:
+            start, self.start = self.start, None
+            start()
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except socket.timeout:
+            raise PlantUMLTimeout(f"Server PlantUML {self.host}:{self.port} non raggiungibile entro "
+                                  f"{self.timeout:.0f} s")
+        except OSError as e:
+            raise PlantUMLError(f"Server PlantUML {self.host}:{self.port} non raggiungibile: {e}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def _discard(self):
+        sock, reader = self._sock, self._reader
+        self._sock = self._reader = None
+        for stream in (reader, sock):
+            if stream is not None:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+
+    def is_running(self) -> bool:
+        return self._sock is not None
+
+    def kill(self):
+        """Chiude il socket (anche durante una richiesta): la lettura in corso fallisce subito"""
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def cancel(self, token: threading.Event):
+        """Annulla il render associato a `token`: se è già in corso la connessione viene chiusa"""
+        token.set()
+        if self._active_token is token:
+            self.kill()
+
+    def close(self):
+        self._closed = True
+        self._discard()
+
+    # =========================
+    # RICHIESTE
+    # =========================
+    def _request_bytes(self, block: str) -> bytes:
+        host = f"{self.host}:{self.port}"
+        encoded = encode_text(block)
+        if len(encoded) <= MAX_URL_TEXT:
+            return (f"GET {self.prefix}/{self.fmt}/{encoded} HTTP/1.1\r\nHost: {host}\r\n\r\n").encode("ascii")
+        payload = block.encode("utf-8")
+        return (f"POST {self.prefix}/{self.fmt} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: text/plain; charset=utf-8\r\nContent-Length: {len(payload)}\r\n\r\n"
+                ).encode("ascii") + payload
+
+    def _read_response(self) -> _Response:
+        reader = self._reader
+        status_line = reader.readline(65537)
+        if not status_line:
+            raise EOFError()
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not parts[1].isdigit():
+            raise PlantUMLError(f"Risposta non valida dal server PlantUML: {status_line[:80]!r}")
+        status = int(parts[1])
+        headers = {}
+        while True:
+            line = reader.readline(65537)
+            if not line:
+                raise EOFError()
+            if line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        close = headers.get("connection", "").lower() == "close" or parts[0] == b"HTTP/1.0"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(reader.readline(1026).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while reader.readline(65537) not in (b"\r\n", b"\n", b""):
+                        pass  # trailer
+                    break
+                chunks.append(self._read_exact(size))
+                reader.readline(3)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = self._read_exact(int(headers["content-length"]))
+        else:
+            body = reader.read()
+            close = True
+        return _Response(status, headers, body, close)
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._reader.read(size)
+        if len(data) < size:
+            raise EOFError()
+        return data
+
+    def _exchange(self, blocks: list, token: threading.Event = None, spans: list = None) -> list:
+        """Invia tutte le richieste sulla connessione (pipelining) e restituisce le risposte nell'ordine"""
+        responses = []
+        failures = 0
+        while len(responses) < len(blocks):
+            if token is not None and token.is_set():
+                raise PlantUMLCancelled("Render annullato")
+            cold = not self.is_running()
+            self._ensure_connected()
+            pending = blocks[len(responses):]
+            try:
+                start = time.perf_counter()
+                payload = b"".join(self._request_bytes(block) for block in pending)
+                self._sock.sendall(payload)
+                written = time.perf_counter()
+                for _ in pending:
+                    response = self._read_response()
+                    responses.append(response)
+                    self.requests += 1
+                    if response.close:
+                        # Il server non accetta altre richieste: le restanti su una nuova connessione
+                        self._discard()
+                        break
+                if spans is not None:
+                    spans.append(("write", start, written, {"bytes": len(payload)}))
+                    spans.append(("layout", written, time.perf_counter(),
+                                  {"bytes": sum(len(r.body) for r in responses), "cold": cold}))
+            except PlantUMLError:
+                self._discard()  # flusso HTTP non più allineato alle richieste
+                raise
+            except socket.timeout:
+                self._discard()
+                raise PlantUMLTimeout(f"Il server PlantUML non ha risposto entro {self.timeout:.0f} s")
+            except (OSError, EOFError):
+                # Connessione chiusa dal server (o da cancel): una nuova e un solo nuovo tentativo
+                self._discard()
+                failures += 1
+                if self._closed or failures > 1 or (token is not None and token.is_set()):
+                    break
+                self.reconnects += 1
+        if len(responses) == len(blocks):
+            return responses
+        if token is not None and token.is_set():
+            raise PlantUMLCancelled("Render annullato")
+        raise PlantUMLError("Il server PlantUML ha chiuso la connessione inaspettatamente")
+
+    def _parse(self, response: _Response, offset: int) -> bytes:
+        error = response.headers.get("x-plantuml-diagram-error")
+        if error is not None:
+            line = response.headers.get("x-plantuml-diagram-error-line", "")
+            # Linea 1-based nel blocco, come la mostra PlantUML server
+            line = offset + int(line) if line.strip().lstrip("-").isdigit() else None
+            raise PlantUMLSyntaxError(error or "Errore PlantUML", line)
+        if response.status != 200:
+            raise PlantUMLError(f"Il server PlantUML ha risposto {response.status}: "
+                                f"{response.body[:200].decode('utf-8', errors='replace').strip()}")
+        if not response.body:
+            raise PlantUMLError("PlantUML non ha prodotto alcuna immagine")
+        return response.body
+
+    # =========================
+    # RENDER
+    # =========================
+    def render_block(self, block: str, offset: int = 0, token: threading.Event = None, spans: list = None) -> bytes:
+        """Come PlantUMLProcess.render_block, con una richiesta HTTP"""
+        with self._lock:
+            self._active_token = token
+            try:
+                response = self._exchange([block], token, spans)[0]
+            finally:
+                self._active_token = None
+        return self._parse(response, offset)
+
+    def render_all(self, text: str, token: threading.Event = None) -> list:
+        """Renderizza tutti i diagrammi del testo con le richieste in pipeline"""
+        blocks = extract_blocks(text)
+        if not blocks:
+            raise PlantUMLError("Nessun blocco @startuml ... @enduml trovato", 1)
+        with self._lock:
+            self._active_token = token
+            try:
+                responses = self._exchange([block for _, block in blocks], token)
+            finally:
+                self._active_token = None
+        return [self._parse(response, offset) for (offset, _), response in zip(blocks, responses)]
+
+    def check_block(self, block: str, offset: int = 0, token: threading.Event = None):
+        """Controllo di sintassi di un blocco: None se valido, altrimenti il PlantUMLSyntaxError"""
+        if not self.supported:
+            return None
+        try:
+            self.render_block(block, offset, token)
+        except PlantUMLSyntaxError as e:
+            return e
+        except PlantUMLError as e:
+            if " 404:" not in str(e):
+                raise
+            self.supported = False  # server senza /syntax/: decide il render
+        return None
+
+
+class PlantUMLServerClient:
+    """Pool di connessioni keep-alive verso un server PlantUML, con l'interfaccia di PlantUMLProcessPool.
+
+    Le connessioni si aprono solo quando servono (fino a `size`, le
+    richieste in parallelo) e restano aperte tra un render e l'altro:
+    più editor ed export condividono così le stesse JVM del server e la
+    sua cache, senza avviarne di propri.
+    """
+
+    def __init__(self, url: str, fmt: str = "png", size: int = 4, timeout: float = 60.0, start=None):
+        self.url = url
+        self.fmt = fmt
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.start = start  # vedi PlantUMLServerConnection
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> PlantUMLServerConnection:
+        if self._closed:
+            raise PlantUMLError("Renderer PlantUML chiuso")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                connection = PlantUMLServerConnection(self.url, fmt=self.fmt, timeout=self.timeout,
+                                                      start=self.start)
+                self._all.append(connection)
+                return connection
+        return self._idle.get()
+
+    def release(self, connection: PlantUMLServerConnection):
+        self._idle.put(connection)
+
+    def render_block(self, block: str, offset: int = 0, token: threading.Event = None, spans: list = None) -> bytes:
+        """Come PlantUMLServerConnection.render_block, sulla prima connessione libera"""
+        connection = self.acquire()
+        try:
+            return connection.render_block(block, offset, token, spans)
+        finally:
+            self.release(connection)
+
+    def cancel(self, token: threading.Event):
+        token.set()
+        for connection in list(self._all):
+            connection.cancel(token)
+
+    def kill_all(self):
+        for connection in list(self._all):
+            connection.kill()
+
+    def close(self):
+        self._closed = True
+        for connection in list(self._all):
+            connection.close()
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+
+class PlantUMLError(Exception):
+    """Errore restituito da PlantUML (messaggio + linea, se nota)"""
+    def __init__(self, message: str, line: int = None):
+        super().__init__(message)
+        self.line = line
+
+
+class PlantUMLSyntaxError(PlantUMLError):
+    """Il diagramma non è valido (risposta "ERROR" di PlantUML)"""
+
+
+class PlantUMLTimeout(PlantUMLError):
+    """Il processo non ha risposto entro il timeout (considerato bloccato)"""
+
+
+class PlantUMLCancelled(PlantUMLError):
+    """Il render è stato annullato perché superato da uno più recente"""
+
+
+def extract_blocks(text: str):
+    """Divide il testo nei blocchi @startxxx ... @endxxx.
+
+    Restituisce una lista di (indice riga iniziale, testo del blocco).
+    Un blocco non chiuso viene chiuso con il suo @endxxx, così il pipe
+    non resta in attesa di altre righe.
+    """
+    blocks = []
+    current = None
+    start = 0
+    kind = ""
+    for index, line in enumerate(text.splitlines()):
+        stripped = line.strip()
+        if current is None:
+            if stripped.startswith("@start"):
+                current = [line]
+                start = index
+                kind = stripped[len("@start"):].split(None, 1)[0] if len(stripped) > len("@start") else "uml"
+        else:
+            current.append(line)
+            if stripped.startswith("@end"):
+                blocks.append((start, "\n".join(current) + "\n"))
+                current = None
+    if current is not None:
+        current.append(f"@end{kind}")
+        blocks.append((start, "\n".join(current) + "\n"))
+    return blocks
+
+
+def jar_fingerprint(jar_path: str) -> str:
+    """Identifica la versione del jar (dimensione + data di modifica) senza avviare Java"""
+    try:
+        st = os.stat(jar_path)
+    except OSError:
+        return "missing"
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def make_key(text: str, options: dict, jar_version: str) -> str:
+    """Chiave di cache: hash del testo, delle opzioni di render e della versione di PlantUML"""
+    h = hashlib.sha256()
+    h.update(jar_version.encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class PlantUMLProcess:
+    """JVM PlantUML sempre attiva che parla il protocollo -pipe su stdin/stdout.
+
+    Il processo viene avviato al primo render, riavviato se termina
+    inaspettatamente e ucciso se non risponde entro `timeout` secondi
+    (il render successivo ne avvia uno nuovo).
+
+    Con `syntax` il processo usa la modalità -syntax: ogni blocco viene
+    solo analizzato, senza layout né immagine (vedi check_block).
+    """
+
+    def __init__(self, jar_path: str, fmt: str = "png", timeout: float = 60.0, cwd: str = None,
+                 syntax: bool = False):
+        self.jar_path = os.path.abspath(jar_path)
+        self.fmt = fmt
+        self.syntax = syntax
+        self.timeout = timeout
+        self.cwd = cwd
+        self.java_cmd = shutil.which("java")
+        self.delimiter = f"--plantuml-editor-{uuid.uuid4().hex}--".encode("ascii")
+
+        self.restarts = 0
+        self._proc = None
+        self._chunks = None
+        self._buffer = bytearray()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._active_token = None
+
+    # =========================
+    # CICLO DI VITA
+    # =========================
+    def _command(self):
+        return [
+            self.java_cmd, "-Djava.awt.headless=true",
+            "-jar", self.jar_path,
+            "-pipe", "-pipeNoStderr",
+            "-pipedelimitor", self.delimiter.decode("ascii"),
+            "-charset", "UTF-8",
+            "-syntax" if self.syntax else f"-t{self.fmt}",
+        ]
+
+    def _ensure_started(self):
+        if self._closed:
+            raise PlantUMLError("Renderer PlantUML chiuso")
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        if self._proc is not None:
+            self._discard()
+            self.restarts += 1
+        if not self.java_cmd:
+            raise PlantUMLError("Java non trovato nel PATH")
+        if not os.path.exists(self.jar_path):
+            raise PlantUMLError(f"plantuml.jar non trovato: {self.jar_path}")
+
+        self._proc = subprocess.Popen(
+            self._command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.cwd,
+        )
+        self._chunks = queue.Queue()
+        self._buffer = bytearray()
+        reader = threading.Thread(target=self._pump, args=(self._proc.stdout, self._chunks), daemon=True)
+        reader.start()
+
+    @staticmethod
+    def _pump(stream, chunks):
+        # Thread lettore: rende la lettura di stdout interrompibile con un timeout
+        try:
+            while True:
+                data = stream.read1(65536)
+                if not data:
+                    break
+                chunks.put(data)
+        except (OSError, ValueError):
+            pass
+        chunks.put(None)
+
+    def _discard(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            proc.kill()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (proc.stdin, proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def is_running(self) -> bool:
+        proc = self._proc
+        return proc is not None and proc.poll() is None
+
+    def kill(self):
+        """Uccide il processo corrente (anche durante un render); il prossimo render lo riavvia"""
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def cancel(self, token: threading.Event):
+        """Annulla il render associato a `token`: se è già in esecuzione il processo viene ucciso"""
+        token.set()
+        if self._active_token is token:
+            self.kill()
+
+    def close(self):
+        """Chiude il processo in modo pulito (EOF su stdin), poi lo uccide se necessario"""
+        self._closed = True
+        proc = self._proc
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    # =========================
+    # RENDER
+    # =========================
+    def render(self, text: str, token: threading.Event = None) -> bytes:
+        """Renderizza il primo diagramma del testo e restituisce i byte dell'immagine.
+
+        `token` permette di annullare il render con cancel(): se è già
+        impostato quando arriva il turno di questo render, il processo
+        non viene nemmeno interpellato.
+        """
+        blocks = extract_blocks(text)
+        if not blocks:
+            raise PlantUMLError("Nessun blocco @startuml ... @enduml trovato", 1)
+        offset, block = blocks[0]
+        return self.render_block(block, offset, token)
+
+    def render_all(self, text: str, token: threading.Event = None) -> list:
+        """Renderizza tutti i diagrammi del testo, nell'ordine in cui compaiono"""
+        blocks = extract_blocks(text)
+        if not blocks:
+            raise PlantUMLError("Nessun blocco @startuml ... @enduml trovato", 1)
+        return [self.render_block(block, offset, token) for offset, block in blocks]
+
+    def render_block(self, block: str, offset: int = 0, token: threading.Event = None, spans: list = None) -> bytes:
+        """Renderizza un singolo blocco @start/@end; `offset` è la sua prima riga nel documento.
+
+        Se `spans` è una lista vi aggiunge le fasi misurate (nome, inizio,
+        fine, dettagli): scrittura su stdin e attesa dell'output (layout).
+        """
+        payload = block.encode("utf-8")
+
+        with self._lock:
+            self._active_token = token
+            try:
+                for _ in range(2):
+                    if token is not None and token.is_set():
+                        raise PlantUMLCancelled("Render annullato")
+                    cold = not self.is_running()
+                    self._ensure_started()
+                    try:
+                        if spans is None:
+                            self._proc.stdin.write(payload)
+                            self._proc.stdin.flush()
+                            data = self._read_output()
+                        else:
+                            start = time.perf_counter()
+                            self._proc.stdin.write(payload)
+                            self._proc.stdin.flush()
+                            written = time.perf_counter()
+                            data = self._read_output()
+                            spans.append(("write", start, written, {"bytes": len(payload)}))
+                            # Con una JVM appena avviata l'attesa comprende anche l'avvio
+                            spans.append(("layout", written, time.perf_counter(), {"bytes": len(data), "cold": cold}))
+                    except (BrokenPipeError, OSError, EOFError):
+                        # Processo terminato (o ucciso da cancel): riavvio e un solo nuovo tentativo
+                        if self._closed:
+                            break
+                        self._discard()
+                        self.restarts += 1
+                        continue
+                    except PlantUMLTimeout:
+                        self._discard()
+                        raise
+                    return self._parse(data, offset)
+            finally:
+                self._active_token = None
+
+        raise PlantUMLError("Il processo PlantUML è terminato inaspettatamente")
+
+    def check_block(self, block: str, offset: int = 0, token: threading.Event = None):
+        """Controllo di sintassi di un blocco (processo avviato con `syntax`).
+
+        Restituisce None se il blocco è valido, altrimenti il
+        PlantUMLSyntaxError con messaggio e linea nel documento.
+        """
+        try:
+            self.render_block(block, offset, token)
+        except PlantUMLSyntaxError as e:
+            return e
+        return None
+
+    def _read_output(self) -> bytes:
+        deadline = time.monotonic() + self.timeout
+        search_from = 0
+        while True:
+            index = self._buffer.find(self.delimiter, search_from)
+            if index != -1:
+                end = self._buffer.find(b"\n", index)
+                if end != -1:
+                    data = bytes(self._buffer[:index])
+                    del self._buffer[:end + 1]
+                    return data
+            else:
+                search_from = max(0, len(self._buffer) - len(self.delimiter))
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PlantUMLTimeout(f"PlantUML non ha risposto entro {self.timeout:.0f} s")
+            try:
+                chunk = self._chunks.get(timeout=remaining)
+            except queue.Empty:
+                raise PlantUMLTimeout(f"PlantUML non ha risposto entro {self.timeout:.0f} s")
+            if chunk is None:
+                raise EOFError()
+            self._buffer += chunk
+
+    @staticmethod
+    def _parse(data: bytes, offset: int) -> bytes:
+        # Con -pipeNoStderr gli errori arrivano su stdout: "ERROR\n<linea>\n<messaggio>"
+        if data.startswith(b"ERROR"):
+            lines = data.decode("utf-8", errors="replace").splitlines()
+            line = None
+            if len(lines) > 1 and lines[1].strip().lstrip("-").isdigit():
+                line = offset + int(lines[1].strip()) + 1
+            message = "\n".join(lines[2:]).strip() or "Errore PlantUML"
+            raise PlantUMLSyntaxError(message, line)
+        if not data:
+            raise PlantUMLError("PlantUML non ha prodotto alcuna immagine")
+        return data
+
+
+class PlantUMLProcessPool:
+    """Insieme limitato di JVM "calde" condivise tra più thread.
+
+    I processi vengono creati solo quando servono (fino a `size`);
+    acquire() blocca finché uno non è libero.
+    """
+
+    def __init__(self, jar_path: str, fmt: str = "png", size: int = None, timeout: float = 60.0, cwd: str = None):
+        self.jar_path = jar_path
+        self.fmt = fmt
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.timeout = timeout
+        self.cwd = cwd
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> PlantUMLProcess:
+        if self._closed:
+            raise PlantUMLError("Renderer PlantUML chiuso")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                process = PlantUMLProcess(self.jar_path, fmt=self.fmt, timeout=self.timeout, cwd=self.cwd)
+                self._all.append(process)
+                return process
+        return self._idle.get()
+
+    def release(self, process: PlantUMLProcess):
+        self._idle.put(process)
+
+    def render_block(self, block: str, offset: int = 0, token: threading.Event = None, spans: list = None) -> bytes:
+        """Come PlantUMLProcess.render_block, sul primo processo libero"""
+        process = self.acquire()
+        try:
+            return process.render_block(block, offset, token, spans)
+        finally:
+            self.release(process)
+
+    def cancel(self, token: threading.Event):
+        """Annulla il render associato a `token`, su qualunque processo sia in corso"""
+        token.set()
+        for process in list(self._all):
+            process.cancel(token)
+
+    def kill_all(self):
+        """Interrompe i render in corso (usato per annullare un export)"""
+        for process in list(self._all):
+            process.kill()
+
+    def close(self):
+        self._closed = True
+        for process in list(self._all):
+            process.close()
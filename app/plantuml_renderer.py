@@ -1,78 +1,634 @@
-from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, QThreadPool, QTimer
-import subprocess
-from pathlib import Path
+import bisect
 import os
-import shutil
-import re
+import threading
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, QThreadPool, QTimer
+from PyQt6.QtGui import QImage
+
+from app.plantuml_process import (
+    PlantUMLProcess, PlantUMLProcessPool, PlantUMLError, PlantUMLCancelled, extract_blocks, jar_fingerprint,
+    make_key
+)
+from app.plantuml_http import PlantUMLServerClient, PlantUMLServerConnection
+from app.debounce_policy import AdaptiveDebounce
+from app.dependency_index import absolute_includes
+from app.render_cache import RenderCache
+from app.render_metrics import RenderMetrics, RenderTrace
+from app.syntax_check import SyntaxChecker
+
+
+class RenderJob:
+    """Una richiesta di render per un documento, con la sua generazione.
+
+    `blocks` sono i diagrammi da renderizzare: tuple
+    (indice del blocco, prima riga nel documento, testo, chiave di cache).
+    """
+    def __init__(self, doc, generation: int, blocks: list, fmt: str = "png", revision=None, trace=None,
+                 priority: int = 0):
+        self.doc = doc
+        self.generation = generation
+        self.blocks = blocks
+        self.fmt = fmt
+        self.revision = revision  # revisione del documento da cui viene il testo
+        self.priority = priority  # nella coda dei thread: il documento attivo passa davanti
+        self.token = threading.Event()
+        self.started_at = None
+        self.elapsed_ms = None
+        self.errors = 0
+        self.invalid = 0  # blocchi non inviati perché noti non validi (controllo di sintassi)
+        self.trace = trace  # RenderTrace, None se la raccolta dei tempi è spenta
+
 
 class PlantUMLRendererWorkerSignals(QObject):
-    finished = pyqtSignal(str)   # percorso immagine generato
-    error = pyqtSignal(str, int) # messaggio, linea errore
+    block_ready = pyqtSignal(object, int, bytes, object)  # job, indice blocco, byte, QImage (None per SVG)
+    block_error = pyqtSignal(object, int, str, object)    # job, indice blocco, messaggio, linea errore
+    finished = pyqtSignal(object)                         # job completato
+    error = pyqtSignal(object, str, object)               # job interrotto: messaggio, linea errore (o None)
 
-class PlantUMLRendererWorker(QRunnable):
-    ERROR_LINE_RE = re.compile(r"line\s+(\d+)", re.IGNORECASE)
 
-    def __init__(self, jar_path: str, text: str):
+class PlantUMLRendererWorker(QRunnable):
+    def __init__(self, process, job: RenderJob, cache=None):
         super().__init__()
-        self.jar_path = os.path.abspath(jar_path)
-        self.text = text
+        self.process = process
+        self.job = job
+        self.cache = cache
         self.signals = PlantUMLRendererWorkerSignals()
-        self.java_cmd = shutil.which("java")
-        self.cache_dir = Path.home() / ".cache" / "plantuml-editor"
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
 
     def run(self):
-        src = self.cache_dir / "diagram.puml"
-        out = self.cache_dir / "diagram.png"
-        src.write_text(self.text, encoding="utf-8")
-
-        cmd = [self.java_cmd, "-jar", self.jar_path, str(src)]
+        start = time.perf_counter()
+        trace = self.job.trace
+        if trace is not None:
+            trace.span("queue", trace.submitted_at, start)
         try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-
-            if result.returncode != 0 or not out.exists():
-                err_msg = result.stderr.strip() or "Errore PlantUML"
-                line = None
-                match = self.ERROR_LINE_RE.search(err_msg)
-                if match:
-                    line = int(match.group(1))
-                self.signals.error.emit(err_msg, line)
-                return
-
-            self.signals.finished.emit(str(out))
+            for index, offset, text, key in self.job.blocks:
+                # Testo su stdin e byte dell'immagine da stdout: nessun file temporaneo
+                try:
+                    data = self.process.render_block(text, offset, self.job.token,
+                                                     trace.spans if trace is not None else None)
+                except PlantUMLCancelled:
+                    raise
+                except PlantUMLError as e:
+                    # Un diagramma con errori non blocca gli altri
+                    self.signals.block_error.emit(self.job, index, str(e), e.line)
+                    continue
+                # Decodifica qui, fuori dal thread della GUI (QImage è thread-safe, QPixmap no)
+                if trace is None:
+                    image = None if self.job.fmt == "svg" else QImage.fromData(data)
+                    if self.cache is not None:
+                        self.cache.put(key, data, image, self.job.fmt)
+                else:
+                    trace.output_bytes += len(data)
+                    decode_start = time.perf_counter()
+                    image = None if self.job.fmt == "svg" else QImage.fromData(data)
+                    write_start = time.perf_counter()
+                    trace.span("decode", decode_start, write_start, block=index)
+                    if self.cache is not None:
+                        self.cache.put(key, data, image, self.job.fmt)
+                        trace.span("cache_write", write_start, block=index)
+                self.signals.block_ready.emit(self.job, index, data, image)
+            self.job.elapsed_ms = (time.perf_counter() - start) * 1000
+            self.signals.finished.emit(self.job)
 
+        except PlantUMLCancelled as e:
+            self.signals.error.emit(self.job, str(e), None)
         except Exception as e:
-            self.signals.error.emit(str(e), None)
+            self.signals.error.emit(self.job, str(e), None)
+
+
+class _DocState:
+    def __init__(self):
+        self.generation = 0
+        self.running = None
+        self.pending = None
+
+
+class RenderScheduler(QObject):
+    """Scheduler "latest wins": al più un render in esecuzione per documento.
+
+    Ogni richiesta incrementa la generazione del documento. Una richiesta
+    in attesa viene sostituita da quella nuova prima di partire; un render
+    in corso diventato obsoleto viene annullato, uccidendo il processo solo
+    se dura da più di `kill_after_ms` (riavviare la JVM costa più di
+    lasciar finire un render breve). I risultati di generazioni superate
+    vengono scartati e non arrivano mai alla preview (ma il worker li ha
+    già salvati nella cache, dove restano validi per il loro contenuto).
+
+    Con `priority` più alta un job passa davanti a quelli in coda (il
+    documento attivo davanti ai render in background).
+    """
+    rendered = pyqtSignal(object, int, bytes, object)  # job, indice blocco, byte, QImage (None per SVG)
+    failed = pyqtSignal(object, object, str, object)   # job, indice blocco (None = tutto il job), messaggio, linea
+    completed = pyqtSignal(object)                     # job terminato con tutti i suoi blocchi
+    timed = pyqtSignal(object, float)                  # documento, durata del render in ms
+
+    def __init__(self, process_factory, cache=None, kill_after_ms: int = 1500, parent=None):
+        super().__init__(parent)
+        self.process_factory = process_factory
+        self.cache = cache
+        self.kill_after_ms = kill_after_ms
+        self.threadpool = QThreadPool()
+        # Almeno due thread: un render in background non blocca quello del documento attivo
+        self.threadpool.setMaxThreadCount(max(2, self.threadpool.maxThreadCount()))
+        self._docs = {}
+        self.dropped = 0
+        self.cancelled = 0
+
+    def _state(self, doc) -> _DocState:
+        state = self._docs.get(id(doc))
+        if state is None:
+            state = self._docs[id(doc)] = _DocState()
+        return state
+
+    # =========================
+    # RICHIESTE
+    # =========================
+    def submit(self, doc, blocks: list, fmt: str = "png", revision=None, trace=None, priority: int = 0):
+        """Accoda il render più recente per `doc`, superando quelli precedenti"""
+        state = self._state(doc)
+        self.supersede(doc)
+        job = RenderJob(doc, state.generation, blocks, fmt, revision, trace, priority)
+        if trace is not None:
+            trace.submitted_at = time.perf_counter()
+        if state.running is None:
+            self._start(state, job)
+        else:
+            state.pending = job
+        return job
+
+    def supersede(self, doc):
+        """Rende obsoleti tutti i render di `doc` (es. risultato già disponibile in cache)"""
+        state = self._state(doc)
+        state.generation += 1
+        if state.pending is not None:
+            state.pending = None
+            self.dropped += 1
+        if state.running is not None and not state.running.token.is_set():
+            self._cancel_running(state.running)
+
+    def supersede_all(self):
+        """Rende obsoleti i render di tutti i documenti (es. cambio di formato)"""
+        for state in self._docs.values():
+            state.generation += 1
+            state.pending = None
+            if state.running is not None and not state.running.token.is_set():
+                self._cancel_running(state.running)
+
+    def is_busy(self, doc) -> bool:
+        """True se `doc` ha un render in corso o in attesa"""
+        state = self._docs.get(id(doc))
+        return state is not None and (state.running is not None or state.pending is not None)
+
+    def forget(self, doc):
+        """Chiamato alla chiusura di un documento"""
+        state = self._docs.pop(id(doc), None)
+        if state is not None:
+            state.pending = None
+            if state.running is not None and not state.running.token.is_set():
+                self._cancel_running(state.running)
+
+    def _cancel_running(self, job: RenderJob):
+        # Il token impostato scarta il render se non è ancora partito
+        job.token.set()
+        self.cancelled += 1
+        elapsed_ms = (time.monotonic() - job.started_at) * 1000
+        if elapsed_ms >= self.kill_after_ms:
+            self.process_factory().cancel(job.token)
+        else:
+            # Lascia finire un render breve; se dura ancora, lo interrompe
+            QTimer.singleShot(int(self.kill_after_ms - elapsed_ms) + 1, lambda: self._kill_if_running(job))
+
+    def _kill_if_running(self, job: RenderJob):
+        state = self._docs.get(id(job.doc))
+        if state is not None and state.running is job:
+            self.process_factory().cancel(job.token)
+
+    def _start(self, state: _DocState, job: RenderJob):
+        state.running = job
+        job.started_at = time.monotonic()
+        runner = PlantUMLRendererWorker(self.process_factory(), job, self.cache)
+        runner.signals.block_ready.connect(self._on_block_ready)
+        runner.signals.block_error.connect(self._on_block_error)
+        runner.signals.finished.connect(self._on_finished)
+        runner.signals.error.connect(self._on_error)
+        self.threadpool.start(runner, job.priority)
+
+    # =========================
+    # RISULTATI
+    # =========================
+    def _is_current(self, job: RenderJob) -> bool:
+        state = self._docs.get(id(job.doc))
+        return state is not None and state.running is job and job.generation == state.generation
+
+    def _on_block_ready(self, job: RenderJob, index: int, data: bytes, image):
+        # I blocchi arrivano uno alla volta: la preview si aggiorna senza aspettare gli altri
+        if self._is_current(job):
+            self.rendered.emit(job, index, data, image)
+
+    def _on_block_error(self, job: RenderJob, index: int, message: str, line):
+        if self._is_current(job):
+            job.errors += 1
+            self.failed.emit(job, index, message, line)
+
+    def _job_done(self, job: RenderJob) -> bool:
+        """Libera lo slot del documento, avvia l'eventuale richiesta in attesa.
+        Restituisce True se il risultato è ancora quello più recente."""
+        state = self._docs.get(id(job.doc))
+        if state is None or state.running is not job:
+            return False
+        state.running = None
+        if state.pending is not None:
+            pending, state.pending = state.pending, None
+            self._start(state, pending)
+        return job.generation == state.generation
+
+    def _on_finished(self, job: RenderJob):
+        self.timed.emit(job.doc, job.elapsed_ms)
+        if self._job_done(job):
+            self.completed.emit(job)
+
+    def _on_error(self, job: RenderJob, message: str, line):
+        if self._job_done(job):
+            job.errors += 1
+            self.failed.emit(job, None, message, line)
+
+    def shutdown(self, timeout_ms: int = 3000):
+        for state in self._docs.values():
+            state.pending = None
+            if state.running is not None:
+                state.running.token.set()
+        self.threadpool.clear()
+        self.threadpool.waitForDone(timeout_ms)
+
+
+class AsyncPlantUMLPreview(QObject):
+    """Gestisce render asincrono e debounce adattivo per live preview.
+
+    Il debounce vero e proprio è il timer di MainWindow: il ritardo viene
+    chiesto a `debounce.delay_for(documento)`, che impara dai tempi di
+    render misurati qui. Il formato è "png" (preview raster) oppure "svg"
+    (preview vettoriale a tasselli).
+
+    Ogni documento (EditorWidget) conserva l'ultimo risultato, l'errore e
+    la revisione che li ha prodotti: cambiando tab il risultato viene
+    mostrato subito e si renderizza solo se il documento è cambiato.
+
+    Un file può contenere più diagrammi (@startuml ... @enduml): ogni
+    blocco ha la sua chiave di cache e diventa una pagina della preview.
+    Dopo una modifica si renderizzano solo i blocchi il cui testo è
+    cambiato, a partire da quello sotto il cursore.
+
+    Con un indice delle dipendenze (`dependencies`) la chiave di cache
+    include anche i file !include-ati: refresh() rigenera in background,
+    in parallelo su `processes` JVM, i documenti che li usano.
+
+    lint() esegue solo il controllo di sintassi (vedi SyntaxChecker), con
+    tutti gli errori trovati in `lint_finished`; i blocchi noti non validi
+    non vengono più inviati al render.
+
+    Con set_server() i render vanno a un server compatibile con PlantUML
+    server (es. quello locale di render_server) invece che a JVM proprie:
+    più editor ed export condividono così le stesse JVM e la stessa cache.
+    """
+    FORMATS = ("png", "svg")
 
+    result_ready = pyqtSignal(object)             # documento con un nuovo risultato
+    render_failed = pyqtSignal(object, str, object)  # documento, messaggio, linea errore
+    timings_updated = pyqtSignal()                # nuova traccia nel ring buffer dei tempi
+    lint_finished = pyqtSignal(object, object, list)  # documento, revisione, errori [(linea, messaggio)]
+    render_finished = pyqtSignal(object)          # documento senza più render in corso (riuscito o no)
 
-class AsyncPlantUMLPreview:
-    """Gestisce render asincrono e debounce per live preview"""
-    def __init__(self, jar_path: str, preview_widget, editor_widget=None, debounce_ms=500):
+    def __init__(self, jar_path: str, preview_widget, cache=None, debounce=None, fmt="png", processes: int = 2):
+        super().__init__()
         self.jar_path = jar_path
         self.preview_widget = preview_widget
-        self.editor_widget = editor_widget
-        self.threadpool = QThreadPool()
-        self.debounce_timer = QTimer()
-        self.debounce_timer.setSingleShot(True)
-        self.debounce_timer.timeout.connect(self._render_now)
-        self.last_text = ""
-
-        self.debounce_ms = debounce_ms
-
-    def render(self, text: str):
-        self.last_text = text
-        self.debounce_timer.start(self.debounce_ms)
-
-    def _render_now(self):
-        worker = PlantUMLRendererWorker(self.jar_path, self.last_text)
-        worker.signals.finished.connect(self.preview_widget.update_image)
-        if self.editor_widget:
-            worker.signals.error.connect(
-                lambda msg, line: self.editor_widget.highlight_error_line(line) if line else None
-            )
-        self.threadpool.start(worker)
+        self.last_doc = None
+        self.format = fmt
+        self.processes = processes
+        self.process = None  # pool di JVM "calde" (o di connessioni al server), avviate al primo render
+        self.syntax_process = None  # JVM in modalità -syntax, avviata al primo controllo
+        self.dependencies = None  # DependencyIndex del progetto aperto
+        self.metrics = None       # RenderMetrics; None = raccolta dei tempi spenta (costo zero)
+        self.cache = cache or RenderCache()
+        self.jar_version = jar_fingerprint(jar_path)
+        self.server_url = None  # URL del server di render; None = JVM locali
+        self.server_start = None  # avvio del server locale, eseguito dal primo render
+        self.debounce = debounce or AdaptiveDebounce()
+
+        self.scheduler = RenderScheduler(self._get_process, self.cache)
+        self.scheduler.rendered.connect(self._on_rendered)
+        self.scheduler.failed.connect(self._on_failed)
+        self.scheduler.completed.connect(self._on_completed)
+        self.scheduler.timed.connect(self.debounce.record)
+
+        self.checker = SyntaxChecker(self._get_syntax_process, parent=self)
+        self.checker.checked.connect(self.lint_finished)
+
+    def set_format(self, fmt: str):
+        """Cambia formato della preview; la JVM del formato precedente viene chiusa"""
+        if fmt not in self.FORMATS or fmt == self.format:
+            return
+        self.scheduler.supersede_all()
+        if self.process is not None:
+            self.process.close()
+            self.process = None
+        self.format = fmt
+
+    def set_dependencies(self, index):
+        """Indice delle dipendenze del progetto; le JVM ripartono nella cartella del progetto"""
+        self.dependencies = index
+        if self.process is not None:
+            self.scheduler.supersede_all()
+            self.process.close()
+            self.process = None
+        if self.syntax_process is not None:
+            self.syntax_process.close()
+            self.syntax_process = None
+            self.checker.shutdown()
+
+    def set_server(self, url: str = None, start=None):
+        """Render tramite il server `url` (None = JVM locali); i processi attuali vengono chiusi.
+
+        `start` avvia il server se serve (vedi render_server.server_backend):
+        la chiama il primo render, mai il thread della GUI.
+        """
+        url = url or None
+        self.server_start = start
+        if url == self.server_url:
+            return
+        self.scheduler.supersede_all()
+        if self.process is not None:
+            self.process.close()
+            self.process = None
+        if self.syntax_process is not None:
+            self.syntax_process.close()
+            self.syntax_process = None
+            self.checker.shutdown()
+        self.server_url = url
+        # Un altro renderer può produrre immagini diverse: chiavi di cache distinte
+        self.jar_version = f"server:{url}" if url else jar_fingerprint(self.jar_path)
+
+    def set_metrics_enabled(self, enabled: bool):
+        """Accende o spegne la raccolta dei tempi di render"""
+        if enabled and self.metrics is None:
+            self.metrics = RenderMetrics()
+        elif not enabled:
+            self.metrics = None
+
+    def render(self, text: str, doc=None, revision=None, cursor_line: int = None, requested_at: float = None):
+        """Mostra subito i diagrammi già in cache e renderizza solo quelli cambiati.
+
+        `requested_at` (time.perf_counter) è l'istante della prima modifica:
+        la differenza con ora è il tempo passato nel debounce.
+        """
+        self.last_doc = doc
+        self._request(text, doc, revision, cursor_line, requested_at, priority=1)
+
+    def refresh(self, text: str, doc, revision=None):
+        """Rigenera `doc` in background senza cambiare il documento mostrato"""
+        self._request(text, doc, revision)
+
+    def cancel(self, doc):
+        """Interrompe il render di `doc`; resta da rifare (needs_render) ma quanto già pronto è in cache"""
+        self.scheduler.supersede(doc)
+        self._mark_requested(doc, None)
+
+    def invalidate(self, doc):
+        """Il risultato di `doc` non è più valido anche se il testo non è cambiato (es. un !include)"""
+        self._mark_requested(doc, None)
+
+    def is_busy(self, doc) -> bool:
+        return self.scheduler.is_busy(doc)
+
+    def lint(self, text: str, doc, revision=None):
+        """Controllo di sintassi di tutti i diagrammi di `doc`, senza layout"""
+        options = self._syntax_options(doc)
+        blocks = [(offset, self._render_text(doc, block), make_key(block, options, self.jar_version))
+                  for offset, block in extract_blocks(text)]
+        self.checker.check(doc, revision, blocks)
+
+    def lint_pending(self, doc) -> bool:
+        """True se un controllo di `doc` è in corso su una JVM già avviata (risposta imminente)"""
+        return (self.checker.pending(doc) and self.syntax_process is not None
+                and self.syntax_process.is_running())
+
+    def _options(self, doc) -> dict:
+        options = {"format": self.format}
+        path = getattr(doc, "current_file", None)
+        if self.dependencies is not None and path:
+            signature = self.dependencies.signature(path)
+            if signature:
+                options["includes"] = signature
+        return options
+
+    def _render_text(self, doc, block: str) -> str:
+        """Testo inviato a PlantUML: !include relativi risolti rispetto al file del documento"""
+        project_dir = self.dependencies.project_dir if self.dependencies is not None else None
+        return absolute_includes(block, getattr(doc, "current_file", None), project_dir)
+
+    def _syntax_options(self, doc) -> dict:
+        # L'esito del controllo non dipende dal formato, ma dagli !include sì
+        options = self._options(doc)
+        options["format"] = "syntax"
+        return options
+
+    def _request(self, text: str, doc, revision, cursor_line: int = None, requested_at: float = None,
+                 priority: int = 0):
+        trace = None
+        if self.metrics is not None:
+            now = time.perf_counter()
+            path = getattr(doc, "current_file", None)
+            trace = RenderTrace(os.path.basename(path) if path else "", self.format, requested_at or now)
+            if requested_at is not None:
+                trace.span("debounce", requested_at, now)
+        self._mark_requested(doc, revision)
+        blocks = extract_blocks(text)
+        if hasattr(doc, "diagram_starts"):
+            doc.diagram_starts = [offset for offset, _ in blocks]
+        if not blocks:
+            self.scheduler.supersede(doc)
+            if trace is not None:
+                trace.error = "Nessun blocco @startuml ... @enduml trovato"
+                self._record(trace)
+            self._store_error(doc, revision, "Nessun blocco @startuml ... @enduml trovato", 1)
+            self.render_failed.emit(doc, "Nessun blocco @startuml ... @enduml trovato", 1)
+            self.render_finished.emit(doc)
+            return
+
+        lookup_start = time.perf_counter()
+        previous = self._stored_pages(doc)
+        options = self._options(doc)
+        syntax_options = self._syntax_options(doc)
+        pages, missing, invalid = [], [], []
+        for index, (offset, block) in enumerate(blocks):
+            key = make_key(block, options, self.jar_version)
+            page = self.cache.get(key, self.format)
+            if page is None:
+                error = self.checker.known_error(make_key(block, syntax_options, self.jar_version))
+                if error is not None:
+                    # Diagramma noto non valido: il render fallirebbe comunque
+                    line, message = error
+                    invalid.append((message, offset + line if line else offset + 1))
+                else:
+                    missing.append((index, offset, self._render_text(doc, block), key))
+                # Finché arriva il nuovo render resta visibile la versione precedente
+                page = previous[index] if index < len(previous) else None
+            pages.append(page)
+        self._store_pages(doc, pages)
+        if trace is not None:
+            trace.span("cache_lookup", lookup_start)
+            trace.blocks = len(blocks)
+            trace.cache_misses = len(missing)
+            trace.cache_hits = len(blocks) - len(missing) - len(invalid)
+        if doc is self.last_doc:
+            paint_start = time.perf_counter()
+            self.preview_widget.update_pages(self.format, pages)
+            if trace is not None:
+                trace.span("paint", paint_start)
+
+        if invalid:
+            message, line = invalid[0]
+            if trace is not None:
+                trace.error = message
+            self._store_error(doc, revision, message, line)
+            self.render_failed.emit(doc, message, line)
+
+        if not missing:
+            self.scheduler.supersede(doc)
+            if trace is not None:
+                self._record(trace)
+            if not invalid:
+                self._store_result(doc, revision)
+                self.result_ready.emit(doc)
+            self.render_finished.emit(doc)
+            return
+
+        if cursor_line is not None:
+            current = self.block_index(doc, cursor_line)
+            missing.sort(key=lambda block: block[0] != current)
+        job = self.scheduler.submit(doc, missing, self.format, revision, trace, priority)
+        job.invalid = len(invalid)
+
+    # =========================
+    # RISULTATI PER DOCUMENTO
+    # =========================
+    def needs_render(self, doc) -> bool:
+        """True se l'ultimo render richiesto per `doc` non corrisponde più al documento"""
+        requested = getattr(doc, "requested_render", None)
+        return requested != (doc.document().revision(), self.format)
+
+    def show_stored(self, doc):
+        """Rende `doc` il documento attivo e mostra subito il suo ultimo risultato"""
+        self.last_doc = doc
+        self.preview_widget.update_pages(self.format, self._stored_pages(doc))
+
+    @staticmethod
+    def block_index(doc, line: int) -> int:
+        """Indice del diagramma che contiene la riga `line` (0 = primo)"""
+        starts = getattr(doc, "diagram_starts", None) or [0]
+        return max(0, bisect.bisect_right(starts, line) - 1)
+
+    def _stored_pages(self, doc) -> list:
+        result = getattr(doc, "render_result", None)
+        if result is None or result[0] != self.format:
+            return []
+        return result[1]
+
+    def _store_pages(self, doc, pages: list):
+        if hasattr(doc, "render_result"):
+            doc.render_result = (self.format, pages)
+
+    def _mark_requested(self, doc, revision):
+        if hasattr(doc, "requested_render"):
+            doc.requested_render = (revision, self.format)
+
+    def _store_result(self, doc, revision):
+        if hasattr(doc, "render_result"):
+            doc.render_error = None
+            doc.result_revision = revision
+
+    def _store_error(self, doc, revision, message, line):
+        if hasattr(doc, "render_error"):
+            doc.render_error = (message, line)
+            doc.result_revision = revision
+
+    def delay_for(self, doc) -> int:
+        """Ritardo di debounce (ms) per il documento"""
+        return self.debounce.delay_for(doc)
+
+    def forget(self, doc):
+        """Annulla i render di un documento chiuso"""
+        self.scheduler.forget(doc)
+        self.checker.forget(doc)
+        self.debounce.forget(doc)
+        if self.last_doc is doc:
+            self.last_doc = None
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def _get_process(self):
+        if self.process is None and self.server_url:
+            self.process = PlantUMLServerClient(self.server_url, fmt=self.format, size=self.processes,
+                                                start=self.server_start)
+        if self.process is None:
+            # Gli !include relativi vengono risolti da PlantUML rispetto alla cartella di lavoro
+            cwd = self.dependencies.project_dir if self.dependencies is not None else None
+            self.process = PlantUMLProcessPool(self.jar_path, fmt=self.format, size=self.processes, cwd=cwd)
+        return self.process
+
+    def _get_syntax_process(self):
+        if self.syntax_process is None and self.server_url:
+            self.syntax_process = PlantUMLServerConnection(self.server_url, "syntax", timeout=10.0,
+                                                           start=self.server_start)
+        if self.syntax_process is None:
+            cwd = self.dependencies.project_dir if self.dependencies is not None else None
+            self.syntax_process = PlantUMLProcess(self.jar_path, timeout=10.0, cwd=cwd, syntax=True)
+        return self.syntax_process
+
+    def _on_rendered(self, job: RenderJob, index: int, data: bytes, image):
+        # Decodifica e scrittura in cache le ha già fatte il worker:
+        # qui resta solo la conversione in pixmap della pagina
+        if job.fmt != self.format:
+            return
+        page = data if job.fmt == "svg" else image
+        pages = self._stored_pages(job.doc)
+        if index < len(pages):
+            pages[index] = page
+        if job.doc is self.last_doc:
+            paint_start = time.perf_counter()
+            self.preview_widget.update_page(job.fmt, index, page)
+            if job.trace is not None:
+                job.trace.span("paint", paint_start, block=index)
+
+    def _on_failed(self, job: RenderJob, index, message: str, line):
+        if job.trace is not None:
+            job.trace.error = message
+            if index is None:  # job interrotto: non arriverà _on_completed
+                self._record(job.trace)
+        self._store_error(job.doc, job.revision, message, line)
+        self.render_failed.emit(job.doc, message, line)
+        if index is None:
+            self.render_finished.emit(job.doc)
+
+    def _on_completed(self, job: RenderJob):
+        if job.trace is not None:
+            self._record(job.trace)
+        if job.fmt == self.format and not job.errors and not job.invalid:
+            self._store_result(job.doc, job.revision)
+            self.result_ready.emit(job.doc)
+        self.render_finished.emit(job.doc)
+
+    def _record(self, trace: RenderTrace):
+        if self.metrics is not None:
+            self.metrics.record(trace)
+            self.timings_updated.emit()
+
+    def shutdown(self):
+        """Ferma i render in coda e chiude la JVM (chiamato alla chiusura della finestra)"""
+        if self.process is not None:
+            self.process.close()
+        if self.syntax_process is not None:
+            self.syntax_process.close()
+        self.scheduler.shutdown()
+        self.checker.shutdown()
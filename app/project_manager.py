@@ -2,11 +2,33 @@ import os
 import json
 
 
+def is_skipped_dir(path: str, excluded=frozenset()) -> bool:
+    """Cartelle che albero, indici ed export ignorano: nascoste (.git, .venv, ...) e quelle in `excluded`"""
+    return os.path.basename(path).startswith(".") or os.path.abspath(path) in excluded
+
+
+def find_puml_files(project_path: str, excluded=()):
+    """Tutti i file .puml del progetto (ricerca ricorsiva) con le regole dell'albero file.
+
+    Salta le cartelle di is_skipped_dir (`excluded`: percorsi, es. la
+    cartella di output dell'export) e non segue i link simbolici a cartelle.
+    """
+    excluded = frozenset(os.path.abspath(path) for path in excluded)
+    for root, dirs, files in os.walk(project_path):  # followlinks=False
+        dirs[:] = [name for name in dirs if not is_skipped_dir(os.path.join(root, name), excluded)]
+        for file in files:
+            if file.endswith(".puml"):
+                yield os.path.join(root, file)
+
+
 class ProjectManager:
     def __init__(self):
         self.project_dir = None
         self.project_file = None
         self.project_data = None
+        self.dependencies = None  # grafo degli !include, costruito da build() in background
+        self.symbols = None       # indice delle dichiarazioni, con sidecar accanto al .tsp
+        self.text_index = None    # indice a trigrammi per la ricerca nei file, con sidecar
 
     def create_project(self, tsp_path: str, name: str) -> bool:
         try:
@@ -27,13 +49,77 @@ class ProjectManager:
     def is_workspace(self, folder: str) -> bool:
         return any(f.endswith(".tsp") for f in os.listdir(folder))
 
-    def open_project(self, folder: str):
-        tsp_files = [f for f in os.listdir(folder) if f.endswith(".tsp")]
-        if not tsp_files:
-            raise RuntimeError("Invalid workspace")
+    def open_project(self, folder: str, tsp_file: str = None):
+        if tsp_file is None:
+            tsp_files = [f for f in os.listdir(folder) if f.endswith(".tsp")]
+            if not tsp_files:
+                raise RuntimeError("Invalid workspace")
+            tsp_file = tsp_files[0]
 
         self.project_dir = folder
-        self.project_file = os.path.join(folder, tsp_files[0])
+        self.project_file = os.path.join(folder, os.path.basename(tsp_file))
 
         with open(self.project_file, "r", encoding="utf-8") as f:
             self.project_data = json.load(f)
+
+        # Importati qui: all'avvio, senza un progetto aperto, non servono
+        from app.dependency_index import DependencyIndex
+        from app.symbol_index import SymbolIndex
+        from app.text_index import TextIndex
+        self.dependencies = DependencyIndex(folder)
+        base = os.path.splitext(self.project_file)[0]
+        self.symbols = SymbolIndex(folder, base + ".symbols.json")
+        self.text_index = TextIndex(folder, base + ".search.idx")
+
+    def export_dir(self) -> str:
+        """Cartella di output dell'export (chiave "export" del .tsp; relativa al progetto)"""
+        output = self.get_setting("export", {}).get("output") or "export"
+        return os.path.abspath(os.path.join(self.project_dir, output))
+
+    def excluded_dirs(self) -> list:
+        """Cartelle del progetto da non mostrare né indicizzare, oltre a quelle nascoste"""
+        return [self.export_dir()] if self.project_dir else []
+
+    def puml_files(self):
+        return find_puml_files(self.project_dir, self.excluded_dirs()) if self.project_dir else iter(())
+
+    def build_indexes(self):
+        """Costruisce grafo delle dipendenze, indice dei simboli e indice di ricerca (da un thread di lavoro)"""
+        dependencies, symbols, text_index = self.dependencies, self.symbols, self.text_index
+        files = list(self.puml_files())
+        dependencies.build(files)
+        symbols.build(files)
+        text_index.build(files)
+
+    def update_indexes(self, paths):
+        """Aggiorna simboli e indice di ricerca per i file salvati, aggiunti o rimossi (da un thread di lavoro)"""
+        symbols, text_index = self.symbols, self.text_index
+        if symbols is None:
+            return
+        for path in paths:
+            # update_file rimuove anche i file che non esistono più
+            symbols.update_file(path)
+            text_index.update_file(path)
+        symbols.prepare()
+        symbols.save()
+        text_index.compact()
+        text_index.save()
+
+    def get_setting(self, name: str, default=None):
+        """Legge un'impostazione del progetto dal file .tsp (es. "debounce")"""
+        if not self.project_data:
+            return default
+        return self.project_data.get(name, default)
+
+    def set_setting(self, name: str, value):
+        """Salva un'impostazione del progetto nel file .tsp"""
+        if self.project_data is None:
+            return
+        self.project_data[name] = value
+        tmp = self.project_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.project_data, f, indent=4)
+            os.replace(tmp, self.project_file)
+        except OSError as e:
+            print("Errore salvando le impostazioni del progetto:", e)
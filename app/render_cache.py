@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PyQt6.QtGui import QImage
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "plantuml-editor"
+
+
+class RenderCache:
+    """Cache dei render indicizzata per contenuto.
+
+    Due livelli: LRU in memoria di immagini già decodificate (limite in byte)
+    e file su disco `<chiave>.<formato>` con limite di dimensione totale,
+    evitando sempre i meno usati di recente. I formati vettoriali (SVG)
+    restano in memoria come byte, da disegnare a tasselli nella preview.
+    """
+    VECTOR_FORMATS = ("svg",)
+
+    def __init__(self, cache_dir=None, memory_limit=128 * 1024 * 1024, disk_limit=512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR / "renders")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # chiave -> QImage (o byte per i formati vettoriali)
+        self._memory_size = 0
+        self._disk = OrderedDict()    # nome file -> dimensione (ordine = LRU)
+        self._disk_size = 0
+        self._scan_disk()
+
+    def _scan_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_size += size
+
+    # =========================
+    # LETTURA
+    # =========================
+    def get(self, key: str, fmt: str = "png"):
+        """Restituisce la QImage (byte per SVG) in cache, dalla memoria o dal disco, oppure None"""
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return image
+
+            name = f"{key}.{fmt}"
+            if name not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(name)
+
+        path = self.cache_dir / name
+        if fmt in self.VECTOR_FORMATS:
+            try:
+                image = path.read_bytes()
+            except OSError:
+                image = None
+        else:
+            image = QImage(str(path))
+        if self._is_empty(image):
+            with self._lock:
+                self._forget_disk(name)
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, image)
+        return image
+
+    def get_bytes(self, key: str, fmt: str = "png"):
+        """Byte originali dal livello su disco (es. per SVG o export), oppure None"""
+        name = f"{key}.{fmt}"
+        with self._lock:
+            if name not in self._disk:
+                return None
+            self._disk.move_to_end(name)
+        try:
+            return (self.cache_dir / name).read_bytes()
+        except OSError:
+            with self._lock:
+                self._forget_disk(name)
+            return None
+
+    # =========================
+    # SCRITTURA
+    # =========================
+    def put(self, key: str, data: bytes, image=None, fmt: str = "png"):
+        """Salva i byte su disco (scrittura atomica) e l'immagine decodificata in memoria.
+        Per i formati vettoriali in memoria finiscono i byte stessi."""
+        name = f"{key}.{fmt}"
+        path = self.cache_dir / name
+        tmp = path.with_name(name + ".tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        else:
+            with self._lock:
+                self._forget_disk(name)
+                self._disk[name] = len(data)
+                self._disk_size += len(data)
+                self._evict_disk()
+
+        if fmt in self.VECTOR_FORMATS:
+            image = data
+        if not self._is_empty(image):
+            with self._lock:
+                self._remember(key, image)
+
+    @staticmethod
+    def _is_empty(value) -> bool:
+        if value is None:
+            return True
+        return len(value) == 0 if isinstance(value, bytes) else value.isNull()
+
+    @staticmethod
+    def _size_of(value) -> int:
+        return len(value) if isinstance(value, bytes) else value.sizeInBytes()
+
+    def _remember(self, key, image):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= self._size_of(old)
+        self._memory[key] = image
+        self._memory_size += self._size_of(image)
+        while self._memory_size > self.memory_limit and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= self._size_of(evicted)
+
+    def _forget_disk(self, name):
+        size = self._disk.pop(name, None)
+        if size is not None:
+            self._disk_size -= size
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_limit and len(self._disk) > 1:
+            name, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self.cache_dir / name)
+            except OSError:
+                pass
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+    # =========================
+    # STATISTICHE
+    # =========================
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_size,
+            }
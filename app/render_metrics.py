@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class RenderTrace:
+    """Tempi di un render della preview, fase per fase.
+
+    Ogni fase è uno span (nome, inizio, fine, dettagli) con tempi di
+    time.perf_counter(), confrontabili tra thread diversi. Gli span
+    vengono aggiunti dal thread della GUI e dal worker.
+    """
+    def __init__(self, doc_name: str, fmt: str, requested_at: float):
+        self.doc_name = doc_name
+        self.fmt = fmt
+        self.requested_at = requested_at  # prima modifica (o richiesta) che ha portato al render
+        self.submitted_at = None          # job consegnato allo scheduler
+        self.finished_at = None
+        self.spans = []
+        self.blocks = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.output_bytes = 0
+        self.error = None
+
+    def span(self, stage: str, start: float, end: float = None, **details):
+        self.spans.append((stage, start, time.perf_counter() if end is None else end, details))
+
+    def stage_ms(self, stage: str) -> float:
+        return sum(end - start for name, start, end, _ in self.spans if name == stage) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        return ((self.finished_at or time.perf_counter()) - self.requested_at) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "doc": self.doc_name,
+            "format": self.fmt,
+            "total_ms": round(self.total_ms, 3),
+            "stages_ms": {stage: round(self.stage_ms(stage), 3) for stage in RenderMetrics.STAGES
+                          if any(name == stage for name, *_ in self.spans)},
+            "blocks": self.blocks,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "output_bytes": self.output_bytes,
+            "error": self.error,
+        }
+
+
+class RenderMetrics:
+    """Ring buffer delle ultime `capacity` tracce di render.
+
+    Riassume le latenze (p50/p95) per la barra di stato ed esporta le
+    tracce in JSON lines o nel formato Chrome trace (chrome://tracing,
+    Perfetto). Quando la raccolta è spenta il renderer non crea tracce:
+    resta solo il controllo `metrics is None` nei punti misurati.
+    """
+    STAGES = ("debounce", "cache_lookup", "queue", "write", "layout", "decode", "cache_write", "paint")
+
+    def __init__(self, capacity: int = 1000):
+        self.traces = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+
+    def record(self, trace: RenderTrace):
+        if trace.finished_at is None:
+            trace.finished_at = time.perf_counter()
+        with self._lock:
+            self.traces.append(trace)
+
+    def clear(self):
+        with self._lock:
+            self.traces.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self.traces)
+
+    # =========================
+    # RIEPILOGO
+    # =========================
+    @staticmethod
+    def percentile(values: list, p: float) -> float:
+        """Percentile `p` (0-100) con il metodo nearest-rank; 0 se non ci sono valori"""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = max(1, min(len(ordered), round(p / 100 * len(ordered) + 0.5)))
+        return ordered[rank - 1]
+
+    def summary(self) -> dict:
+        traces = self.snapshot()
+        totals = [t.total_ms for t in traces]
+        lookups = sum(t.cache_hits + t.cache_misses for t in traces)
+        stages = {}
+        for stage in self.STAGES:
+            values = [t.stage_ms(stage) for t in traces if any(name == stage for name, *_ in t.spans)]
+            if values:
+                stages[stage] = {"p50_ms": self.percentile(values, 50), "p95_ms": self.percentile(values, 95)}
+        return {
+            "renders": len(traces),
+            "p50_ms": self.percentile(totals, 50),
+            "p95_ms": self.percentile(totals, 95),
+            "cache_hit_rate": sum(t.cache_hits for t in traces) / lookups if lookups else None,
+            "stages": stages,
+        }
+
+    def status_text(self) -> str:
+        summary = self.summary()
+        if not summary["renders"]:
+            return ""
+        text = f"Render p50 {summary['p50_ms']:.0f} ms · p95 {summary['p95_ms']:.0f} ms"
+        if summary["cache_hit_rate"] is not None:
+            text += f" · cache {summary['cache_hit_rate']:.0%}"
+        return text
+
+    # =========================
+    # EXPORT
+    # =========================
+    def export_jsonl(self, path: str):
+        """Una riga JSON per render, con riepilogo e span (ms dall'avvio della raccolta)"""
+        lines = []
+        for trace in self.snapshot():
+            record = trace.to_dict()
+            record["started_ms"] = round((trace.requested_at - self._origin) * 1000, 3)
+            record["spans"] = [
+                {"stage": stage, "start_ms": round((start - self._origin) * 1000, 3),
+                 "duration_ms": round((end - start) * 1000, 3), **details}
+                for stage, start, end, details in trace.spans
+            ]
+            lines.append(json.dumps(record))
+        self._write(path, "\n".join(lines) + ("\n" if lines else ""))
+
+    def export_chrome_trace(self, path: str):
+        """Formato "Trace Event" di Chrome: un evento completo ("X") per ogni fase"""
+        events = []
+        for number, trace in enumerate(self.snapshot()):
+            # Una "riga" (tid) per render, con il nome del documento
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": number,
+                           "args": {"name": f"{trace.doc_name} #{number}"}})
+            events.append(self._event(trace.doc_name, "render", trace.requested_at,
+                                      trace.finished_at or trace.requested_at, number, trace.to_dict()))
+            for stage, start, end, details in trace.spans:
+                events.append(self._event(trace.doc_name, stage, start, end, number, details))
+        self._write(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms",
+                                      "otherData": {"started": self._origin_wall}}))
+
+    def _event(self, doc_name: str, name: str, start: float, end: float, number: int, args: dict) -> dict:
+        return {
+            "name": name, "cat": doc_name or "render", "ph": "X", "pid": 1, "tid": number,
+            "ts": round((start - self._origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1), "args": args,
+        }
+
+    @staticmethod
+    def _write(path: str, payload: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, path)
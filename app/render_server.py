@@ -0,0 +1,350 @@
+import argparse
+import functools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.plantuml_process import (
+    PlantUMLProcess, PlantUMLProcessPool, PlantUMLError, PlantUMLSyntaxError, extract_blocks, jar_fingerprint,
+    make_key
+)
+from app.plantuml_http import decode_text
+
+
+DEFAULT_PORT = 8765
+FORMATS = ("png", "svg", "eps", "pdf", "syntax")
+CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "eps": "application/postscript",
+    "pdf": "application/pdf",
+    "syntax": "text/plain; charset=utf-8",
+}
+
+
+class RenderService:
+    """Render condiviso tra più client: JVM "calde" per formato e cache in memoria.
+
+    Le richieste identiche in corso nello stesso momento (es. due editor
+    sullo stesso file) producono un solo render. I diagrammi con !include
+    non vengono messi in cache: il server non sa quando cambiano i file
+    inclusi. Il server locale è condiviso tra progetti e non ha una
+    cartella di progetto: editor ed export gli inviano gli !include
+    relativi già risolti in percorsi assoluti (vedi absolute_includes).
+    """
+
+    def __init__(self, jar_path: str, jobs: int = None, cache_limit: int = 256 * 1024 * 1024, cwd: str = None):
+        self.jar_path = jar_path
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.cache_limit = cache_limit
+        self.cwd = cwd
+        self.jar_version = jar_fingerprint(jar_path)
+
+        self.requests = 0
+        self.hits = 0
+        self.renders = 0
+        self.errors = 0
+        self.connections = 0
+
+        self._lock = threading.Lock()
+        self._pools = {}            # formato -> PlantUMLProcessPool
+        self._syntax = None         # PlantUMLProcess in modalità -syntax
+        self._cache = OrderedDict()  # chiave -> (byte, errore, linea)
+        self._cache_size = 0
+        self._running = {}          # chiave -> Event, render in corso
+        self.last_request = time.monotonic()
+
+    def _pool(self, fmt: str):
+        with self._lock:
+            if fmt == "syntax":
+                if self._syntax is None:
+                    self._syntax = PlantUMLProcess(self.jar_path, timeout=10.0, cwd=self.cwd, syntax=True)
+                return self._syntax
+            pool = self._pools.get(fmt)
+            if pool is None:
+                pool = self._pools[fmt] = PlantUMLProcessPool(self.jar_path, fmt=fmt, size=self.jobs, cwd=self.cwd)
+            return pool
+
+    def render(self, text: str, fmt: str) -> tuple:
+        """(byte, messaggio di errore, linea) per il primo diagramma di `text`.
+
+        Gli errori che non dipendono dal diagramma (Java assente, JVM
+        bloccata...) escono come PlantUMLError e non vanno in cache.
+        """
+        self.requests += 1
+        self.last_request = time.monotonic()
+        blocks = extract_blocks(text)
+        # Come PlantUML server: un testo senza @start/@end è il corpo di un @startuml
+        block = blocks[0][1] if blocks else f"@startuml\n{text}\n@enduml\n"
+        cacheable = "!include" not in block and "!import" not in block
+        key = make_key(block, {"format": fmt}, self.jar_version)
+        while cacheable:
+            with self._lock:
+                result = self._cache.get(key)
+                if result is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return result
+                running = self._running.get(key)
+                if running is None:
+                    self._running[key] = threading.Event()
+                    break
+            running.wait()  # stesso diagramma già in render per un altro client
+
+        try:
+            result = self._render(block, fmt)
+            if cacheable:
+                self._remember(key, result)
+            return result
+        except PlantUMLError:
+            self.errors += 1
+            raise
+        finally:
+            if cacheable:
+                with self._lock:
+                    self._running.pop(key).set()
+
+    def _render(self, block: str, fmt: str) -> tuple:
+        self.renders += 1
+        process = self._pool(fmt)
+        if fmt == "syntax":
+            error = process.check_block(block)
+            return (b"", str(error), error.line) if error else (b"OK\n", None, None)
+        try:
+            return process.render_block(block), None, None
+        except PlantUMLSyntaxError as e:
+            return b"", str(e), e.line
+
+    def _remember(self, key: str, result: tuple):
+        size = len(result[0]) + len(result[1] or "")
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = result
+            self._cache_size += size
+            while self._cache_size > self.cache_limit and self._cache:
+                _, old = self._cache.popitem(last=False)
+                self._cache_size -= len(old[0]) + len(old[1] or "")
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "renders": self.renders,
+            "errors": self.errors,
+            "connections": self.connections,
+            "cached": len(self._cache),
+            "cache_bytes": self._cache_size,
+            "jvms": sum(len(pool._all) for pool in list(self._pools.values())) + (self._syntax is not None),
+        }
+
+    def close(self):
+        for pool in list(self._pools.values()):
+            pool.close()
+        if self._syntax is not None:
+            self._syntax.close()
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Endpoint di PlantUML server: GET /<formato>/<testo codificato> e POST /<formato> con il testo"""
+    protocol_version = "HTTP/1.1"  # keep-alive e pipelining: le richieste sulla connessione in ordine
+    timeout = 60                   # connessione inattiva chiusa dopo un minuto (il client ne riapre una)
+    disable_nagle_algorithm = True  # intestazioni e corpo partono subito, senza attendere l'ACK
+    server_version = "PlantUMLEditorServer/1"
+
+    def setup(self):
+        super().setup()
+        self.server.service.connections += 1
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["stats"]:
+            self._send(200, json.dumps(self.server.service.stats()).encode("utf-8"), "application/json")
+            return
+        if len(parts) != 2 or parts[0] not in FORMATS:
+            self._send(404, b"Not found\n", "text/plain")
+            return
+        try:
+            text = decode_text(parts[1])
+        except ValueError as e:
+            self._send(400, f"{e}\n".encode("utf-8"), "text/plain")
+            return
+        self._render(parts[0], text)
+
+    def do_POST(self):
+        fmt = self.path.strip("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        text = self.rfile.read(length).decode("utf-8", errors="replace")
+        if fmt not in FORMATS:
+            self._send(404, b"Not found\n", "text/plain")
+            return
+        self._render(fmt, text)
+
+    def _render(self, fmt: str, text: str):
+        try:
+            data, error, line = self.server.service.render(text, fmt)
+        except PlantUMLError as e:
+            self._send(503, f"{e}\n".encode("utf-8"), "text/plain; charset=utf-8")
+            return
+        if error is None:
+            self._send(200, data, CONTENT_TYPES[fmt])
+            return
+        # Le intestazioni HTTP sono latin-1 su una sola riga
+        message = " ".join(error.split()).encode("latin-1", errors="replace").decode("latin-1")
+        headers = {"X-PlantUML-Diagram-Error": message}
+        if line is not None:
+            # Linea 1-based nel diagramma, come PlantUML server
+            headers["X-PlantUML-Diagram-Error-Line"] = str(line)
+        self._send(400, f"{error}\n".encode("utf-8"), "text/plain; charset=utf-8", headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class RenderServer(ThreadingHTTPServer):
+    """Server HTTP locale compatibile con PlantUML server, su RenderService"""
+    daemon_threads = True
+
+    def __init__(self, service: RenderService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 verbose: bool = False):
+        self.service = service
+        self.verbose = verbose
+        super().__init__((host, port), RenderRequestHandler)
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return  # client andato via (es. render annullato): nulla da segnalare
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_until_idle(self, idle_exit: float = None):
+        """Serve le richieste; con `idle_exit` termina dopo tanti secondi senza richieste"""
+        if not idle_exit:
+            self.serve_forever()
+            return
+        watcher = threading.Thread(target=self._watch_idle, args=(idle_exit,), daemon=True)
+        watcher.start()
+        self.serve_forever()
+
+    def _watch_idle(self, idle_exit: float):
+        while time.monotonic() - self.service.last_request < idle_exit:
+            time.sleep(min(idle_exit, 5))
+        self.shutdown()
+
+
+def is_listening(host: str, port: int, timeout: float = 0.2) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+_start_lock = threading.Lock()  # un solo avvio anche con più render in attesa del server
+
+
+def ensure_local_server(jar_path: str, port: int = DEFAULT_PORT, wait: float = 3.0) -> str:
+    """URL del server locale, avviato in un processo separato se non è già attivo.
+
+    Il processo non dipende dall'editor che lo avvia: gli altri editor e
+    gli export sulla stessa macchina lo riusano, e termina da solo dopo
+    15 minuti senza richieste. Può attendere fino a `wait` secondi: dalla
+    GUI si usa server_backend(), che rimanda l'avvio al primo render.
+    """
+    with _start_lock:
+        return _start_local_server(jar_path, port, wait)
+
+
+def _start_local_server(jar_path: str, port: int, wait: float) -> str:
+    url = f"http://127.0.0.1:{port}"
+    if is_listening("127.0.0.1", port):
+        return url
+    main_py = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    try:
+        subprocess.Popen(
+            [sys.executable, main_py, "serve", "--port", str(port), "--jar", os.path.abspath(jar_path),
+             "--idle-exit", "900"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as e:
+        print("Avvio del server di render locale non riuscito:", e)
+        return url
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline and not is_listening("127.0.0.1", port):
+        time.sleep(0.05)
+    return url
+
+
+def server_backend(setting, jar_path: str) -> tuple:
+    """Come resolve_server ma senza attese: (URL, funzione di avvio del server locale o None).
+
+    La funzione va chiamata fuori dal thread della GUI: la riceve
+    PlantUMLServerConnection (`start`), che la esegue prima della prima
+    connessione, cioè nel thread del primo render.
+    """
+    if not setting:
+        return None, None
+    if setting == "local":
+        return f"http://127.0.0.1:{DEFAULT_PORT}", functools.partial(ensure_local_server, jar_path)
+    return str(setting), None
+
+
+def resolve_server(setting, jar_path: str) -> str:
+    """URL del server dall'impostazione "render_server" del progetto: "" = JVM locali, "local" = server incluso"""
+    url, start = server_backend(setting, jar_path)
+    if start is not None:
+        start()
+    return url
+
+
+# =========================
+# CLI
+# =========================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py serve",
+                                     description="Server di render compatibile con PlantUML server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--jar", default="tools/plantuml.jar", help="percorso di plantuml.jar")
+    parser.add_argument("-j", "--jobs", type=int, help="JVM per formato (default: un core ciascuna)")
+    parser.add_argument("--cwd", help="cartella in cui risolvere gli !include relativi")
+    parser.add_argument("--idle-exit", type=float, help="termina dopo tanti secondi senza richieste")
+    parser.add_argument("-v", "--verbose", action="store_true", help="stampa ogni richiesta")
+    args = parser.parse_args(argv)
+
+    service = RenderService(args.jar, args.jobs, cwd=args.cwd)
+    try:
+        server = RenderServer(service, args.host, args.port, args.verbose)
+    except OSError as e:
+        print(f"Impossibile ascoltare su {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+    print(f"Server di render su {server.url} ({service.jobs} JVM per formato)", flush=True)
+    try:
+        server.serve_until_idle(args.idle_exit)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
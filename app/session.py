@@ -0,0 +1,45 @@
+import json
+import os
+from pathlib import Path
+
+
+DEFAULT_SESSION_PATH = Path.home() / ".config" / "plantuml-editor" / "session.json"
+
+
+class Session:
+    """Stato dell'ultima sessione, salvato alla chiusura e ripristinato all'avvio.
+
+    Contiene progetto aperto, tab con posizione del cursore, istantanea
+    dell'albero del progetto (cartelle lette ed espanse), geometria della
+    finestra e formato della preview. Le preview non vengono copiate qui:
+    la cache dei render è indicizzata per contenuto, quindi i diagrammi
+    dei tab riaperti si ritrovano su disco finché i file non cambiano.
+    """
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = Path(path or DEFAULT_SESSION_PATH)
+        self.data = {}
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return False
+        self.data = data
+        return True
+
+    def save(self, data: dict):
+        """Scrive la sessione (atomicamente)"""
+        self.data = {"version": self.VERSION, **data}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("Errore salvando la sessione:", e)
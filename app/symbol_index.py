@@ -0,0 +1,273 @@
+import bisect
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+from app.highlighter.tokens import TOKEN_RE
+
+# Stessi token del PlantUMLHighlighter: le dichiarazioni nei commenti
+# e nelle stringhe vengono ignorate come nell'evidenziazione
+DECLARATION_GROUPS = ("class_decl", "package_decl")
+NEXT_WORD_RE = re.compile(r"\s+(\w+)")
+
+Symbol = namedtuple("Symbol", "name kind path line")  # line: 1 = prima riga
+
+
+def extract_symbols(text: str):
+    """Dichiarazioni (nome, tipo, riga) di classi, interfacce, enum, componenti e package"""
+    symbols = []
+    in_comment = False
+    for number, line in enumerate(text.splitlines(), start=1):
+        pos = 0
+        if in_comment:
+            end = line.find("'/")
+            if end == -1:
+                continue
+            pos = end + 2
+            in_comment = False
+        for match in TOKEN_RE.finditer(line, pos):
+            kind = match.lastgroup
+            if kind == "block_comment_open":
+                in_comment = True
+            elif kind in DECLARATION_GROUPS:
+                keyword, name = match.group().split(None, 1)
+                if keyword == "abstract" and name in ("class", "interface"):
+                    # "abstract class Nome": il nome è la parola successiva
+                    following = NEXT_WORD_RE.match(line, match.end())
+                    if not following:
+                        continue
+                    keyword, name = name, following.group(1)
+                symbols.append((name, keyword, number))
+    return symbols
+
+
+def _char_mask(text: str) -> int:
+    mask = 0
+    for ch in text:
+        mask |= 1 << (ord(ch) % 63)
+    return mask
+
+
+class SymbolIndex:
+    """Indice delle dichiarazioni del progetto per go-to-definition e ricerca fuzzy.
+
+    Per ogni file si memorizzano dimensione, data di modifica e simboli in
+    un sidecar JSON accanto al .tsp: riaprendo il progetto si rielaborano
+    solo i file cambiati. Le ricerche lavorano su dizionari in memoria
+    (nome -> definizioni) e su una tabella ordinata dei nomi, aggiornata
+    per inserimento a ogni modifica, senza leggere file.
+    """
+    VERSION = 1
+
+    def __init__(self, project_dir: str, sidecar_path: str = None):
+        self.project_dir = os.path.abspath(project_dir)
+        self.sidecar_path = sidecar_path
+        self._files = {}     # percorso relativo -> {"mtime_ns", "size", "symbols": [[nome, tipo, riga]]}
+        self._by_name = {}   # nome -> [Symbol]
+        self._masks = {}     # nome -> (nome minuscolo, maschera caratteri)
+        self._table = None   # [(nome minuscolo, nome, maschera caratteri)] ordinata; None = da costruire
+        self._keys = []      # nomi minuscoli della tabella, per bisect
+        self._blob = None    # nomi minuscoli uniti da "\n": le sottostringhe si cercano in C
+        self._starts = []    # posizione nel blob di ogni riga della tabella
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    # =========================
+    # SIDECAR
+    # =========================
+    def load(self) -> bool:
+        if not self.sidecar_path:
+            return False
+        try:
+            with open(self.sidecar_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return False
+        with self._lock:
+            self._files = {}
+            self._by_name = {}
+            self._masks = {}
+            self._table = None
+            self._blob = None
+            for rel_path, entry in data.get("files", {}).items():
+                self._set_file(rel_path, entry)
+            self._dirty = False
+        return True
+
+    def save(self):
+        """Scrive il sidecar (atomicamente) se l'indice è cambiato"""
+        if not self.sidecar_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"version": self.VERSION, "files": self._files}, separators=(",", ":"))
+            self._dirty = False
+        tmp = self.sidecar_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.sidecar_path)
+        except OSError as e:
+            print("Errore salvando l'indice dei simboli:", e)
+
+    # =========================
+    # COSTRUZIONE
+    # =========================
+    def build(self, files):
+        """Carica il sidecar e rielabora solo i file nuovi o modificati"""
+        self.load()
+        seen = set()
+        for path in files:
+            rel_path = self._relative(path)
+            seen.add(rel_path)
+            entry = self._files.get(rel_path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                continue
+            self.update_file(path)
+        for rel_path in set(self._files) - seen:
+            self.remove_file(os.path.join(self.project_dir, rel_path))
+        self.prepare()
+        self.save()
+
+    def update_file(self, path: str, text: str = None):
+        """Rielabora un file (es. dopo il salvataggio)"""
+        try:
+            st = os.stat(path)
+            if text is None:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+        except OSError:
+            self.remove_file(path)
+            return
+        entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                 "symbols": [list(symbol) for symbol in extract_symbols(text)]}
+        with self._lock:
+            rel_path = self._relative(path)
+            self._drop_file(rel_path)
+            self._set_file(rel_path, entry)
+            self._dirty = True
+
+    def remove_file(self, path: str):
+        with self._lock:
+            rel_path = self._relative(path)
+            if rel_path in self._files:
+                self._drop_file(rel_path)
+                self._dirty = True
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.project_dir)
+
+    def _set_file(self, rel_path: str, entry: dict):
+        self._files[rel_path] = entry
+        path = os.path.join(self.project_dir, rel_path)
+        for name, kind, line in entry["symbols"]:
+            definitions = self._by_name.get(name)
+            if definitions is None:
+                definitions = self._by_name[name] = []
+                lower = name.lower()
+                self._masks[name] = (lower, _char_mask(lower))
+                if self._table is not None:
+                    row = (lower, name, self._masks[name][1])
+                    index = bisect.bisect_left(self._table, row)
+                    self._table.insert(index, row)
+                    self._keys.insert(index, lower)
+                    self._blob = None
+            definitions.append(Symbol(name, kind, path, line))
+
+    def _drop_file(self, rel_path: str):
+        entry = self._files.pop(rel_path, None)
+        if entry is None:
+            return
+        path = os.path.join(self.project_dir, rel_path)
+        for name in {symbol[0] for symbol in entry["symbols"]}:
+            remaining = [s for s in self._by_name.get(name, ()) if s.path != path]
+            if remaining:
+                self._by_name[name] = remaining
+            else:
+                self._by_name.pop(name, None)
+                lower, mask = self._masks.pop(name)
+                if self._table is not None:
+                    index = bisect.bisect_left(self._table, (lower, name, mask))
+                    del self._table[index]
+                    del self._keys[index]
+                    self._blob = None
+
+    # =========================
+    # INTERROGAZIONI
+    # =========================
+    def definitions(self, name: str) -> list:
+        """Dove è dichiarato `name` (go-to-definition)"""
+        with self._lock:
+            return list(self._by_name.get(name, ()))
+
+    def prepare(self):
+        """Costruisce le tabelle di ricerca che mancano (dopo load(), build() o un aggiornamento)"""
+        with self._lock:
+            if self._table is None:
+                self._table = sorted((lower, name, mask) for name, (lower, mask) in self._masks.items())
+                self._keys = [row[0] for row in self._table]
+                self._blob = None
+            if self._blob is None:
+                self._blob = "\n".join(self._keys)
+                self._starts = [0] + list(itertools.accumulate(len(key) + 1 for key in self._keys))
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """Ricerca fuzzy: esatti e prefissi, poi sottostringhe e infine sottosequenze.
+
+        Ogni livello viene esplorato solo se i precedenti non bastano a
+        riempire `limit` risultati; dentro un livello vincono i nomi corti.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query: str, limit: int) -> list:
+        self.prepare()
+        table, keys, starts = self._table, self._keys, self._starts
+
+        # Esatti e prefissi: intervallo contiguo della tabella ordinata
+        start = bisect.bisect_left(keys, query)
+        end = bisect.bisect_left(keys, query + "\uffff", start)
+        prefixed = heapq.nsmallest(limit, table[start:end], key=lambda row: (row[0] != query, len(row[0])))
+        names = [row[1] for row in prefixed]
+
+        if len(names) < limit:
+            found = set(names)
+            first_hit = {}  # riga della tabella -> posizione della sottostringa nel nome
+            for match in re.finditer(re.escape(query), self._blob):
+                row = bisect.bisect_right(starts, match.start()) - 1
+                first_hit.setdefault(row, match.start() - starts[row])
+            substring = [(position, len(table[row][0]), table[row][1]) for row, position in first_hit.items()
+                         if table[row][1] not in found]
+            names += [name for _, _, name in heapq.nsmallest(limit - len(names), substring)]
+
+        if len(names) < limit:
+            found = set(names)
+            query_mask = _char_mask(query)
+            search = re.compile(".*?".join(map(re.escape, query))).search
+            scored = [(match.end() - match.start(), len(lower), name)
+                      for lower, name, mask in table if mask & query_mask == query_mask
+                      for match in (search(lower),) if match is not None and name not in found]
+            names += [name for _, _, name in heapq.nsmallest(limit - len(names), scored)]
+
+        results = []
+        for name in names:
+            results.extend(self._by_name.get(name, ()))
+        return results[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._files), "names": len(self._by_name)}
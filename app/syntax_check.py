@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from app.plantuml_process import PlantUMLError, PlantUMLCancelled
+
+
+class SyntaxCheckJob:
+    """Controllo di sintassi di un documento: `blocks` sono (prima riga, testo, chiave)"""
+    def __init__(self, doc, revision, blocks: list):
+        self.doc = doc
+        self.revision = revision
+        self.blocks = blocks
+        self.token = threading.Event()
+
+
+class SyntaxCheckSignals(QObject):
+    done = pyqtSignal(object, list)  # job, [(chiave, errore o None)]
+
+
+class SyntaxCheckWorker(QRunnable):
+    """Controlla `blocks` (quelli di `job` con esito non ancora noto)"""
+    def __init__(self, process, job: SyntaxCheckJob, blocks: list):
+        super().__init__()
+        self.process = process
+        self.job = job
+        self.blocks = blocks
+        self.signals = SyntaxCheckSignals()
+
+    def run(self):
+        results = []
+        for offset, text, key in self.blocks:
+            try:
+                error = self.process.check_block(text, offset, self.job.token)
+            except PlantUMLCancelled:
+                return
+            except PlantUMLError as e:
+                # Java assente, processo bloccato...: esito sconosciuto, il render decide
+                print("Controllo di sintassi non riuscito:", e)
+                break
+            if error is None:
+                results.append((key, None))
+            else:
+                # Linea relativa al blocco: l'esito vale ovunque il blocco si trovi
+                results.append((key, (error.line - offset if error.line else None, str(error))))
+        self.signals.done.emit(self.job, results)
+
+
+class SyntaxChecker(QObject):
+    """Controllo di sintassi rapido (PlantUML -syntax), prima del render completo.
+
+    Un'unica JVM in modalità -syntax, su un thread dedicato: analizza i
+    blocchi senza layout, quindi risponde in pochi millisecondi anche per
+    diagrammi il cui render richiede secondi. Gli esiti sono indicizzati
+    per contenuto (come la cache dei render), così dopo una modifica si
+    ricontrollano solo i blocchi cambiati; known_error() dice al renderer
+    quali blocchi è inutile renderizzare. Un controllo superato da uno più
+    recente dello stesso documento salta i blocchi rimasti.
+    """
+    checked = pyqtSignal(object, object, list)  # documento, revisione, errori [(linea, messaggio)]
+
+    def __init__(self, process_factory, max_entries: int = 4096, parent=None):
+        super().__init__(parent)
+        self.process_factory = process_factory
+        self.max_entries = max_entries
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(1)
+        self._results = OrderedDict()  # chiave -> None (valido) o (linea nel blocco, messaggio)
+        self._running = {}             # id(documento) -> ultimo job in corso
+
+    def check(self, doc, revision, blocks: list):
+        """Controlla i blocchi (prima riga, testo, chiave) di `doc`; l'esito arriva con `checked`"""
+        previous = self._running.pop(id(doc), None)
+        if previous is not None:
+            previous.token.set()
+        job = SyntaxCheckJob(doc, revision, blocks)
+        unknown = [block for block in blocks if block[2] not in self._results]
+        if not unknown:
+            self.checked.emit(doc, revision, self._errors(job))
+            return
+        self._running[id(doc)] = job
+        worker = SyntaxCheckWorker(self.process_factory(), job, unknown)
+        worker.signals.done.connect(self._on_done)
+        self.threadpool.start(worker)
+
+    def pending(self, doc) -> bool:
+        return id(doc) in self._running
+
+    def known_error(self, key: str):
+        """(linea nel blocco, messaggio) se il blocco è noto non valido, altrimenti None"""
+        return self._results.get(key)
+
+    def _errors(self, job: SyntaxCheckJob) -> list:
+        errors = []
+        for offset, _, key in job.blocks:
+            result = self._results.get(key)
+            if result is not None:
+                line, message = result
+                errors.append((offset + line if line else offset + 1, message))
+        return errors
+
+    def _on_done(self, job: SyntaxCheckJob, results: list):
+        # Gli esiti restano validi anche se il job è superato: dipendono solo dal contenuto
+        for key, result in results:
+            self._results[key] = result
+            self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        if self._running.get(id(job.doc)) is job:
+            del self._running[id(job.doc)]
+            self.checked.emit(job.doc, job.revision, self._errors(job))
+
+    def forget(self, doc):
+        job = self._running.pop(id(doc), None)
+        if job is not None:
+            job.token.set()
+
+    def shutdown(self, timeout_ms: int = 3000):
+        for job in self._running.values():
+            job.token.set()
+        self._running.clear()
+        self.threadpool.clear()
+        self.threadpool.waitForDone(timeout_ms)
@@ -0,0 +1,187 @@
+import time
+import zlib
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QWidget
+
+from app.memory_usage import format_bytes
+from app.widgets.editor import EditorWidget
+
+
+class HibernatedTab(QWidget):
+    """Segnaposto di un tab ibernato: percorso, testo compresso, cursore e scroll.
+
+    Ha la stessa interfaccia minima di EditorWidget usata per la sessione
+    (current_file, cursor_location, scroll_position); il resto del documento
+    viene ricostruito da TabHibernator.wake() quando il tab viene selezionato.
+    """
+    loading = False
+
+    def __init__(self, path: str, text: str, cursor: tuple, scroll: tuple):
+        super().__init__()
+        self.current_file = path
+        self.snapshot = zlib.compress(text.encode("utf-8"), 1)
+        self.cursor = cursor
+        self.scroll = scroll
+
+    def text(self) -> str:
+        return zlib.decompress(self.snapshot).decode("utf-8")
+
+    def cursor_location(self) -> tuple:
+        return self.cursor
+
+    def scroll_position(self) -> tuple:
+        return self.scroll
+
+    def memory_usage(self) -> dict:
+        return {"text": len(self.snapshot), "document": 0, "preview": 0}
+
+
+class TabHibernator(QObject):
+    """Iberna i tab inattivi oltre un limite di editor "vivi".
+
+    Un EditorWidget costa centinaia di KB più qualche KB per riga
+    (documento, layout, formati dell'evidenziazione). Oltre `max_live_tabs`
+    i tab non salvati di recente, non modificati e non attivi da più tempo
+    vengono sostituiti da un HibernatedTab; selezionandoli si ricostruisce
+    l'editor con lo stesso cursore e scroll (la preview torna dalla cache).
+    La cronologia di annullamento di un tab ibernato va persa.
+
+    `editor_factory(segnaposto)` crea l'editor collegato alla finestra a
+    partire dal segnaposto; hibernated e woken servono alla finestra per
+    aggiornare i riferimenti all'editor (open_editors, renderer...).
+    """
+    DEFAULTS = {
+        "enabled": 1,         # 0 = nessuna ibernazione
+        "max_live_tabs": 12,  # editor completi tenuti in memoria, tab attivo compreso
+    }
+
+    hibernated = pyqtSignal(object, object)  # editor, segnaposto
+    woken = pyqtSignal(object, object)       # segnaposto, editor
+
+    def __init__(self, tab_widget, editor_factory, settings: dict = None, parent=None):
+        super().__init__(parent)
+        self.tab_widget = tab_widget
+        self.editor_factory = editor_factory
+        self.settings = dict(self.DEFAULTS)
+        self._last_used = {}  # id(widget) -> ultimo momento in cui era il tab attivo
+        self.hibernations = 0
+        self.wakes = 0
+        self.wake_ms = 0.0  # tempo totale di ricostruzione
+
+        self.check_timer = QTimer(self)
+        self.check_timer.setSingleShot(True)
+        self.check_timer.timeout.connect(self.check)
+        self.configure(settings or {})
+
+    def configure(self, settings: dict):
+        """Applica le impostazioni del progetto (chiave "hibernation" del file .tsp)"""
+        self.settings = dict(self.DEFAULTS)
+        for name, value in settings.items():
+            if name not in self.DEFAULTS:
+                continue
+            try:
+                self.settings[name] = int(value)
+            except (TypeError, ValueError):
+                print(f"Impostazione hibernation non valida: {name}={value!r}")
+        self.settings["max_live_tabs"] = max(1, self.settings["max_live_tabs"])
+        self.schedule_check()
+
+    # =========================
+    # TAB
+    # =========================
+    def touch(self, widget):
+        """`widget` è diventato il tab attivo"""
+        if widget is not None:
+            self._last_used[id(widget)] = time.monotonic()
+        self.schedule_check()
+
+    def forget(self, widget):
+        self._last_used.pop(id(widget), None)
+
+    def schedule_check(self):
+        # Mai dentro un cambio di tab o un'apertura: al prossimo giro dell'event loop
+        if self.settings["enabled"]:
+            self.check_timer.start(0)
+
+    def live_editors(self) -> list:
+        return [widget for widget in self._widgets() if isinstance(widget, EditorWidget)]
+
+    def _widgets(self):
+        return (self.tab_widget.widget(index) for index in range(self.tab_widget.count()))
+
+    @staticmethod
+    def can_hibernate(editor) -> bool:
+        return (bool(editor.current_file) and not editor.loading and not editor.pending_writes
+                and not editor.document().isModified())
+
+    def check(self):
+        """Iberna i tab usati meno di recente finché gli editor vivi non rientrano nel limite"""
+        if not self.settings["enabled"]:
+            return
+        live = self.live_editors()
+        excess = len(live) - self.settings["max_live_tabs"]
+        if excess <= 0:
+            return
+        current = self.tab_widget.currentWidget()
+        candidates = [editor for editor in live if editor is not current and self.can_hibernate(editor)]
+        candidates.sort(key=lambda editor: self._last_used.get(id(editor), 0.0))
+        for editor in candidates[:excess]:
+            self.hibernate(editor)
+
+    # =========================
+    # IBERNAZIONE
+    # =========================
+    def hibernate(self, editor) -> HibernatedTab:
+        before = sum(editor.memory_usage().values())
+        placeholder = HibernatedTab(editor.current_file, editor.toPlainText(), editor.cursor_location(),
+                                    editor.scroll_position())
+        self._last_used[id(placeholder)] = self._last_used.pop(id(editor), 0.0)
+        self._replace(editor, placeholder)
+        self.tab_widget.setTabToolTip(
+            self.tab_widget.indexOf(placeholder),
+            f"{editor.current_file}\nHibernated: {format_bytes(len(placeholder.snapshot))} "
+            f"(was ~{format_bytes(before)})"
+        )
+        self.hibernations += 1
+        self.hibernated.emit(editor, placeholder)
+        editor.deleteLater()
+        return placeholder
+
+    def wake(self, placeholder: HibernatedTab):
+        """Ricostruisce l'editor del tab ibernato e lo rimette al suo posto"""
+        start = time.perf_counter()
+        editor = self.editor_factory(placeholder)
+        self._last_used[id(editor)] = self._last_used.pop(id(placeholder), 0.0)
+        self._replace(placeholder, editor)
+        self.tab_widget.setTabToolTip(self.tab_widget.indexOf(editor), editor.current_file)
+        self.wakes += 1
+        self.wake_ms += (time.perf_counter() - start) * 1000
+        self.woken.emit(placeholder, editor)
+        placeholder.deleteLater()
+        return editor
+
+    def _replace(self, old, new):
+        """Sostituisce il widget di un tab senza cambiare tab attivo, titolo e posizione"""
+        tabs = self.tab_widget
+        index = tabs.indexOf(old)
+        current = tabs.currentIndex()
+        had_focus = old.hasFocus()
+        tabs.blockSignals(True)
+        try:
+            title = tabs.tabText(index)
+            tabs.removeTab(index)
+            tabs.insertTab(index, new, title)
+            tabs.setCurrentIndex(current)
+        finally:
+            tabs.blockSignals(False)
+        old.setParent(None)
+        if had_focus or index == current:
+            new.setFocus()
+
+    def stats(self) -> dict:
+        return {
+            "hibernations": self.hibernations,
+            "wakes": self.wakes,
+            "wake_avg_ms": self.wake_ms / self.wakes if self.wakes else None,
+        }
@@ -0,0 +1,271 @@
+import marshal
+import os
+import re
+import threading
+from array import array
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+
+SEARCH_LIMIT = 10000  # risultati massimi di una ricerca
+
+
+def trigrams(text: str) -> set:
+    """Trigrammi (minuscoli) di `text`; le righe ripetute vengono considerate una volta sola"""
+    text = "\n".join(set(text.lower().splitlines()))
+    return set(zip(text, text[1:], text[2:]))
+
+
+def required_literals(pattern: str, flags: int = 0) -> list:
+    """Sequenze di caratteri che ogni match della regex deve contenere.
+
+    Analizza solo il livello più esterno della regex: letterali consecutivi
+    formano una sequenza, qualunque altro elemento la interrompe. Con
+    un'alternativa (a|b) al livello esterno non c'è nulla di obbligatorio.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, sre_constants.error, OverflowError):
+        return []
+    runs, current = [], []
+    for op, value in parsed:
+        if op is sre_constants.LITERAL:
+            current.append(chr(value))
+            continue
+        if op is sre_constants.BRANCH:
+            return []
+        if current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+class SearchMatch:
+    """Una riga trovata: percorso, numero di riga (1 = prima) e testo"""
+    def __init__(self, path: str, line: int, text: str):
+        self.path = path
+        self.line = line
+        self.text = text
+
+
+class TextIndex:
+    """Indice a trigrammi dei file .puml per la ricerca full-text.
+
+    Ogni trigramma (minuscolo) punta all'elenco dei file che lo contengono
+    (array di id). Una ricerca interseca gli elenchi dei trigrammi della
+    query e legge solo i file candidati, per verificare il match riga per
+    riga. Un file modificato riceve un nuovo id e quello vecchio viene
+    marcato come eliminato; compact() ricostruisce gli elenchi quando gli
+    id eliminati diventano troppi. L'indice si salva in un sidecar accanto
+    al .tsp per non rileggere il progetto a ogni apertura. Non dipende da Qt.
+    """
+    VERSION = 1
+    COMPACT_RATIO = 0.25  # quota di id eliminati oltre cui compattare
+
+    def __init__(self, project_dir: str, sidecar_path: str = None):
+        self.project_dir = os.path.abspath(project_dir)
+        self.sidecar_path = sidecar_path
+        self._paths = []       # id -> percorso relativo (None = eliminato)
+        self._stamps = []      # id -> (mtime_ns, size)
+        self._ids = {}         # percorso relativo -> id attivo
+        self._postings = {}    # trigramma -> array("I") di id
+        self._dead = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    # =========================
+    # SIDECAR
+    # =========================
+    def load(self) -> bool:
+        if not self.sidecar_path:
+            return False
+        try:
+            with open(self.sidecar_path, "rb") as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return False
+        with self._lock:
+            self._paths = data["paths"]
+            self._stamps = data["stamps"]
+            self._ids = {path: i for i, path in enumerate(self._paths) if path is not None}
+            self._dead = len(self._paths) - len(self._ids)
+            self._postings = {}
+            for trigram, raw in data["postings"].items():
+                ids = self._postings[trigram] = array("I")
+                ids.frombytes(raw)
+            self._dirty = False
+        return True
+
+    def save(self):
+        """Scrive il sidecar (atomicamente) se l'indice è cambiato"""
+        if not self.sidecar_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": self.VERSION,
+                "paths": list(self._paths),
+                "stamps": list(self._stamps),
+                "postings": {trigram: ids.tobytes() for trigram, ids in self._postings.items()},
+            }
+            self._dirty = False
+        tmp = self.sidecar_path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                marshal.dump(data, f)
+            os.replace(tmp, self.sidecar_path)
+        except (OSError, ValueError) as e:
+            print("Errore salvando l'indice di ricerca:", e)
+
+    # =========================
+    # COSTRUZIONE
+    # =========================
+    def build(self, files):
+        """Carica il sidecar e indicizza solo i file nuovi o modificati"""
+        self.load()
+        seen = set()
+        for path in files:
+            rel_path = self._relative(path)
+            seen.add(rel_path)
+            file_id = self._ids.get(rel_path)
+            if file_id is not None and self._stamps[file_id] == self._stamp(path):
+                continue
+            self.update_file(path)
+        for rel_path in set(self._ids) - seen:
+            self.remove_file(os.path.join(self.project_dir, rel_path))
+        self.compact()
+        self.save()
+
+    def update_file(self, path: str, text: str = None):
+        """(Ri)indicizza un file; se non esiste più viene rimosso"""
+        stamp = self._stamp(path)
+        try:
+            if text is None:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+        except OSError:
+            stamp = None
+        if stamp is None:
+            self.remove_file(path)
+            return
+        file_trigrams = trigrams(text)
+        with self._lock:
+            rel_path = self._relative(path)
+            self._drop(rel_path)
+            file_id = len(self._paths)
+            self._paths.append(rel_path)
+            self._stamps.append(stamp)
+            self._ids[rel_path] = file_id
+            for trigram in file_trigrams:
+                ids = self._postings.get(trigram)
+                if ids is None:
+                    ids = self._postings[trigram] = array("I")
+                ids.append(file_id)
+            self._dirty = True
+
+    def remove_file(self, path: str):
+        with self._lock:
+            if self._drop(self._relative(path)):
+                self._dirty = True
+
+    def _drop(self, rel_path: str) -> bool:
+        file_id = self._ids.pop(rel_path, None)
+        if file_id is None:
+            return False
+        self._paths[file_id] = None
+        self._dead += 1
+        return True
+
+    def compact(self):
+        """Rinumera i file attivi e ripulisce gli elenchi dagli id eliminati"""
+        with self._lock:
+            if not self._paths or self._dead < len(self._paths) * self.COMPACT_RATIO:
+                return
+            remap = {}
+            paths, stamps = [], []
+            for old_id, rel_path in enumerate(self._paths):
+                if rel_path is not None:
+                    remap[old_id] = len(paths)
+                    paths.append(rel_path)
+                    stamps.append(self._stamps[old_id])
+            postings = {}
+            for trigram, ids in self._postings.items():
+                kept = array("I", (remap[i] for i in ids if i in remap))
+                if kept:
+                    postings[trigram] = kept
+            self._paths, self._stamps, self._postings = paths, stamps, postings
+            self._ids = {path: i for i, path in enumerate(paths)}
+            self._dead = 0
+            self._dirty = True
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.project_dir)
+
+    @staticmethod
+    def _stamp(path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    # =========================
+    # RICERCA
+    # =========================
+    def candidates(self, literals) -> list:
+        """Percorsi dei file che contengono tutti i trigrammi di `literals`"""
+        query = set()
+        for literal in literals:
+            query |= trigrams(literal)
+        with self._lock:
+            if not query:
+                ids = set(self._ids.values())
+            else:
+                lists = sorted((self._postings.get(trigram, ()) for trigram in query), key=len)
+                ids = set(lists[0])
+                for other in lists[1:]:
+                    if not ids:
+                        break
+                    ids.intersection_update(other)
+            paths = [self._paths[i] for i in ids if self._paths[i] is not None]
+        return [os.path.join(self.project_dir, path) for path in sorted(paths)]
+
+    def search(self, query: str, regex: bool = False, case_sensitive: bool = False,
+               cancel: threading.Event = None, limit: int = SEARCH_LIMIT):
+        """Genera i SearchMatch di `query` (sottostringa o regex), un file alla volta, al più `limit`"""
+        flags = 0 if case_sensitive else re.IGNORECASE
+        source = query if regex else re.escape(query)
+        pattern = re.compile(source, flags)
+        whole_file = re.compile(source, flags | re.MULTILINE)  # scarta i file senza match in un colpo
+        literals = required_literals(query, flags) if regex else [query]
+
+        found = 0
+        for path in self.candidates(literals):
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            if not whole_file.search(text):
+                continue
+            for number, line in enumerate(text.splitlines(), start=1):
+                if pattern.search(line):
+                    yield SearchMatch(path, number, line)
+                    found += 1
+                    if found >= limit:
+                        return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._ids), "trigrams": len(self._postings)}
@@ -0,0 +1,220 @@
+import threading
+from collections import deque
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from app.plantuml_http import PlantUMLServerClient
+from app.plantuml_process import (
+    PlantUMLError, PlantUMLCancelled, PlantUMLProcessPool, extract_blocks, jar_fingerprint, make_key
+)
+from app.dependency_index import absolute_includes
+from app.render_cache import DEFAULT_CACHE_DIR, RenderCache
+
+
+THUMBNAIL_SIZE = 160  # lato massimo in pixel
+
+
+def thumbnail_cache() -> RenderCache:
+    """Cache persistente delle miniature: PNG piccoli, pochi in memoria (le pixmap le tiene la galleria)"""
+    return RenderCache(DEFAULT_CACHE_DIR / "thumbnails", memory_limit=8 * 1024 * 1024,
+                       disk_limit=128 * 1024 * 1024)
+
+
+def scale_image(image: QImage, size: int) -> QImage:
+    if image.width() <= size and image.height() <= size:
+        return image
+    return image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                        Qt.TransformationMode.SmoothTransformation)
+
+
+def png_bytes(image: QImage) -> bytes:
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return bytes(data)
+
+
+class ThumbnailSignals(QObject):
+    done = pyqtSignal(str, object, str, str)  # percorso, QImage (None se fallito), origine, errore
+
+
+class ThumbnailWorker(QRunnable):
+    """Miniatura del primo diagramma di un file.
+
+    In ordine: cache delle miniature, render a grandezza piena già nella
+    cache della preview (stessa chiave), render su una JVM del pool.
+    La chiave dipende dal contenuto del diagramma e dagli !include, come
+    quella della preview: un file non modificato non viene mai rigenerato.
+    """
+
+    def __init__(self, loader, path: str):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        try:
+            image, source, error = self._thumbnail()
+        except Exception as e:  # il worker non deve mai lasciare il loader in attesa
+            image, source, error = None, "error", str(e)
+        self.signals.done.emit(self.path, image, source, error)
+
+    def _thumbnail(self) -> tuple:
+        loader = self.loader
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            return None, "error", str(e)
+        blocks = extract_blocks(text)
+        if not blocks:
+            return None, "error", "No diagram"
+        offset, block = blocks[0]
+
+        options = {}
+        if loader.dependencies is not None:
+            signature = loader.dependencies.signature(self.path)
+            if signature:
+                options["includes"] = signature
+        key = make_key(block, {**options, "format": "thumbnail", "size": loader.size}, loader.jar_version)
+        image = loader.cache.get(key)
+        if image is not None:
+            return image, "cache", ""
+
+        render_key = make_key(block, {**options, "format": "png"}, loader.jar_version)
+        data = loader.render_cache.get_bytes(render_key) if loader.render_cache is not None else None
+        source = "preview"
+        if data is None:
+            if loader.cancelled.is_set():
+                return None, "cancelled", ""
+            try:
+                text = absolute_includes(block, self.path, loader.project_dir)
+                data = loader.pool().render_block(text, offset, loader.cancelled)
+            except PlantUMLCancelled:
+                return None, "cancelled", ""
+            except PlantUMLError as e:
+                return None, "error", str(e).splitlines()[0] if str(e) else "Render failed"
+            if loader.render_cache is not None:
+                # Solo su disco: aprendo il file la preview lo trova già pronto
+                loader.render_cache.put(render_key, data)
+            source = "render"
+        full = QImage.fromData(data)
+        if full.isNull():
+            return None, "error", "Invalid image"
+        image = scale_image(full, loader.size)
+        loader.cache.put(key, png_bytes(image), image)
+        return image, source, ""
+
+
+class ThumbnailLoader(QObject):
+    """Genera le miniature in background con al più `jobs` render alla volta.
+
+    request() sostituisce la coda: la galleria chiede solo i file visibili
+    (più un margine), e quelli usciti dalla vista prima di partire non
+    vengono mai renderizzati. Il pool di JVM (o di connessioni al server)
+    è separato da quello della preview e parte alla prima miniatura da
+    renderizzare davvero.
+    """
+    ready = pyqtSignal(str, object)  # percorso, QImage
+    failed = pyqtSignal(str, str)    # percorso, messaggio
+    idle = pyqtSignal()              # coda vuota e nessun worker in corso
+
+    def __init__(self, jar_path: str, render_cache=None, cache=None, size: int = THUMBNAIL_SIZE, jobs: int = 2,
+                 parent=None):
+        super().__init__(parent)
+        self.jar_path = jar_path
+        self.render_cache = render_cache
+        self.cache = cache or thumbnail_cache()
+        self.size = size
+        self.jobs = max(1, jobs)
+        self.project_dir = None
+        self.dependencies = None
+        self.server_url = None
+        self.server_start = None
+        self.jar_version = jar_fingerprint(jar_path)
+        self.cancelled = threading.Event()
+        self.counts = {"cache": 0, "preview": 0, "render": 0, "error": 0}
+
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(self.jobs)
+        self._queue = deque()
+        self._running = {}  # percorso -> ThumbnailWorker
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def configure(self, project_dir: str = None, dependencies=None, server_url: str = None,
+                  jar_version: str = None, server_start=None):
+        """Progetto, indice degli !include e backend di render (gli stessi della preview)"""
+        self._queue.clear()
+        self.cancelled.set()  # i render in corso del progetto precedente si interrompono
+        self._close_pool()
+        self.project_dir = project_dir
+        self.dependencies = dependencies
+        self.server_url = server_url
+        self.server_start = server_start
+        self.jar_version = jar_version or jar_fingerprint(self.jar_path)
+
+    def pool(self):
+        with self._pool_lock:
+            if self._pool is None and self.server_url:
+                self._pool = PlantUMLServerClient(self.server_url, size=self.jobs, start=self.server_start)
+            if self._pool is None:
+                self._pool = PlantUMLProcessPool(self.jar_path, size=self.jobs, cwd=self.project_dir)
+            return self._pool
+
+    def _close_pool(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    # =========================
+    # CODA
+    # =========================
+    def request(self, paths):
+        """Miniature da generare, in ordine di priorità; sostituisce le richieste precedenti"""
+        self._queue = deque(path for path in dict.fromkeys(paths) if path not in self._running)
+        self._start()
+
+    def busy(self) -> bool:
+        return bool(self._queue or self._running)
+
+    def _start(self):
+        self.cancelled.clear()
+        while self._queue and len(self._running) < self.jobs:
+            path = self._queue.popleft()
+            worker = ThumbnailWorker(self, path)
+            worker.signals.done.connect(self._on_done)
+            self._running[path] = worker
+            self.threadpool.start(worker)
+
+    def _on_done(self, path: str, image, source: str, error: str):
+        self._running.pop(path, None)
+        if source in self.counts:
+            self.counts[source] += 1
+        if image is not None:
+            self.ready.emit(path, image)
+        elif source == "error":
+            self.failed.emit(path, error)
+        if not self.cancelled.is_set():
+            self._start()
+        if not self.busy():
+            self.idle.emit()
+
+    def stats(self) -> dict:
+        return {**self.counts, "queued": len(self._queue), "running": len(self._running)}
+
+    def shutdown(self, timeout_ms: int = 3000):
+        """Svuota la coda, interrompe i render in corso e chiude le JVM"""
+        self._queue.clear()
+        self.cancelled.set()
+        with self._pool_lock:
+            pool = self._pool
+        if pool is not None:
+            pool.cancel(self.cancelled)
+        self.threadpool.waitForDone(timeout_ms)
+        self._close_pool()
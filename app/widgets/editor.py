@@ -1,6 +1,45 @@
-from PyQt6.QtWidgets import QPlainTextEdit, QTextEdit, QWidget
+import codecs
+import os
+import time
+from collections import deque
+
+from PyQt6.QtWidgets import QPlainTextEdit, QTextEdit, QToolTip, QWidget
 from PyQt6.QtGui import QTextCursor, QColor, QFont, QPainter
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QEvent, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from app.memory_usage import current_rss
+
+
+class FileChunkSignals(QObject):
+    chunk = pyqtSignal(int, str)    # id caricamento, testo
+    done = pyqtSignal(int, int)     # id caricamento, byte letti
+
+
+class FileChunkReader(QRunnable):
+    """Legge e decodifica un file a blocchi fuori dal thread della GUI"""
+    def __init__(self, load_id: int, path: str, chunk_size: int):
+        super().__init__()
+        self.load_id = load_id
+        self.path = path
+        self.chunk_size = chunk_size
+        self.signals = FileChunkSignals()
+
+    def run(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        total = 0
+        try:
+            with open(self.path, "rb") as f:
+                while True:
+                    data = f.read(self.chunk_size)
+                    total += len(data)
+                    text = decoder.decode(data, final=not data)
+                    if text:
+                        self.signals.chunk.emit(self.load_id, text)
+                    if not data:
+                        break
+        except OSError as e:
+            print("Errore leggendo file:", e)
+        self.signals.done.emit(self.load_id, total)
 
 
 class LineNumberArea(QWidget):
@@ -17,11 +56,36 @@ class LineNumberArea(QWidget):
 
 
 class EditorWidget(QPlainTextEdit):
+    # Modalità documento grande: sopra questa dimensione il file viene
+    # caricato a blocchi in background e si evidenzia solo la parte visibile
+    LARGE_FILE_THRESHOLD = 4 * 1024 * 1024
+    CHUNK_SIZE = 512 * 1024
+    HIGHLIGHT_MARGIN = 200  # righe evidenziate sopra/sotto la viewport
+    # Stima della memoria (misurata con current_rss su diagrammi tipici):
+    # widget vuoto e costo di ogni riga (layout e formati dell'evidenziazione)
+    WIDGET_OVERHEAD = 300 * 1024
+    BLOCK_OVERHEAD = 1700
+
+    load_finished = pyqtSignal(dict)  # statistiche del caricamento
+
     def __init__(self):
         super().__init__()
 
         self.current_file = None
-        self.error_selection = None
+        self.error_selections = []  # (ExtraSelection, messaggio) per ogni riga con errori
+        self.large_mode = False
+        self.loading = False
+        self._pending_line = None  # (riga, colonna) da raggiungere a fine caricamento
+        self._pending_scroll = None  # (verticale, orizzontale) da ripristinare a fine caricamento
+        self.pending_writes = 0    # salvataggi in coda nel FileWriter
+
+        # Ultimo render di questo documento (vedi AsyncPlantUMLPreview)
+        self.render_result = None     # (formato, pagine: QImage o byte SVG per ogni diagramma)
+        self.render_error = None      # (messaggio, linea)
+        self.result_revision = None   # revisione del documento che li ha prodotti
+        self.requested_render = None  # (revisione, formato) dell'ultimo render richiesto
+        self.diagram_starts = []      # prima riga di ogni blocco @startuml
+        self.syntax_errors = []       # [(linea, messaggio)] dall'ultimo controllo di sintassi
 
         # =========================
         # FONT E STILE
@@ -55,6 +119,19 @@ class EditorWidget(QPlainTextEdit):
         self.update_line_number_area_width(0)
         self.highlight_current_line()
 
+        # =========================
+        # CARICAMENTO A BLOCCHI
+        # =========================
+        self._load_id = 0
+        self._load_stats = {}
+        self._pending_chunks = deque()
+        self._reader_done = False
+        self._feed_timer = QTimer(self)
+        self._feed_timer.setInterval(0)  # un blocco per giro dell'event loop
+        self._feed_timer.timeout.connect(self._append_next_chunk)
+        self._highlight_window = None
+        self.updateRequest.connect(self._update_highlight_window)
+
     # =========================
     # LINE NUMBERS
     # =========================
@@ -88,11 +165,15 @@ class EditorWidget(QPlainTextEdit):
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
         bottom = top + self.blockBoundingRect(block).height()
         current_line = self.textCursor().blockNumber()
+        error_lines = self.error_lines()
 
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
                 number = str(block_number + 1)
-                color = QColor("#ffffff") if block_number == current_line else QColor("#888888")
+                if block_number in error_lines:
+                    color = QColor("#ff5555")
+                else:
+                    color = QColor("#ffffff") if block_number == current_line else QColor("#888888")
                 painter.setPen(color)
                 painter.drawText(0, int(top), self.line_number_area.width() - 2,
                                  int(self.fontMetrics().height()), Qt.AlignmentFlag.AlignRight, number)
@@ -113,8 +194,7 @@ class EditorWidget(QPlainTextEdit):
             selection.cursor = self.textCursor()
             extra_selections.append(selection)
 
-        if self.error_selection:
-            extra_selections.append(self.error_selection)
+        extra_selections.extend(selection for selection, _ in self.error_selections)
 
         self.setExtraSelections(extra_selections)
 
@@ -122,6 +202,15 @@ class EditorWidget(QPlainTextEdit):
     # FILE HANDLING
     # =========================
     def load_file(self, path: str):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size >= self.LARGE_FILE_THRESHOLD:
+            self._load_large_file(path, size)
+            return
+
+        start, rss = time.perf_counter(), current_rss()
         try:
             with open(path, "r", encoding="utf-8") as f:
                 text = f.read()
@@ -131,30 +220,248 @@ class EditorWidget(QPlainTextEdit):
         self.setPlainText(text)
         self.current_file = path
         self.moveCursor(QTextCursor.MoveOperation.Start)
+        self._load_stats = {"path": path, "bytes": size, "large": False, "start": start, "rss": rss}
+        self._emit_load_finished()
+
+    def load_snapshot(self, path: str, text: str, cursor: tuple = (1, 0), scroll: tuple = None):
+        """Ricostruisce il documento da un testo già in memoria (tab ibernato), con cursore e scroll.
+
+        Un testo grande viene inserito a blocchi come in _load_large_file.
+        """
+        size = len(text.encode("utf-8"))
+        if size < self.LARGE_FILE_THRESHOLD:
+            start, rss = time.perf_counter(), current_rss()
+            self.setPlainText(text)
+            self.current_file = path
+            self._load_stats = {"path": path, "bytes": size, "large": False, "start": start, "rss": rss}
+            self.go_to_line(*cursor)
+            # Le barre di scorrimento hanno la loro estensione solo quando il widget è in un tab visibile
+            self._pending_scroll = scroll
+            QTimer.singleShot(0, self._apply_pending_scroll)
+            self._emit_load_finished()
+            return
+
+        self._start_large_load(path, size)
+        self._pending_line = cursor
+        self._pending_scroll = scroll
+        self._pending_chunks.extend(text[i:i + self.CHUNK_SIZE] for i in range(0, len(text), self.CHUNK_SIZE))
+        self._reader_done = True
+        self._feed_timer.start()
+
+    def _load_large_file(self, path: str, size: int):
+        """Caricamento asincrono: i blocchi letti in background vengono
+        accodati e inseriti uno per giro dell'event loop"""
+        self._start_large_load(path, size)
+        reader = FileChunkReader(self._load_id, path, self.CHUNK_SIZE)
+        reader.signals.chunk.connect(self._on_chunk_read)
+        reader.signals.done.connect(self._on_read_done)
+        QThreadPool.globalInstance().start(reader)
+
+    def _start_large_load(self, path: str, size: int):
+        self._load_id += 1
+        self.large_mode = True
+        self.loading = True
+        self.current_file = path
+        self._load_stats = {"path": path, "bytes": size, "large": True,
+                            "start": time.perf_counter(), "rss": current_rss()}
+        self._pending_chunks.clear()
+        self._reader_done = False
+        self._highlight_window = None
+
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.highlighter.visible_range = (0, self.HIGHLIGHT_MARGIN)
+        self.clear()
+
+    def _on_chunk_read(self, load_id: int, text: str):
+        if load_id != self._load_id:
+            return
+        self._pending_chunks.append(text)
+        if not self._feed_timer.isActive():
+            self._feed_timer.start()
+
+    def _on_read_done(self, load_id: int, total: int):
+        if load_id != self._load_id:
+            return
+        self._reader_done = True
+        if not self._feed_timer.isActive():
+            self._feed_timer.start()
+
+    def _append_next_chunk(self):
+        if self._pending_chunks:
+            cursor = QTextCursor(self.document())
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(self._pending_chunks.popleft())
+            return
+        self._feed_timer.stop()
+        if self._reader_done:
+            self._finish_large_load()
+
+    def _finish_large_load(self):
+        self.loading = False
+        self.setUndoRedoEnabled(True)
+        self.setReadOnly(False)
+        self.document().setModified(False)
+        self.moveCursor(QTextCursor.MoveOperation.Start)
+        self._update_highlight_window()
+        if self._pending_line is not None:
+            self.go_to_line(*self._pending_line)
+        self._apply_pending_scroll()
+        self._emit_load_finished()
 
-    def save(self):
-        if not self.current_file:
+    def _emit_load_finished(self):
+        stats = self._load_stats
+        rss = current_rss()
+        self.load_finished.emit({
+            "path": stats["path"],
+            "bytes": stats["bytes"],
+            "lines": self.blockCount(),
+            "large": stats["large"],
+            "seconds": time.perf_counter() - stats["start"],
+            "memory_delta": rss - stats["rss"] if rss is not None and stats["rss"] is not None else None,
+        })
+
+    def _update_highlight_window(self, *_):
+        """In modalità documento grande evidenzia solo viewport +/- margine"""
+        if not self.large_mode:
+            return
+        first = self.firstVisibleBlock().blockNumber()
+        visible = self.viewport().height() // max(1, self.fontMetrics().height()) + 1
+        window = (max(0, first - self.HIGHLIGHT_MARGIN), first + visible + self.HIGHLIGHT_MARGIN, self.blockCount())
+        if window == self._highlight_window:
             return
-        with open(self.current_file, "w", encoding="utf-8") as f:
-            f.write(self.toPlainText())
+        self._highlight_window = window
+        self.highlighter.visible_range = window[:2]
+        if self.loading:
+            return
+
+        block = self.document().findBlockByNumber(window[0])
+        while block.isValid() and block.blockNumber() <= window[1]:
+            if self.highlighter.needs_format(block):
+                self.highlighter.rehighlightBlock(block)
+            block = block.next()
 
     # =========================
-    # EVIDENZIAZIONE ERRORI
+    # NAVIGAZIONE
     # =========================
-    def highlight_error_line(self, line: int):
-        self.clear_error_highlight()
+    def go_to_line(self, line: int, column: int = 0):
+        """Porta il cursore alla riga `line` (1 = prima riga), colonna `column` (0 = inizio)"""
+        if self.loading:
+            self._pending_line = (line, column)
+            return
+        self._pending_line = None
+        block = self.document().findBlockByNumber(max(0, line - 1))
+        if not block.isValid():
+            block = self.document().lastBlock()
+        cursor = self.textCursor()
+        cursor.setPosition(block.position() + max(0, min(column, block.length() - 1)))
+        self.setTextCursor(cursor)
+        self.centerCursor()
+
+    def replace_text(self, text: str):
+        """Sostituisce tutto il testo con un'unica modifica annullabile (il documento risulta modificato)"""
         cursor = QTextCursor(self.document())
-        cursor.movePosition(QTextCursor.MoveOperation.Start)
-        cursor.movePosition(QTextCursor.MoveOperation.Down, QTextCursor.MoveMode.MoveAnchor, line - 1)
-        cursor.select(QTextCursor.SelectionType.LineUnderCursor)
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.insertText(text)
+
+    def cursor_location(self) -> tuple:
+        """(riga, colonna) del cursore come in go_to_line; durante il caricamento quella in attesa"""
+        if self._pending_line is not None:
+            return self._pending_line
+        cursor = self.textCursor()
+        return cursor.blockNumber() + 1, cursor.positionInBlock()
 
-        selection = QTextEdit.ExtraSelection()
-        selection.cursor = cursor
-        selection.format.setBackground(QColor("#ff5555"))
+    def scroll_position(self) -> tuple:
+        """(verticale, orizzontale) delle barre di scorrimento; durante il caricamento quella in attesa"""
+        if self._pending_scroll is not None:
+            return self._pending_scroll
+        return self.verticalScrollBar().value(), self.horizontalScrollBar().value()
 
-        self.error_selection = selection
+    def _apply_pending_scroll(self):
+        if self._pending_scroll is not None and not self.loading:
+            scroll, self._pending_scroll = self._pending_scroll, None
+            self.verticalScrollBar().setValue(scroll[0])
+            self.horizontalScrollBar().setValue(scroll[1])
+
+    def memory_usage(self) -> dict:
+        """Stima in byte: testo (UTF-16), struttura del documento e pagine della preview"""
+        document = self.document()
+        preview = 0
+        pages = self.render_result[1] if self.render_result else []
+        for page in pages:
+            if isinstance(page, bytes):
+                preview += len(page)
+            elif page is not None:
+                preview += page.sizeInBytes()
+        return {
+            "text": document.characterCount() * 2,
+            "document": self.WIDGET_OVERHEAD + document.blockCount() * self.BLOCK_OVERHEAD,
+            "preview": preview,
+        }
+
+    def word_under_cursor(self) -> str:
+        cursor = self.textCursor()
+        cursor.select(QTextCursor.SelectionType.WordUnderCursor)
+        return cursor.selectedText()
+
+    def save(self, writer) -> bool:
+        """Salva in background con `writer` (FileWriter); l'esito arriva dai suoi segnali.
+
+        Il documento risulta subito non modificato: se la scrittura
+        fallisce va rimesso come modificato (document().setModified(True)).
+        """
+        if not self.current_file or self.loading:
+            return False
+        data = self.toPlainText().encode("utf-8")
+        self.document().setModified(False)
+        self.pending_writes += 1
+        writer.write(self.current_file, data, self)
+        return True
+
+    # =========================
+    # EVIDENZIAZIONE ERRORI
+    # =========================
+    def set_diagnostics(self, diagnostics: list):
+        """Evidenzia le righe con errori: lista di (riga, messaggio), righe da 1.
+
+        Il messaggio compare come tooltip sulla riga; le evidenziazioni
+        seguono il testo finché non arrivano nuovi risultati.
+        """
+        selections = []
+        document = self.document()
+        for line, message in diagnostics:
+            block = document.findBlockByNumber(max(0, line - 1))
+            if not block.isValid():
+                continue
+            cursor = QTextCursor(block)
+            cursor.select(QTextCursor.SelectionType.LineUnderCursor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = cursor
+            selection.format.setBackground(QColor("#ff5555"))
+            selections.append((selection, message))
+        self.error_selections = selections
         self.highlight_current_line()
+        self.line_number_area.update()
+
+    def error_lines(self) -> dict:
+        """Numero di blocco (riga da 0) -> messaggio, per le righe evidenziate"""
+        lines = {}
+        for selection, message in self.error_selections:
+            lines.setdefault(selection.cursor.blockNumber(), message)
+        return lines
+
+    def highlight_error_line(self, line: int, message: str = ""):
+        self.set_diagnostics([(line, message)])
 
     def clear_error_highlight(self):
-        self.error_selection = None
-        self.highlight_current_line()
+        self.set_diagnostics([])
+
+    def viewportEvent(self, event):
+        if event.type() == QEvent.Type.ToolTip:
+            message = self.error_lines().get(self.cursorForPosition(event.pos()).blockNumber())
+            if message:
+                QToolTip.showText(event.globalPos(), message, self.viewport())
+            else:
+                QToolTip.hideText()
+            return True
+        return super().viewportEvent(event)
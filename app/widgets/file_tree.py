@@ -1,10 +1,58 @@
 import os
-from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QAbstractItemView, QTreeWidget, QTreeWidgetItem
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QFont, QColor, QBrush
 
+from app.project_manager import is_skipped_dir
+
+
+class DirectoryScanSignals(QObject):
+    finished = pyqtSignal(str, list, list)  # cartella, sottocartelle, file .puml
+
+
+class DirectoryScanWorker(QRunnable):
+    """Legge un solo livello di cartella fuori dal thread della GUI.
+
+    Salta le stesse cartelle di find_puml_files (is_skipped_dir) e i link
+    simbolici a cartelle.
+    """
+    def __init__(self, path: str, excluded=frozenset()):
+        super().__init__()
+        self.path = path
+        self.excluded = excluded
+        self.signals = DirectoryScanSignals()
+
+    def run(self):
+        dirs, files = [], []
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not is_skipped_dir(entry.path, self.excluded):
+                                dirs.append(entry.name)
+                        elif entry.name.endswith(".puml") and entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        self.signals.finished.emit(self.path, sorted(dirs, key=str.lower), sorted(files, key=str.lower))
+
 
 class FileTreeWidget(QTreeWidget):
+    """Albero del progetto caricato in modo pigro.
+
+    Ogni cartella viene letta in background quando viene espansa (le sue
+    sottocartelle subito dopo, un livello avanti) e poi tenuta aggiornata
+    da un QFileSystemWatcher, rileggendo soltanto la cartella modificata.
+    Le cartelle lette senza file .puml né sottocartelle visibili restano
+    nascoste finché non ne compare uno.
+    """
+    DIR_ROLE = Qt.ItemDataRole.UserRole + 1
+    LINE_ROLE = Qt.ItemDataRole.UserRole + 2  # riga da aprire (risultati della ricerca)
+    files_changed = pyqtSignal(list, list)  # file .puml aggiunti, rimossi
+
     def __init__(self):
         super().__init__()
         self.setHeaderHidden(True)
@@ -31,17 +79,213 @@ class FileTreeWidget(QTreeWidget):
         # Spaziatura e indent
         self.setIndentation(15)
         self.setUniformRowHeights(True)
+        # Selezione multipla (Ctrl/Shift) per esportare più file o cartelle
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+
+        # Un solo brush condiviso da tutti gli item file
+        self.file_brush = QBrush(QColor("#d4d4d4"))
+
+        # =========================
+        # SCANSIONE E WATCHER
+        # =========================
+        self.root_path = None
+        self.excluded = frozenset()  # cartelle da non mostrare (percorsi assoluti)
+        self._dir_items = {}   # cartella -> item (invisibleRootItem per la radice)
+        self._loaded = set()
+        self._pending = set()
+        self._dirty = set()
+
+        self.threadpool = QThreadPool.globalInstance()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._schedule_rescan)
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(200)  # raggruppa raffiche di modifiche
+        self.rescan_timer.timeout.connect(self._flush_rescans)
 
-    def load_puml_files(self, project_path: str):
+        self.itemExpanded.connect(self._on_item_expanded)
+
+    def load_puml_files(self, project_path: str, snapshot: dict = None, excluded=()):
+        """Carica l'albero del progetto; con `snapshot` (vedi snapshot()) lo mostra subito"""
         self.clear()
+        self.excluded = frozenset(os.path.abspath(path) for path in excluded)
+        watched = self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+
+        self.root_path = os.path.abspath(project_path)
+        self._dir_items = {self.root_path: self.invisibleRootItem()}
+        self._loaded = set()
+        self._pending = set()
+        self._dirty = set()
+        if snapshot:
+            self._restore(snapshot)
+        else:
+            self._scan(self.root_path)
+
+    def set_excluded(self, excluded):
+        """Cambia le cartelle escluse (es. nuova cartella di export) e rilegge quelle già caricate"""
+        excluded = frozenset(os.path.abspath(path) for path in excluded)
+        if excluded == self.excluded:
+            return
+        self.excluded = excluded
+        for path in list(self._loaded):
+            self._scan(path)
+
+    # =========================
+    # ISTANTANEA (SESSIONE)
+    # =========================
+    def snapshot(self) -> dict:
+        """Cartelle già lette (relative alla radice) con il loro contenuto, e quelle espanse"""
+        dirs, expanded = {}, []
+        if self.root_path is None:
+            return {"dirs": dirs, "expanded": expanded}
+        for path, item in self._dir_items.items():
+            if path not in self._loaded:
+                continue
+            rel_path = os.path.relpath(path, self.root_path)
+            subdirs, files = [], []
+            for i in range(item.childCount()):
+                child = item.child(i)
+                (subdirs if child.data(0, self.DIR_ROLE) is not None else files).append(child.text(0))
+            dirs[rel_path] = [subdirs, files]
+            if item is not self.invisibleRootItem() and item.isExpanded():
+                expanded.append(rel_path)
+        return {"dirs": dirs, "expanded": expanded}
+
+    def _restore(self, snapshot: dict):
+        """Mostra subito l'albero salvato, poi rilegge in background ogni cartella:
+        le differenze con il disco arrivano come una normale modifica (files_changed)"""
+        dirs = snapshot.get("dirs", {})
+        # Prima le cartelle superiori: ogni cartella ha bisogno dell'item del genitore
+        for rel_path in sorted(dirs, key=lambda rel_path: 0 if rel_path == "." else rel_path.count(os.sep) + 1):
+            subdirs, files = dirs[rel_path]
+            self._on_scanned(os.path.normpath(os.path.join(self.root_path, rel_path)), subdirs, files)
+        for rel_path in snapshot.get("expanded", []):
+            item = self._dir_items.get(os.path.normpath(os.path.join(self.root_path, rel_path)))
+            if item is not None:
+                item.setExpanded(True)
+        if self.root_path not in self._loaded:
+            self._scan(self.root_path)
+        for path in list(self._loaded):
+            self._scan(path)
+
+    # =========================
+    # SCANSIONE
+    # =========================
+    def _scan(self, path: str):
+        if path in self._pending:
+            return
+        self._pending.add(path)
+        worker = DirectoryScanWorker(path, self.excluded)
+        worker.signals.finished.connect(self._on_scanned)
+        self.threadpool.start(worker)
+
+    def _on_item_expanded(self, item):
+        path = item.data(0, self.DIR_ROLE)
+        if path and path not in self._loaded:
+            self._scan(path)  # le sottocartelle le legge _on_scanned
+        elif path:
+            self._scan_subdirs(item)
+
+    def _scan_subdirs(self, item):
+        """Legge in anticipo le sottocartelle di `item`: quelle vuote spariscono prima di essere aperte"""
+        for i in range(item.childCount()):
+            path = item.child(i).data(0, self.DIR_ROLE)
+            if path is not None and path not in self._loaded:
+                self._scan(path)
+
+    def _update_visibility(self, path: str):
+        """Nasconde una cartella letta senza figli visibili (o la rimostra) e ricontrolla le superiori"""
+        while path != self.root_path:
+            item = self._dir_items.get(path)
+            if item is None or path not in self._loaded:
+                return
+            empty = all(item.child(i).isHidden() for i in range(item.childCount()))
+            if item.isHidden() == empty:
+                return
+            item.setHidden(empty)
+            path = os.path.dirname(path)
+
+    def _schedule_rescan(self, path: str):
+        self._dirty.add(path)
+        self.rescan_timer.start()
+
+    def _flush_rescans(self):
+        dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            if path in self._dir_items:
+                self._scan(path)
+
+    def _on_scanned(self, path: str, dirs: list, files: list):
+        self._pending.discard(path)
+        parent = self._dir_items.get(path)
+        if parent is None:
+            return  # progetto cambiato o cartella rimossa nel frattempo
+
+        first_load = path not in self._loaded
+        self._loaded.add(path)
+        if os.path.isdir(path):
+            self.watcher.addPath(path)
+
+        wanted = [(True, name) for name in dirs] + [(False, name) for name in files]
+        wanted_set = set(wanted)
+        existing = {}
+        removed = []
+        for i in reversed(range(parent.childCount())):
+            child = parent.child(i)
+            is_dir = child.data(0, self.DIR_ROLE) is not None
+            entry = (is_dir, child.text(0))
+            if entry in wanted_set:
+                existing[entry] = child
+            else:
+                parent.takeChild(i)
+                removed.extend(self._forget(child))
+
+        added = []
+        for index, (is_dir, name) in enumerate(wanted):
+            if (is_dir, name) in existing:
+                continue
+            full_path = os.path.join(path, name)
+            parent.insertChild(index, self._make_item(full_path, name, is_dir))
+            if not is_dir:
+                added.append(full_path)
+
+        if parent is not self.invisibleRootItem() and not wanted:
+            parent.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicatorWhenChildless)
+        self._update_visibility(path)
+        if parent is self.invisibleRootItem() or parent.isExpanded():
+            self._scan_subdirs(parent)
+
+        if not first_load and (added or removed):
+            self.files_changed.emit(added, removed)
+
+    def _make_item(self, full_path: str, name: str, is_dir: bool):
+        # Mostra solo il nome del file
+        item = QTreeWidgetItem([name])
+        if is_dir:
+            item.setData(0, self.DIR_ROLE, full_path)
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+            self._dir_items[full_path] = item
+        else:
+            # Salva il percorso completo in UserRole
+            item.setData(0, Qt.ItemDataRole.UserRole, full_path)
+            item.setForeground(0, self.file_brush)
+        return item
+
+    def _forget(self, item):
+        """Dimentica un item rimosso (e il suo sottoalbero); restituisce i file .puml persi"""
+        file_path = item.data(0, Qt.ItemDataRole.UserRole)
+        if file_path:
+            return [file_path]
 
-        for root, _, files in os.walk(project_path):
-            for file in files:
-                if file.endswith(".puml"):
-                    full_path = os.path.join(root, file)
-                    # Mostra solo il nome del file
-                    item = QTreeWidgetItem(self, [file])
-                    # Salva il percorso completo in UserRole
-                    item.setData(0, Qt.ItemDataRole.UserRole, full_path)
-                    # Opzionale: colore dei file
-                    item.setForeground(0, QBrush(QColor("#d4d4d4")))
+        removed = []
+        dir_path = item.data(0, self.DIR_ROLE)
+        self._dir_items.pop(dir_path, None)
+        self._pending.discard(dir_path)
+        if dir_path in self._loaded:
+            self._loaded.discard(dir_path)
+            self.watcher.removePath(dir_path)
+        for i in range(item.childCount()):
+            removed.extend(self._forget(item.child(i)))
+        return removed
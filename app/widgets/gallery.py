@@ -0,0 +1,387 @@
+import bisect
+import os
+from collections import OrderedDict
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QPushButton, QListView
+from PyQt6.QtCore import (
+    Qt, QObject, QRunnable, QThreadPool, QTimer, QSize, QAbstractListModel, QModelIndex, QSortFilterProxyModel,
+    pyqtSignal
+)
+from PyQt6.QtGui import QColor, QIcon, QPainter, QPixmap
+
+from app.project_manager import find_puml_files
+from app.thumbnails import THUMBNAIL_SIZE, ThumbnailLoader
+
+
+class ProjectScanSignals(QObject):
+    finished = pyqtSignal(str, list)  # cartella del progetto, file .puml
+
+
+class ProjectScanWorker(QRunnable):
+    """Elenca tutti i file .puml del progetto fuori dal thread della GUI"""
+    def __init__(self, path: str, excluded=()):
+        super().__init__()
+        self.path = path
+        self.excluded = excluded
+        self.signals = ProjectScanSignals()
+
+    def run(self):
+        self.signals.finished.emit(self.path, list(find_puml_files(self.path, self.excluded)))
+
+
+class GalleryModel(QAbstractListModel):
+    """Un elemento per file del progetto, ordinati per percorso relativo.
+
+    Le miniature arrivano da ThumbnailLoader e restano in un LRU di icone
+    limitato in byte: con migliaia di file in memoria ci sono solo quelle
+    viste di recente, le altre tornano dalla cache su disco quando
+    rientrano nella vista.
+    """
+    PATH_ROLE = Qt.ItemDataRole.UserRole
+    RELATIVE_ROLE = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, size: int = THUMBNAIL_SIZE, memory_limit: int = 64 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.memory_limit = memory_limit
+        self.root = None
+        self.paths = []   # percorsi assoluti, nell'ordine di `_keys`
+        self._keys = []   # chiave di ordinamento (percorso relativo minuscolo)
+        self._icons = OrderedDict()  # percorso -> (QIcon, byte)
+        self._icons_size = 0
+        self._errors = {}  # percorso -> messaggio
+        self._stale = set()  # miniature da rigenerare (file cambiato)
+        self.loading_icon = self._placeholder("…", "#2d2d2d")
+        self.error_icon = self._placeholder("!", "#4b2525")
+
+    def _placeholder(self, text: str, color: str) -> QIcon:
+        pixmap = QPixmap(self.size, self.size * 3 // 4)
+        pixmap.fill(QColor(color))
+        painter = QPainter(pixmap)
+        painter.setPen(QColor("#858585"))
+        painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, text)
+        painter.end()
+        return QIcon(pixmap)
+
+    def _sort_key(self, path: str) -> str:
+        return os.path.relpath(path, self.root).lower() if self.root else path.lower()
+
+    # =========================
+    # FILE
+    # =========================
+    def set_files(self, root: str, paths):
+        self.beginResetModel()
+        self.root = root
+        entries = sorted((self._sort_key(path), path) for path in {os.path.abspath(path) for path in paths})
+        self._keys = [key for key, _ in entries]
+        self.paths = [path for _, path in entries]
+        present = set(self.paths)
+        for path in [path for path in self._icons if path not in present]:
+            self._forget_icon(path)
+        self._errors = {path: error for path, error in self._errors.items() if path in present}
+        self._stale &= present
+        self.endResetModel()
+
+    def add_files(self, paths):
+        for path in map(os.path.abspath, paths):
+            key = self._sort_key(path)
+            row = bisect.bisect_left(self._keys, key)
+            if row < len(self.paths) and self.paths[row] == path:
+                continue
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._keys.insert(row, key)
+            self.paths.insert(row, path)
+            self.endInsertRows()
+
+    def remove_files(self, paths):
+        for path in map(os.path.abspath, paths):
+            row = self.row_of(path)
+            if row is None:
+                continue
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._keys[row]
+            del self.paths[row]
+            self.endRemoveRows()
+            self._forget_icon(path)
+            self._errors.pop(path, None)
+            self._stale.discard(path)
+
+    def row_of(self, path: str):
+        row = bisect.bisect_left(self._keys, self._sort_key(path))
+        return row if row < len(self.paths) and self.paths[row] == path else None
+
+    # =========================
+    # MINIATURE
+    # =========================
+    def needs_thumbnail(self, path: str) -> bool:
+        return path in self._stale or (path not in self._icons and path not in self._errors)
+
+    def set_thumbnail(self, path: str, image):
+        if self.row_of(path) is None:
+            return  # file rimosso (o di un altro progetto) mentre la miniatura era in corso
+        self._stale.discard(path)
+        self._errors.pop(path, None)
+        self._forget_icon(path)
+        size = image.sizeInBytes()
+        self._icons[path] = (QIcon(QPixmap.fromImage(image)), size)
+        self._icons_size += size
+        while self._icons_size > self.memory_limit and len(self._icons) > 1:
+            _, (_, evicted) = self._icons.popitem(last=False)
+            self._icons_size -= evicted
+        self._changed(path)
+
+    def set_error(self, path: str, message: str):
+        if self.row_of(path) is None:
+            return
+        self._stale.discard(path)
+        self._forget_icon(path)
+        self._errors[path] = message
+        self._changed(path)
+
+    def invalidate(self, paths):
+        """Miniature da rigenerare; quella vecchia resta visibile finché non arriva la nuova"""
+        for path in map(os.path.abspath, paths):
+            if self.row_of(path) is not None:
+                self._stale.add(path)
+
+    def _forget_icon(self, path: str):
+        entry = self._icons.pop(path, None)
+        if entry is not None:
+            self._icons_size -= entry[1]
+
+    def _changed(self, path: str):
+        row = self.row_of(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.ToolTipRole])
+
+    def memory_usage(self) -> int:
+        return self._icons_size
+
+    # =========================
+    # MODELLO
+    # =========================
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.ItemDataRole.DecorationRole:
+            entry = self._icons.get(path)
+            if entry is not None:
+                self._icons.move_to_end(path)
+                return entry[0]
+            return self.error_icon if path in self._errors else self.loading_icon
+        if role == Qt.ItemDataRole.ToolTipRole:
+            relative = os.path.relpath(path, self.root) if self.root else path
+            error = self._errors.get(path)
+            return f"{relative}\n{error}" if error else relative
+        if role == self.PATH_ROLE:
+            return path
+        if role == self.RELATIVE_ROLE:
+            return self._keys[index.row()]
+        return None
+
+
+class GalleryPanel(QWidget):
+    """Galleria delle miniature di tutti i diagrammi del progetto.
+
+    La vista è virtualizzata (QListView con elementi di dimensione fissa):
+    si disegnano solo gli elementi visibili e, a scorrimento fermo, si
+    chiedono al ThumbnailLoader le miniature della pagina visibile e di
+    quelle vicine. Doppio clic o Invio aprono il file (`open_requested`).
+    """
+    REFRESH_DELAY_MS = 40
+    open_requested = pyqtSignal(str)
+
+    def __init__(self, jar_path: str, render_cache=None, cache=None, size: int = THUMBNAIL_SIZE, jobs: int = 2):
+        super().__init__()
+        self.root = None
+        self.excluded = []  # cartelle non mostrate (oltre a quelle nascoste)
+        self.threadpool = QThreadPool.globalInstance()
+        self.loader = ThumbnailLoader(jar_path, render_cache, cache, size=size, jobs=jobs, parent=self)
+        self.loader.ready.connect(self._on_ready)
+        self.loader.failed.connect(self._on_failed)
+        self.loader.idle.connect(self.update_status)
+
+        self.model = GalleryModel(size, parent=self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterRole(GalleryModel.RELATIVE_ROLE)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("Filter diagrams")
+        self.filter.setClearButtonEnabled(True)
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
+        rescan = QPushButton("Refresh")
+        rescan.clicked.connect(self.rescan)
+
+        self.view = QListView()
+        self.view.setViewMode(QListView.ViewMode.IconMode)
+        self.view.setMovement(QListView.Movement.Static)
+        self.view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.view.setBatchSize(500)
+        self.view.setIconSize(QSize(size, size))
+        self.view.setGridSize(QSize(size + 24, size + 32))
+        self.view.setTextElideMode(Qt.TextElideMode.ElideMiddle)
+        self.view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.view.verticalScrollBar().setSingleStep(24)
+        self.view.setModel(self.proxy)
+        self.view.activated.connect(lambda index: self.open_requested.emit(index.data(GalleryModel.PATH_ROLE)))
+        self.view.setStyleSheet("""
+            QListView {
+                background-color: #1e1e1e;
+                color: #d4d4d4;
+                border: none;
+            }
+            QListView::item:selected {
+                background-color: #094771;
+                color: #ffffff;
+            }
+        """)
+        self.status = QLabel()
+
+        options = QHBoxLayout()
+        options.addWidget(self.filter)
+        options.addWidget(rescan)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(options)
+        layout.addWidget(self.view)
+        layout.addWidget(self.status)
+        self.setLayout(layout)
+
+        # Le miniature si chiedono solo a vista ferma: scorrere non accoda render
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(self.REFRESH_DELAY_MS)
+        self.refresh_timer.timeout.connect(self.request_visible)
+        self.view.verticalScrollBar().valueChanged.connect(self.schedule_refresh)
+        self.proxy.modelReset.connect(self.schedule_refresh)
+        self.proxy.rowsInserted.connect(self.schedule_refresh)
+        self.proxy.rowsRemoved.connect(self.schedule_refresh)
+        self.proxy.layoutChanged.connect(self.schedule_refresh)
+
+    # =========================
+    # PROGETTO
+    # =========================
+    def set_project(self, folder: str, dependencies=None, server_url: str = None, jar_version: str = None,
+                    server_start=None, excluded=()):
+        """Progetto da mostrare e backend di render della preview (chiavi di cache condivise).
+
+        `excluded`: cartelle da non mostrare, come nell'albero (vedi find_puml_files).
+        """
+        self.loader.configure(folder, dependencies, server_url, jar_version, server_start)
+        self.root = os.path.abspath(folder) if folder else None
+        self.excluded = list(excluded)
+        self.model.set_files(self.root, [])
+        self.rescan()
+
+    def rescan(self):
+        if self.root is None:
+            self.status.setText("Open a project to browse its diagrams")
+            return
+        self.status.setText("Scanning project…")
+        worker = ProjectScanWorker(self.root, self.excluded)
+        worker.signals.finished.connect(self._on_scanned)
+        self.threadpool.start(worker)
+
+    def _on_scanned(self, folder: str, paths: list):
+        if folder != self.root:
+            return  # scansione di un progetto non più aperto
+        self.model.set_files(folder, paths)
+        self.update_status()
+
+    def add_files(self, paths):
+        self.model.add_files(paths)
+        self.update_status()
+
+    def remove_files(self, paths):
+        self.model.remove_files(paths)
+        self.update_status()
+
+    def invalidate(self, paths):
+        """File cambiati su disco: si rigenerano le loro miniature e quelle di chi li include"""
+        paths = set(map(os.path.abspath, paths))
+        dependencies = self.loader.dependencies
+        if dependencies is not None:
+            for path in list(paths):
+                paths |= dependencies.dependents(path)
+        self.model.invalidate(paths)
+        self.schedule_refresh()
+
+    # =========================
+    # MINIATURE VISIBILI
+    # =========================
+    def visible_rows(self) -> range:
+        """Righe del proxy visibili, dalla geometria della griglia (nessun elemento da interrogare)"""
+        rows = self.proxy.rowCount()
+        grid = self.view.gridSize()
+        viewport = self.view.viewport().rect()
+        if not rows or grid.width() <= 0 or grid.height() <= 0:
+            return range(0)
+        columns = max(1, viewport.width() // grid.width())
+        top = self.view.verticalScrollBar().value()
+        first = top // grid.height() * columns
+        last = ((top + viewport.height()) // grid.height() + 1) * columns
+        return range(min(first, rows), min(last, rows))
+
+    def schedule_refresh(self, *args):
+        # Senza argomenti: start(int) userebbe il valore del segnale come intervallo
+        self.refresh_timer.start()
+
+    def request_visible(self):
+        """Miniature mancanti della pagina visibile, poi della successiva e della precedente"""
+        if not self.isVisible():
+            return
+        visible = self.visible_rows()
+        page = max(len(visible), 1)
+        rows = self.proxy.rowCount()
+        order = list(visible)
+        order += range(visible.stop, min(visible.stop + page, rows))
+        order += reversed(range(max(visible.start - page, 0), visible.start))
+        paths = []
+        for row in order:
+            path = self.proxy.index(row, 0).data(GalleryModel.PATH_ROLE)
+            if self.model.needs_thumbnail(path):
+                paths.append(path)
+        self.loader.request(paths)
+        self.update_status()
+
+    def _on_ready(self, path: str, image):
+        self.model.set_thumbnail(path, image)
+
+    def _on_failed(self, path: str, message: str):
+        self.model.set_error(path, message)
+
+    def update_status(self):
+        stats = self.loader.stats()
+        busy = f" — generating {stats['running'] + stats['queued']}" if self.loader.busy() else ""
+        self.status.setText(
+            f"{len(self.model.paths)} diagrams — thumbnails: {stats['cache']} cached, "
+            f"{stats['preview'] + stats['render']} generated, {stats['error']} errors{busy}"
+        )
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.schedule_refresh()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.loader.request([])  # galleria chiusa: niente più render in coda
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_refresh()
+
+    def shutdown(self):
+        self.refresh_timer.stop()
+        self.loader.shutdown()
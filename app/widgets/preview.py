@@ -1,17 +1,90 @@
-from PyQt6.QtWidgets import QLabel, QScrollArea
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtWidgets import QLabel, QScrollArea, QStackedWidget, QWidget, QVBoxLayout
+from PyQt6.QtGui import QPixmap, QImage
 from PyQt6.QtCore import Qt
 
 
-class PreviewWidget(QScrollArea):
-    """Scroll area per mostrare il PNG generato"""
+class PreviewWidget(QStackedWidget):
+    """Preview dei diagrammi: pagine PNG in una scroll area oppure SVG a tasselli.
+
+    Un file con più blocchi @startuml ... @enduml diventa una vista a più
+    pagine, una per diagramma, aggiornabili singolarmente.
+    """
+    PAGE_SPACING = 24
+
     def __init__(self):
         super().__init__()
-        self.label = QLabel()
-        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.setWidget(self.label)
-        self.setWidgetResizable(True)
-
-    def update_image(self, image_path: str):
-        pixmap = QPixmap(image_path)
-        self.label.setPixmap(pixmap)
+        self.pages_widget = QWidget()
+        self.pages_layout = QVBoxLayout(self.pages_widget)
+        self.pages_layout.setSpacing(self.PAGE_SPACING)
+        self.pages_layout.addStretch(1)
+        self.labels = []       # una QLabel per pagina
+        self._sources = []     # QImage (o percorso) mostrato da ogni label
+        self.raster_view = QScrollArea()
+        self.raster_view.setWidget(self.pages_widget)
+        self.raster_view.setWidgetResizable(True)
+        self.addWidget(self.raster_view)
+
+        self.svg_view = None  # creata alla prima preview SVG (QtSvg non serve all'avvio)
+        self.current_page = 0
+
+    def _vector_view(self):
+        if self.svg_view is None:
+            from app.widgets.svg_preview import SvgPreviewView
+            self.svg_view = SvgPreviewView()
+            self.addWidget(self.svg_view)
+        return self.svg_view
+
+    # =========================
+    # PAGINE
+    # =========================
+    def update_pages(self, fmt: str, pages: list):
+        """Mostra un diagramma per pagina (QImage, percorso o byte SVG; None = in attesa)"""
+        if fmt == "svg":
+            self.setCurrentWidget(self._vector_view())
+            self.svg_view.update_pages(pages)
+            return
+
+        self.setCurrentWidget(self.raster_view)
+        while len(self.labels) < len(pages):
+            label = QLabel()
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.pages_layout.insertWidget(len(self.labels), label)
+            self.labels.append(label)
+            self._sources.append(None)
+        while len(self.labels) > len(pages):
+            self.labels.pop().deleteLater()
+            self._sources.pop()
+        for index, page in enumerate(pages):
+            self.update_page(fmt, index, page)
+
+    def update_page(self, fmt: str, index: int, page):
+        """Aggiorna una sola pagina; le altre non vengono toccate"""
+        if fmt == "svg":
+            self._vector_view().update_page(index, page)
+            return
+        if index >= len(self.labels) or self._sources[index] is page:
+            return
+        self._sources[index] = page
+        label = self.labels[index]
+        if page is None:
+            label.clear()
+        elif isinstance(page, QImage):
+            label.setPixmap(QPixmap.fromImage(page))
+        else:
+            label.setPixmap(QPixmap(page))
+
+    def scroll_to_page(self, index: int):
+        """Porta in vista la pagina `index` (il diagramma sotto il cursore)"""
+        self.current_page = index
+        if self.svg_view is not None and self.currentWidget() is self.svg_view:
+            self.svg_view.scroll_to_page(index)
+        elif 0 <= index < len(self.labels):
+            self.raster_view.verticalScrollBar().setValue(self.labels[index].y())
+
+    def update_image(self, image):
+        """Accetta una QImage già decodificata, un percorso file oppure None"""
+        self.update_pages("png", [] if image is None else [image])
+
+    def update_svg(self, data: bytes):
+        """Mostra un SVG (byte) nella vista vettoriale, mantenendo zoom e posizione"""
+        self.update_pages("svg", [] if data is None else [data])
@@ -0,0 +1,177 @@
+import os
+import re
+import threading
+import time
+
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QCheckBox, QLabel, QTreeWidget, QTreeWidgetItem
+)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from app.text_index import SEARCH_LIMIT
+from app.widgets.file_tree import FileTreeWidget
+
+
+class SearchSignals(QObject):
+    matches = pyqtSignal(int, list)   # id ricerca, SearchMatch trovati
+    finished = pyqtSignal(int, dict)  # id ricerca, statistiche
+
+
+class SearchWorker(QRunnable):
+    """Interroga l'indice fuori dal thread della GUI e invia i risultati a gruppi"""
+    BATCH_INTERVAL = 0.05  # secondi tra un invio e l'altro
+
+    def __init__(self, search_id: int, index, query: str, regex: bool, case_sensitive: bool,
+                 cancel: threading.Event):
+        super().__init__()
+        self.search_id = search_id
+        self.index = index
+        self.query = query
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.cancel = cancel
+        self.signals = SearchSignals()
+
+    def run(self):
+        start = time.perf_counter()
+        batch, last_sent, total, truncated = [], start, 0, False
+        # Un risultato oltre il limite dice se la lista è davvero troncata
+        for number, match in enumerate(self.index.search(self.query, self.regex, self.case_sensitive,
+                                                         self.cancel, SEARCH_LIMIT + 1), start=1):
+            if number > SEARCH_LIMIT:
+                truncated = True
+                break
+            batch.append(match)
+            now = time.perf_counter()
+            if now - last_sent >= self.BATCH_INTERVAL:
+                self.signals.matches.emit(self.search_id, batch)
+                total += len(batch)
+                batch, last_sent = [], now
+        if batch:
+            self.signals.matches.emit(self.search_id, batch)
+            total += len(batch)
+        self.signals.finished.emit(self.search_id, {
+            "matches": total,
+            "seconds": time.perf_counter() - start,
+            "cancelled": self.cancel.is_set(),
+            "truncated": truncated,
+        })
+
+
+class SearchPanel(QWidget):
+    """Ricerca nei file del progetto con risultati in streaming.
+
+    I risultati sono item con percorso (UserRole) e riga (LINE_ROLE) come
+    quelli dell'albero del progetto: `results.itemActivated` si collega
+    direttamente a MainWindow.open_file.
+    """
+    def __init__(self):
+        super().__init__()
+        self.index = None
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("Find in files")
+        self.regex = QCheckBox("Regex")
+        self.case_sensitive = QCheckBox("Match case")
+        self.results = QTreeWidget()
+        self.results.setHeaderLabels(["Match", "Line"])
+        self.results.setUniformRowHeights(True)
+        self.status = QLabel()
+
+        options = QHBoxLayout()
+        options.addWidget(self.query)
+        options.addWidget(self.regex)
+        options.addWidget(self.case_sensitive)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(options)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status)
+        self.setLayout(layout)
+
+        self._search_id = 0
+        self._cancel = None
+        self._file_items = {}  # percorso -> item del file
+        self.threadpool = QThreadPool.globalInstance()
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.start_search)
+
+        self.query.textChanged.connect(self.search_timer.start)
+        self.query.returnPressed.connect(self.start_search)
+        self.regex.toggled.connect(self.search_timer.start)
+        self.case_sensitive.toggled.connect(self.search_timer.start)
+
+    def set_index(self, index):
+        self.cancel_search()
+        self.index = index
+        self.results.clear()
+        self._file_items = {}
+
+    def focus_query(self, text: str = None):
+        if text:
+            self.query.setText(text)
+        self.query.setFocus()
+        self.query.selectAll()
+
+    # =========================
+    # RICERCA
+    # =========================
+    def cancel_search(self):
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+
+    def start_search(self):
+        self.search_timer.stop()
+        self.cancel_search()
+        self._search_id += 1
+        self.results.clear()
+        self._file_items = {}
+
+        query = self.query.text()
+        if self.index is None or not query:
+            self.status.setText("" if self.index is not None else "Open a project to search")
+            return
+        if self.regex.isChecked():
+            try:
+                re.compile(query)
+            except re.error as e:
+                self.status.setText(f"Regex non valida: {e}")
+                return
+
+        self._cancel = threading.Event()
+        worker = SearchWorker(self._search_id, self.index, query, self.regex.isChecked(),
+                              self.case_sensitive.isChecked(), self._cancel)
+        worker.signals.matches.connect(self._on_matches)
+        worker.signals.finished.connect(self._on_finished)
+        self.status.setText("Searching...")
+        self.threadpool.start(worker)
+
+    def _on_matches(self, search_id, matches):
+        if search_id != self._search_id:
+            return
+        for match in matches:
+            parent = self._file_items.get(match.path)
+            if parent is None:
+                rel_path = os.path.relpath(match.path, self.index.project_dir)
+                parent = self._file_items[match.path] = QTreeWidgetItem(self.results, [rel_path])
+                parent.setData(0, Qt.ItemDataRole.UserRole, match.path)
+                parent.setExpanded(True)
+            item = QTreeWidgetItem(parent, [match.text.strip(), str(match.line)])
+            item.setData(0, Qt.ItemDataRole.UserRole, match.path)
+            item.setData(0, FileTreeWidget.LINE_ROLE, match.line)
+        self.status.setText(f"{self._count()} matches so far...")
+
+    def _on_finished(self, search_id, stats):
+        if search_id != self._search_id or stats["cancelled"]:
+            return
+        self._cancel = None
+        matches = f"{stats['matches']} matches"
+        if stats["truncated"]:
+            matches = f"{stats['matches']}+ matches (limit reached)"
+        self.status.setText(f"{matches} in {len(self._file_items)} files ({stats['seconds'] * 1000:.0f} ms)")
+
+    def _count(self) -> int:
+        return sum(item.childCount() for item in self._file_items.values())
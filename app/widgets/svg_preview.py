@@ -0,0 +1,186 @@
+import math
+from collections import OrderedDict
+
+from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QStyleOptionGraphicsItem
+from PyQt6.QtGui import QPainter, QPixmap, QColor
+from PyQt6.QtCore import Qt, QRectF, QByteArray
+from PyQt6.QtSvg import QSvgRenderer
+
+
+class TiledSvgItem(QGraphicsItem):
+    """Disegna un SVG a tasselli: solo quelli visibili, al livello di zoom corrente.
+
+    I tasselli sono pixmap di TILE_SIZE pixel dello schermo, calcolati per
+    uno zoom arrotondato a potenze di 2^(1/2) e tenuti in una cache LRU:
+    pan e zoom riusano i tasselli già pronti, il costo dipende dalla
+    viewport e non dalla dimensione del diagramma.
+    """
+    TILE_SIZE = 256
+
+    def __init__(self, cache_limit=64 * 1024 * 1024):
+        super().__init__()
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption, True)
+        self.renderer = QSvgRenderer()
+        self.bounds = QRectF()
+        self.cache_limit = cache_limit
+        self._tiles = OrderedDict()  # (zoom, colonna, riga) -> QPixmap
+        self._tiles_size = 0
+        self.data = None  # byte SVG mostrati
+
+    def set_svg(self, data: bytes) -> bool:
+        if data is None:
+            self.prepareGeometryChange()
+            self.data = None
+            self.bounds = QRectF()
+            self.clear_tiles()
+            self.update()
+            return True
+        if data == self.data:
+            return True
+        renderer = QSvgRenderer(QByteArray(data))
+        if not renderer.isValid():
+            return False
+        self.prepareGeometryChange()
+        self.data = data
+        self.renderer = renderer
+        view_box = renderer.viewBoxF()
+        if view_box.isEmpty():
+            size = renderer.defaultSize()
+            view_box = QRectF(0, 0, size.width(), size.height())
+        self.bounds = QRectF(0, 0, view_box.width(), view_box.height())
+        self.clear_tiles()
+        self.update()
+        return True
+
+    def clear_tiles(self):
+        self._tiles.clear()
+        self._tiles_size = 0
+
+    def boundingRect(self):
+        return self.bounds
+
+    # =========================
+    # DISEGNO
+    # =========================
+    @staticmethod
+    def _zoom_bucket(lod: float) -> float:
+        return 2 ** (round(math.log2(max(lod, 1e-3)) * 2) / 2)
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        if self.bounds.isEmpty():
+            return
+        zoom = self._zoom_bucket(option.levelOfDetailFromTransform(painter.worldTransform()))
+        tile_scene = self.TILE_SIZE / zoom
+        exposed = option.exposedRect.intersected(self.bounds)
+
+        first_col = int(exposed.left() // tile_scene)
+        last_col = int(exposed.right() // tile_scene)
+        first_row = int(exposed.top() // tile_scene)
+        last_row = int(exposed.bottom() // tile_scene)
+
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                pixmap = self._tile(zoom, col, row)
+                target = QRectF(col * tile_scene, row * tile_scene, tile_scene, tile_scene)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+    def _tile(self, zoom: float, col: int, row: int) -> QPixmap:
+        key = (zoom, col, row)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+
+        pixmap = QPixmap(self.TILE_SIZE, self.TILE_SIZE)
+        pixmap.fill(QColor("white"))
+        tile_painter = QPainter(pixmap)
+        tile_painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        tile_painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        tile_painter.scale(zoom, zoom)
+        tile_painter.translate(-col * self.TILE_SIZE / zoom, -row * self.TILE_SIZE / zoom)
+        # Il clip limita la rasterizzazione al solo tassello
+        tile_painter.setClipRect(QRectF(col * self.TILE_SIZE / zoom, row * self.TILE_SIZE / zoom,
+                                        self.TILE_SIZE / zoom, self.TILE_SIZE / zoom))
+        self.renderer.render(tile_painter, self.bounds)
+        tile_painter.end()
+
+        self._tiles[key] = pixmap
+        self._tiles_size += self.TILE_SIZE * self.TILE_SIZE * 4
+        while self._tiles_size > self.cache_limit and len(self._tiles) > 1:
+            self._tiles.popitem(last=False)
+            self._tiles_size -= self.TILE_SIZE * self.TILE_SIZE * 4
+        return pixmap
+
+
+class SvgPreviewView(QGraphicsView):
+    """Preview vettoriale a pagine: zoom con Ctrl+rotella, pan trascinando"""
+    MIN_ZOOM = 0.05
+    MAX_ZOOM = 32.0
+    PAGE_SPACING = 24
+
+    def __init__(self):
+        super().__init__()
+        self.setScene(QGraphicsScene(self))
+        self.items = []  # un TiledSvgItem per diagramma, impilati in verticale
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self.setBackgroundBrush(QColor("#ffffff"))
+        self.zoom = 1.0
+
+    def update_pages(self, pages: list):
+        """Sostituisce i diagrammi mantenendo zoom e posizione; le pagine uguali non vengono ridisegnate"""
+        while len(self.items) < len(pages):
+            item = TiledSvgItem()
+            self.scene().addItem(item)
+            self.items.append(item)
+        while len(self.items) > len(pages):
+            self.scene().removeItem(self.items.pop())
+        for item, data in zip(self.items, pages):
+            item.set_svg(data)
+        self._layout_pages()
+
+    def update_page(self, index: int, data: bytes) -> bool:
+        if index >= len(self.items) or not self.items[index].set_svg(data):
+            return False
+        self._layout_pages()
+        return True
+
+    def update_svg(self, data: bytes) -> bool:
+        """Mostra un solo diagramma"""
+        self.update_pages([data])
+        return self.items[0].data is not None
+
+    def clear(self):
+        self.update_pages([])
+
+    def _layout_pages(self):
+        y = 0.0
+        for item in self.items:
+            item.setPos(0, y)
+            if not item.bounds.isEmpty():
+                y += item.bounds.height() + self.PAGE_SPACING
+        width = max((item.bounds.width() for item in self.items), default=0)
+        self.scene().setSceneRect(QRectF(0, 0, width, max(y - self.PAGE_SPACING, 0)))
+        self.viewport().update()
+
+    def scroll_to_page(self, index: int):
+        """Allinea in alto la pagina `index`, senza cambiare zoom"""
+        if not 0 <= index < len(self.items):
+            return
+        top = self.mapFromScene(self.items[index].pos()).y()
+        bar = self.verticalScrollBar()
+        bar.setValue(bar.value() + top)
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+            new_zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, self.zoom * factor))
+            self.scale(new_zoom / self.zoom, new_zoom / self.zoom)
+            self.zoom = new_zoom
+            return
+        super().wheelEvent(event)
+
+    def reset_zoom(self):
+        self.resetTransform()
+        self.zoom = 1.0
@@ -24,14 +24,79 @@ class TopBar:
         project_menu.addAction(new_project_action)
         project_menu.addAction(open_project_action)
 
+        export_menu = self.menu_bar.addMenu("Export")
+
+        export_current_action = QAction("Export Current File...", self.main_window)
+        export_current_action.setShortcut(QKeySequence("Ctrl+E"))
+        export_current_action.triggered.connect(lambda: self.main_window.show_export("current"))
+
+        export_selection_action = QAction("Export Selected Files...", self.main_window)
+        export_selection_action.triggered.connect(lambda: self.main_window.show_export("selection"))
+
+        export_project_action = QAction("Export Project...", self.main_window)
+        export_project_action.triggered.connect(lambda: self.main_window.show_export("project"))
+
+        export_menu.addAction(export_current_action)
+        export_menu.addAction(export_selection_action)
+        export_menu.addAction(export_project_action)
+
+        view_menu = self.menu_bar.addMenu("View")
+
+        self.svg_preview_action = QAction("Vector Preview (SVG)", self.main_window)
+        self.svg_preview_action.setCheckable(True)
+        self.svg_preview_action.toggled.connect(
+            lambda checked: self.main_window.set_preview_format("svg" if checked else "png")
+        )
+
+        view_menu.addAction(self.svg_preview_action)
+        view_menu.addSeparator()
+
+        self.render_metrics_action = QAction("Collect Render Timings", self.main_window)
+        self.render_metrics_action.setCheckable(True)
+        self.render_metrics_action.setChecked(True)
+        self.render_metrics_action.toggled.connect(self.main_window.set_render_metrics)
+
+        export_timings_action = QAction("Export Render Timings...", self.main_window)
+        export_timings_action.triggered.connect(self.main_window.export_render_timings)
+
+        view_menu.addAction(self.render_metrics_action)
+        view_menu.addAction(export_timings_action)
+        view_menu.addSeparator()
+
+        tab_memory_action = QAction("Tab Memory Usage...", self.main_window)
+        tab_memory_action.triggered.connect(self.main_window.show_tab_memory)
+
+        view_menu.addAction(tab_memory_action)
+
+        gallery_action = QAction("Diagram Gallery", self.main_window)
+        gallery_action.setShortcut(QKeySequence("Ctrl+Shift+G"))
+        gallery_action.triggered.connect(self.main_window.show_gallery)
+
+        view_menu.addAction(gallery_action)
+
 
     def _create_shortcuts(self):
         save_action = QAction("Save", self.main_window)
         save_action.setShortcut(QKeySequence.StandardKey.Save)
         save_action.triggered.connect(self.main_window.save_current_file)
 
+        definition_action = QAction("Go to Definition", self.main_window)
+        definition_action.setShortcut(QKeySequence("F12"))
+        definition_action.triggered.connect(self.main_window.go_to_definition)
+
+        symbol_action = QAction("Go to Symbol", self.main_window)
+        symbol_action.setShortcut(QKeySequence("Ctrl+T"))
+        symbol_action.triggered.connect(lambda: self.main_window.search_symbols())
+
+        search_action = QAction("Find in Files", self.main_window)
+        search_action.setShortcut(QKeySequence("Ctrl+Shift+F"))
+        search_action.triggered.connect(self.main_window.show_search)
+
         # Le shortcut globali vanno aggiunte al MainWindow
         self.main_window.addAction(save_action)
+        self.main_window.addAction(definition_action)
+        self.main_window.addAction(symbol_action)
+        self.main_window.addAction(search_action)
 
 
     def get_menu_bar(self):
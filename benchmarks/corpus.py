@@ -0,0 +1,122 @@
+"""Corpora sintetici di file .puml per i benchmark.
+
+Il contenuto dipende solo dai parametri (nessun numero casuale), così
+due esecuzioni su commit diversi misurano esattamente gli stessi file.
+
+    python benchmarks/corpus.py DEST [--size medium]
+"""
+import argparse
+import os
+
+# Dimensioni predefinite: file, righe per file, profondità delle cartelle, cartelle per livello
+SIZES = {
+    "small": {"files": 50, "lines": 100, "depth": 2, "fanout": 3},
+    "medium": {"files": 1000, "lines": 200, "depth": 4, "fanout": 4},
+    "large": {"files": 5000, "lines": 300, "depth": 6, "fanout": 4},
+}
+
+
+INCLUDE_EVERY = 7  # primo con la profondità: gli include capitano a tutti i livelli
+STYLE = "skinparam shadowing false\nskinparam defaultFontName Monospaced\n"
+
+
+def sequence_diagram(lines: int, seed: int = 0) -> str:
+    """Diagramma di sequenza sintetico con commenti, note e stringhe"""
+    body = ["@startuml", "skinparam monochrome true"]
+    i = seed
+    while len(body) < lines - 1:
+        a, b = f"Service{i % 37}", f"Client{i % 23}"
+        body.append(f'{a} -> {b} : request{i}(id: int, "payload {i}")')
+        body.append(f"{b} --> {a} : response{i}")
+        if i % 10 == 0:
+            body += [f"note left of {a}", f"  passo {i}", "end note"]
+        if i % 15 == 0:
+            body += ["/' commento", "   su più righe '/"]
+        body.append(f"' commento {i}")
+        i += 1
+    body = body[:lines - 1] + ["@enduml"]
+    return "\n".join(body)
+
+
+def class_diagram(lines: int, seed: int = 0) -> str:
+    """Diagramma delle classi sintetico con package, attributi, metodi e relazioni"""
+    body = ["@startuml"]
+    i = seed
+    while len(body) < lines - 1:
+        if i % 20 == 0:
+            body.append(f"package pkg{i} {{")
+        body += [f"class Model{i} {{", f"  - id{i} : int", f"  + load{i}(path : String)", "}"]
+        if i % 3 == 0:
+            body.append(f"interface Port{i}")
+            body.append(f"Model{i} ..|> Port{i}")
+        if i:
+            body.append(f"Model{i - 1} --> Model{i} : uses")
+        if i % 20 == 19:
+            body.append("}")
+        i += 1
+    body = body[:lines - 1] + ["@enduml"]
+    return "\n".join(body)
+
+
+def directory_for(index: int, depth: int, fanout: int) -> str:
+    """Cartella (relativa) del file `index`: i file si distribuiscono su tutti i livelli"""
+    level = index % (depth + 1)
+    parts = []
+    number = index
+    for _ in range(level):
+        parts.append(f"dir{number % fanout}")
+        number //= fanout
+    return os.path.join(*parts) if parts else ""
+
+
+def generate_project(dest: str, files: int, lines: int, depth: int = 3, fanout: int = 4) -> list:
+    """Scrive il corpus in `dest` e restituisce i percorsi dei file creati.
+
+    Metà dei file sono diagrammi di sequenza e metà diagrammi delle classi;
+    uno ogni INCLUDE_EVERY, nelle sottocartelle, include con percorso
+    relativo lo stile della propria cartella (che non esiste nella radice:
+    un include risolto rispetto al progetto fallisce). I file già presenti
+    con lo stesso contenuto non vengono riscritti.
+    """
+    paths = []
+    for index in range(files):
+        relative = directory_for(index, depth, fanout)
+        folder = os.path.join(dest, relative)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"diagram{index:05d}.puml")
+        generator = sequence_diagram if index % 2 == 0 else class_diagram
+        text = generator(lines, seed=index) + "\n"
+        if index % INCLUDE_EVERY == 0 and relative:
+            write_if_changed(os.path.join(folder, "style.iuml"), STYLE)
+            text = text.replace("@startuml\n", "@startuml\n!include style.iuml\n", 1)
+        write_if_changed(path, text)
+        paths.append(path)
+    return paths
+
+
+def write_if_changed(path: str, text: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return
+    except OSError:
+        pass
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def generate(dest: str, size: str) -> list:
+    return generate_project(dest, **SIZES[size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dest")
+    parser.add_argument("--size", choices=SIZES, default="medium")
+    args = parser.parse_args()
+    paths = generate(args.dest, args.size)
+    print(f"{len(paths)} file generati in {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Apertura di un file in EditorWidget e disegno dei numeri di riga.
+
+Misura load_file() (lettura, setPlainText ed evidenziazione; sopra la
+soglia dei documenti grandi il caricamento a blocchi fino a load_finished)
+e il tempo di un paintEvent della colonna dei numeri di riga in diversi
+punti del documento.
+
+    python benchmarks/editor_load.py [--lines 20000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QEventLoop, QTimer
+
+from app.render_metrics import RenderMetrics
+from app.widgets.editor import EditorWidget
+from benchmarks.corpus import sequence_diagram
+
+SIZES = {"small": 2000, "medium": 20000, "large": 150000}  # righe; "large" supera la soglia dei documenti grandi
+
+
+def wait_for(signal, timeout_ms: int = 120000, trigger=None):
+    """Chiama `trigger` ed esegue l'event loop finché `signal` non viene emesso.
+
+    Restituisce gli argomenti del segnale, anche se è stato emesso
+    direttamente dentro `trigger`.
+    """
+    loop = QEventLoop()
+    received = []
+
+    def on_signal(*args):
+        received.append(args)
+        loop.quit()
+
+    signal.connect(on_signal)
+    if trigger is not None:
+        trigger()
+    if not received:
+        QTimer.singleShot(timeout_ms, loop.quit)
+        loop.exec()
+    signal.disconnect(on_signal)
+    if not received:
+        raise TimeoutError("segnale non ricevuto entro il timeout")
+    return received[0]
+
+
+def load_once(path: str) -> tuple:
+    """(millisecondi, statistiche di load_finished) di un caricamento in un editor nuovo"""
+    editor = EditorWidget()
+    editor.resize(900, 1000)
+    start = time.perf_counter()
+    stats, = wait_for(editor.load_finished, trigger=lambda: editor.load_file(path))
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, stats, editor
+
+
+def paint_times(editor: EditorWidget, positions: int = 20) -> list:
+    """Millisecondi di un paintEvent dei numeri di riga a `positions` altezze del documento"""
+    editor.show()
+    QApplication.processEvents()
+    scrollbar = editor.verticalScrollBar()
+    times = []
+    for step in range(positions):
+        scrollbar.setValue(scrollbar.maximum() * step // max(1, positions - 1))
+        QApplication.processEvents()
+        start = time.perf_counter()
+        editor.line_number_area.grab()  # chiama paintEvent su un pixmap
+        times.append((time.perf_counter() - start) * 1000)
+    editor.hide()
+    return times
+
+
+def run(lines: int = 20000, repeat: int = 3) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "document.puml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(sequence_diagram(lines) + "\n")
+        size = os.path.getsize(path)
+
+        loads, paints, stats = [], [], None
+        for _ in range(repeat):
+            elapsed, stats, editor = load_once(path)
+            loads.append(elapsed)
+            paints += paint_times(editor)
+            editor.deleteLater()
+            QApplication.processEvents()
+
+    return {
+        "lines": lines,
+        "bytes": size,
+        "large_mode": stats["large"],
+        "load_ms": round(min(loads), 2),
+        "load_lines_per_s": round(lines / (min(loads) / 1000)),
+        "line_numbers_paint_p50_ms": round(RenderMetrics.percentile(paints, 50), 3),
+        "line_numbers_paint_p95_ms": round(RenderMetrics.percentile(paints, 95), 3),
+        "memory_delta_bytes": stats["memory_delta"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=SIZES["medium"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    result = run(args.lines, args.repeat)
+    for name, value in result.items():
+        print(f"{name:>28}: {value}")
+
+
+if __name__ == "__main__":
+    main()
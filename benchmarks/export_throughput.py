@@ -0,0 +1,99 @@
+"""Export di un progetto come dalla finestra di export: throughput e reattività della GUI.
+
+Esporta i diagrammi del corpus con BatchExporter in background
+(ExportWorker, lo stesso della finestra di export), prima con un solo job
+e poi con `--jobs` JVM in parallelo, infine ripete l'export senza modifiche
+(tutti i file saltati grazie al manifest). Mentre l'export gira, un timer
+ogni 5 ms sul thread della GUI misura il blocco più lungo dell'event loop.
+
+    python benchmarks/export_throughput.py [--size medium] [--files 500] [--jobs 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QThreadPool, QTimer
+
+from app.batch_export import BatchExporter
+from app.dialogs.export_dialog import ExportWorker
+from app.project_manager import find_puml_files
+from benchmarks import corpus, fake_plantuml
+from benchmarks.editor_load import wait_for
+
+
+def export(jar_path: str, project: str, files: list, jobs: int, output: str) -> dict:
+    exporter = BatchExporter(project, jar_path, "png", jobs, output, os.path.join(output, "manifest.json"))
+    worker = ExportWorker(exporter, files, {})
+    pool = QThreadPool()
+    gaps = [0.0]
+    last = [time.perf_counter()]
+
+    def tick():
+        now = time.perf_counter()
+        gaps.append(now - last[0])
+        last[0] = now
+
+    timer = QTimer()
+    timer.setInterval(5)
+    timer.timeout.connect(tick)
+    timer.start()
+    results, seconds, error = wait_for(worker.signals.finished, 600000, lambda: pool.start(worker))
+    timer.stop()
+    if error:
+        raise RuntimeError(error)
+    failed = [r for r in results if r.error]
+    if failed:
+        raise RuntimeError(f"{len(failed)} export non riusciti, es. {failed[0].rel_path}: {failed[0].error}")
+    return {
+        "seconds": round(seconds, 3),
+        "files_per_s": round(len(files) / seconds, 1),
+        "rendered": sum(1 for r in results if not r.skipped),
+        "gui_max_stall_ms": round(max(gaps) * 1000, 1),
+    }
+
+
+def run(jar_path: str, project: str, files: int = 500, jobs: int = None) -> dict:
+    """`jar_path` viene da fake_plantuml.activate(); `project` è una cartella di corpus"""
+    jobs = jobs or os.cpu_count() or 1
+    paths = sorted(find_puml_files(project))[:files]
+    with tempfile.TemporaryDirectory() as folder:
+        serial = export(jar_path, project, paths, 1, os.path.join(folder, "serial"))
+        parallel = export(jar_path, project, paths, jobs, os.path.join(folder, "parallel"))
+        unchanged = export(jar_path, project, paths, jobs, os.path.join(folder, "parallel"))
+    return {
+        "files": len(paths),
+        "jobs": jobs,
+        "serial": serial,
+        "parallel": parallel,
+        "unchanged_ms": round(unchanged["seconds"] * 1000, 1),
+        "speedup": round(serial["seconds"] / parallel["seconds"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=corpus.SIZES, default="medium")
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--delay", type=float, default=0.05, help="secondi per diagramma del finto PlantUML")
+    parser.add_argument("--startup", type=float, default=0.5, help="secondi di avvio del finto PlantUML")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as folder:
+        jar_path = fake_plantuml.activate(os.path.join(folder, "plantuml"), args.startup, args.delay)
+        project = os.path.join(folder, "corpus")
+        corpus.generate(project, args.size)
+        result = run(jar_path, project, args.files, args.jobs)
+    for name, value in result.items():
+        print(f"{name:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
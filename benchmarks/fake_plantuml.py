@@ -0,0 +1,132 @@
+"""Sostituto di `java -jar plantuml.jar -pipe` per i benchmark.
+
+Parla lo stesso protocollo di PlantUMLProcess (blocchi @start/@end su
+stdin, immagine + delimitatore su stdout, errori "ERROR\\n<linea>\\n<msg>")
+e restituisce PNG, SVG, PDF o EPS sintetici, così il percorso di render
+si può misurare senza Java né il jar reale. I tempi si regolano con
+variabili d'ambiente (secondi):
+
+    FAKE_PLANTUML_STARTUP    avvio del processo (la JVM "fredda")
+    FAKE_PLANTUML_DELAY      attesa fissa per ogni diagramma
+    FAKE_PLANTUML_LINE_DELAY attesa aggiuntiva per ogni riga del diagramma
+
+Una riga che contiene "BAD" produce un errore di sintassi su quella riga.
+Come PlantUML -pipe, un !include relativo si cerca nella cartella di
+lavoro del processo: un file che non esiste produce un errore su quella
+riga (così un percorso risolto male si vede nei benchmark).
+Con -syntax risponde subito (nessun layout) con il tipo del diagramma
+oppure con lo stesso errore.
+install() crea un comando `java` che avvia questo script e un jar fittizio.
+"""
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+
+def png(width: int, height: int) -> bytes:
+    """PNG RGB a tinta unita di `width` x `height` pixel"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    raw = b"".join(b"\0" + b"\xff\xf2\xcc" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+
+def svg(lines: int) -> bytes:
+    height = 20 + 16 * lines
+    texts = "".join(f'<text x="10" y="{20 + 16 * i}">line {i}</text>' for i in range(lines))
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="400" height="{height}">'
+            f"{texts}</svg>").encode("utf-8")
+
+
+def missing_include(line: str) -> bool:
+    if not line.startswith("!include") and not line.startswith("!import"):
+        return False
+    target = line.split(None, 1)[1].strip().strip('"').split("!", 1)[0] if " " in line else ""
+    if not target or target.startswith("<") or "://" in target:
+        return False
+    return not os.path.exists(target)  # relativo: rispetto alla cartella di lavoro
+
+
+def render(block: list, fmt: str) -> bytes:
+    errors = [i for i, line in enumerate(block) if "BAD" in line or missing_include(line)]
+    if errors:
+        return b"ERROR\n%d\nSyntax Error?\n" % errors[0]
+    if fmt == "syntax":
+        return b"SEQUENCE\n(%d participants)\n" % sum(line.startswith("participant") for line in block)
+    if fmt == "svg":
+        return svg(min(len(block), 200))
+    if fmt in ("pdf", "eps"):
+        header = b"%PDF-1.4\n" if fmt == "pdf" else b"%!PS-Adobe-3.0 EPSF-3.0\n"
+        return header + b"%% %d lines\n" % len(block)
+    return png(200, min(4000, 12 * len(block)))
+
+
+def serve(args: list):
+    delimiter = args[args.index("-pipedelimitor") + 1].encode("ascii") if "-pipedelimitor" in args else None
+    formats = [arg[2:] for arg in args if arg.startswith("-t")]
+    fmt = "syntax" if "-syntax" in args else formats[-1] if formats else "png"
+    delay = float(os.environ.get("FAKE_PLANTUML_DELAY", "0"))
+    line_delay = float(os.environ.get("FAKE_PLANTUML_LINE_DELAY", "0"))
+    time.sleep(float(os.environ.get("FAKE_PLANTUML_STARTUP", "0")))
+
+    out = sys.stdout.buffer
+    block = []
+    for raw in sys.stdin.buffer:
+        line = raw.decode("utf-8", errors="replace").strip()
+        if line.startswith("@start"):
+            block = []
+        block.append(line)
+        if not line.startswith("@end"):
+            continue
+        if fmt != "syntax":
+            time.sleep(delay + line_delay * len(block))
+        out.write(render(block, fmt))
+        if delimiter:
+            out.write(delimiter + b"\n")
+        out.flush()
+
+
+def install(dest: str = None) -> tuple:
+    """Crea in `dest` un comando `java` fittizio e un plantuml.jar vuoto.
+
+    Restituisce (cartella da anteporre al PATH, percorso del jar).
+    """
+    dest = dest or tempfile.mkdtemp(prefix="fake-plantuml-")
+    bin_dir = os.path.join(dest, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    script = os.path.abspath(__file__)
+    if os.name == "nt":
+        launcher = os.path.join(bin_dir, "java.bat")
+        content = f'@"{sys.executable}" "{script}" %*\r\n'
+    else:
+        launcher = os.path.join(bin_dir, "java")
+        content = f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n'
+    with open(launcher, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.chmod(launcher, 0o755)
+
+    jar_path = os.path.join(dest, "plantuml.jar")
+    with open(jar_path, "wb") as f:
+        f.write(b"fake")
+    return bin_dir, jar_path
+
+
+def activate(dest: str = None, startup: float = 0.0, delay: float = 0.0, line_delay: float = 0.0) -> str:
+    """install() + PATH e tempi nell'ambiente di questo processo; restituisce il jar"""
+    bin_dir, jar_path = install(dest)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_PLANTUML_STARTUP"] = str(startup)
+    os.environ["FAKE_PLANTUML_DELAY"] = str(delay)
+    os.environ["FAKE_PLANTUML_LINE_DELAY"] = str(line_delay)
+    return jar_path
+
+
+if __name__ == "__main__":
+    # Invocato come `java -Djava.awt.headless=true -jar plantuml.jar -pipe ...`
+    serve(sys.argv[1:])
@@ -0,0 +1,116 @@
+"""Caricamento dell'albero del progetto (FileTreeWidget) su cartelle profonde.
+
+Misura il tempo per mostrare il primo livello, per espandere l'intero
+albero (una scansione in background per cartella) e per vedere un file
+creato su disco tramite il QFileSystemWatcher.
+
+    python benchmarks/file_tree_scan.py [--size medium] [--corpus DIR]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+
+from app.widgets.file_tree import FileTreeWidget
+from benchmarks.corpus import SIZES, generate
+from benchmarks.editor_load import wait_for
+
+
+def wait_idle(tree: FileTreeWidget, timeout: float = 120.0):
+    """Esegue l'event loop finché non ci sono più scansioni in corso"""
+    deadline = time.perf_counter() + timeout
+    while tree._pending:
+        if time.perf_counter() > deadline:
+            raise TimeoutError("scansione non terminata entro il timeout")
+        QApplication.processEvents()
+        time.sleep(0.0005)
+
+
+def expand_all(tree: FileTreeWidget) -> int:
+    """Espande le cartelle livello per livello finché tutte sono state lette; restituisce i file"""
+    while True:
+        closed = [item for path, item in tree._dir_items.items()
+                  if path not in tree._loaded and item is not tree.invisibleRootItem()]
+        if not closed:
+            break
+        for item in closed:
+            item.setExpanded(True)
+        wait_idle(tree)
+    files = 0
+    stack = [tree.invisibleRootItem()]
+    while stack:
+        item = stack.pop()
+        for i in range(item.childCount()):
+            child = item.child(i)
+            if child.data(0, FileTreeWidget.DIR_ROLE) is None:
+                files += 1
+            else:
+                stack.append(child)
+    return files
+
+
+def run(corpus: str, repeat: int = 3) -> dict:
+    first_level, full, watch = [], [], []
+    files = 0
+    for attempt in range(repeat):
+        tree = FileTreeWidget()
+        start = time.perf_counter()
+        tree.load_puml_files(corpus)
+        wait_idle(tree)
+        first_level.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        files = expand_all(tree)
+        full.append((time.perf_counter() - start) * 1000)
+
+        # Un file nuovo nella cartella più profonda
+        deepest = max(tree._dir_items, key=lambda path: path.count(os.sep))
+        new_file = os.path.join(deepest, f"bench_new_{attempt}.puml")
+        start = time.perf_counter()
+        with open(new_file, "w", encoding="utf-8") as f:
+            f.write("@startuml\nA -> B\n@enduml\n")
+        try:
+            wait_for(tree.files_changed, 10000)
+            watch.append((time.perf_counter() - start) * 1000)
+        except TimeoutError:
+            pass
+        finally:
+            os.remove(new_file)
+        wait_idle(tree)
+        tree.deleteLater()
+        QApplication.processEvents()
+
+    return {
+        "files": files,
+        "directories": len(tree._dir_items),
+        "first_level_ms": round(min(first_level), 2),
+        "expand_all_ms": round(min(full), 2),
+        "files_per_s": round(files / (min(full) / 1000)) if files else 0,
+        "watch_latency_ms": round(min(watch), 2) if watch else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=SIZES, default="medium")
+    parser.add_argument("--corpus", help="cartella del corpus (generata se vuota)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as folder:
+        corpus = args.corpus or folder
+        generate(corpus, args.size)
+        result = run(corpus, args.repeat)
+    for name, value in result.items():
+        print(f"{name:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
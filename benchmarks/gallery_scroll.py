@@ -0,0 +1,117 @@
+"""Galleria delle miniature (GalleryPanel) su un progetto con migliaia di diagrammi.
+
+Misura la scansione del progetto, il tempo per riempire la prima pagina
+con cache vuota (render) e con cache delle miniature già popolata
+(riapertura), e il costo per fotogramma scorrendo l'intera galleria:
+durante lo scorrimento non devono partire render, solo a vista ferma.
+
+    python benchmarks/gallery_scroll.py [--size medium] [--corpus DIR]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+
+from app.render_cache import RenderCache
+from app.render_metrics import RenderMetrics
+from app.widgets.gallery import GalleryPanel
+from benchmarks import corpus, fake_plantuml
+
+
+def wait_idle(panel: GalleryPanel, timeout: float = 300.0):
+    """Esegue l'event loop finché non ci sono più miniature richieste o in corso"""
+    deadline = time.perf_counter() + timeout
+    while panel.refresh_timer.isActive() or panel.loader.busy():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("miniature non completate entro il timeout")
+        QApplication.processEvents()
+        time.sleep(0.0005)
+
+
+def open_gallery(jar_path: str, project: str, caches: tuple) -> tuple:
+    """Galleria sul progetto: (pannello, ms di scansione, ms per la prima pagina di miniature)"""
+    panel = GalleryPanel(jar_path, caches[0], caches[1])
+    panel.resize(1000, 700)
+    panel.show()
+    start = time.perf_counter()
+    panel.set_project(project)
+    while not panel.model.paths:
+        QApplication.processEvents()
+        time.sleep(0.0005)
+    scanned = time.perf_counter()
+    wait_idle(panel)
+    return panel, (scanned - start) * 1000, (time.perf_counter() - scanned) * 1000
+
+
+def run(jar_path: str, project: str, step: int = 120) -> dict:
+    """`jar_path` viene da fake_plantuml.activate(); `project` è una cartella di corpus"""
+    with tempfile.TemporaryDirectory() as folder:
+        caches = (RenderCache(os.path.join(folder, "renders")), RenderCache(os.path.join(folder, "thumbnails")))
+        panel, scan_ms, cold_ms = open_gallery(jar_path, project, caches)
+        cold = panel.loader.stats()
+        panel.shutdown()
+        panel.deleteLater()
+
+        # Riapertura: stesse cache su disco, nessuna miniatura in memoria
+        caches[1].clear_memory()
+        panel, _, warm_ms = open_gallery(jar_path, project, caches)
+        try:
+            bar = panel.view.verticalScrollBar()
+            before = panel.loader.stats()
+            frames = []
+            for value in range(0, bar.maximum() + step, step):
+                start = time.perf_counter()
+                bar.setValue(value)
+                panel.view.viewport().repaint()
+                QApplication.processEvents()
+                frames.append((time.perf_counter() - start) * 1000)
+            during = panel.loader.stats()
+            wait_idle(panel)
+            last_page = panel.loader.stats()
+        finally:
+            panel.shutdown()
+    generated = sum(during[name] - before[name] for name in ("cache", "preview", "render"))
+    return {
+        "diagrams": len(panel.model.paths),
+        "scan_ms": round(scan_ms, 2),
+        "first_page_cold_ms": round(cold_ms, 2),
+        "first_page_warm_ms": round(warm_ms, 2),
+        "first_page_thumbnails": cold["render"] + cold["error"],
+        "scroll_frames": len(frames),
+        "frame_p50_ms": round(RenderMetrics.percentile(frames, 50), 3),
+        "frame_p95_ms": round(RenderMetrics.percentile(frames, 95), 3),
+        "frame_max_ms": round(max(frames), 3),
+        "thumbnails_while_scrolling": generated,
+        "last_page_thumbnails": last_page["render"] - during["render"],
+        "icons_bytes": panel.model.memory_usage(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=corpus.SIZES, default="medium")
+    parser.add_argument("--corpus", help="cartella con file .puml (default: corpus sintetico)")
+    parser.add_argument("--delay", type=float, default=0.05, help="secondi per diagramma del finto PlantUML")
+    parser.add_argument("--startup", type=float, default=0.5, help="secondi di avvio del finto PlantUML")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as folder:
+        jar_path = fake_plantuml.activate(os.path.join(folder, "plantuml"), args.startup, args.delay)
+        project = args.corpus
+        if project is None:
+            project = os.path.join(folder, "corpus")
+            corpus.generate(project, args.size)
+        result = run(jar_path, project)
+    for name, value in result.items():
+        print(f"{name:>26}: {value}")
+
+
+if __name__ == "__main__":
+    main()
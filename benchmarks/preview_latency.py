@@ -0,0 +1,113 @@
+"""Latenza end-to-end della preview: dal render() al risultato mostrato.
+
+Usa AsyncPlantUMLPreview con un PreviewWidget e un EditorWidget veri e
+il sostituto di PlantUML di fake_plantuml.py (nessun bisogno di Java).
+Scenari misurati:
+
+    cold        primo render, con avvio delle JVM
+    miss        testo modificato, JVM già calde
+    hit         testo già renderizzato (solo cache e disegno)
+    incremental file con più diagrammi, modificato in uno solo
+
+Per ogni scenario p50/p95 in millisecondi; il riepilogo per fase viene
+da RenderMetrics (le stesse tracce mostrate nella barra di stato).
+
+    python benchmarks/preview_latency.py [--delay 0.05] [--startup 0.5] [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+
+from app.plantuml_renderer import AsyncPlantUMLPreview
+from app.render_cache import RenderCache
+from app.render_metrics import RenderMetrics
+from app.widgets.editor import EditorWidget
+from app.widgets.preview import PreviewWidget
+from benchmarks import fake_plantuml
+from benchmarks.corpus import class_diagram, sequence_diagram
+from benchmarks.editor_load import wait_for
+
+
+def render_ms(renderer: AsyncPlantUMLPreview, editor: EditorWidget, text: str) -> float:
+    """Imposta `text` nell'editor e misura il render fino a result_ready"""
+    editor.setPlainText(text)
+    start = time.perf_counter()
+    wait_for(renderer.result_ready, 60000,
+             lambda: renderer.render(text, editor, editor.document().revision(), 0, start))
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(values: list) -> dict:
+    return {
+        "p50_ms": round(RenderMetrics.percentile(values, 50), 2),
+        "p95_ms": round(RenderMetrics.percentile(values, 95), 2),
+    }
+
+
+def run(jar_path: str, lines: int = 200, blocks: int = 5, repeat: int = 10, fmt: str = "png",
+        processes: int = 2) -> dict:
+    """`jar_path` viene da fake_plantuml.activate() (o è un jar reale con `java` nel PATH)"""
+    with tempfile.TemporaryDirectory() as folder:
+        preview, editor = PreviewWidget(), EditorWidget()
+        renderer = AsyncPlantUMLPreview(jar_path, preview, cache=RenderCache(folder),
+                                        fmt=fmt, processes=processes)
+        renderer.set_metrics_enabled(True)
+        renderer.render_failed.connect(lambda doc, message, line: print("Errore di render:", message))
+
+        results = {}
+        try:
+            base = sequence_diagram(lines)
+            results["cold"] = summarize([render_ms(renderer, editor, base)])
+
+            texts = [f"{base[:-len('@enduml')]}' modifica {i}\n@enduml" for i in range(repeat)]
+            results["miss"] = summarize([render_ms(renderer, editor, text) for text in texts])
+            results["hit"] = summarize([render_ms(renderer, editor, text) for text in texts])
+
+            # Un file con `blocks` diagrammi: dopo il primo render ne cambia uno solo
+            diagrams = [class_diagram(lines, seed=i * 1000) for i in range(blocks)]
+            render_ms(renderer, editor, "\n".join(diagrams))
+            timings = []
+            for i in range(repeat):
+                changed = list(diagrams)
+                changed[i % blocks] = changed[i % blocks].replace("@enduml", f"' modifica {i}\n@enduml")
+                timings.append(render_ms(renderer, editor, "\n".join(changed)))
+            results["incremental"] = summarize(timings)
+
+            summary = renderer.metrics.summary()
+            results["stages"] = {stage: round(values["p50_ms"], 3) for stage, values in summary["stages"].items()}
+            results["cache_hit_rate"] = round(summary["cache_hit_rate"] or 0, 3)
+        finally:
+            renderer.scheduler.supersede_all()
+            if renderer.process is not None:
+                renderer.process.close()
+    return {"lines": lines, "blocks": blocks, "format": fmt, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200, help="righe per diagramma")
+    parser.add_argument("--blocks", type=int, default=5, help="diagrammi nel file dello scenario incrementale")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--format", choices=AsyncPlantUMLPreview.FORMATS, default="png")
+    parser.add_argument("--delay", type=float, default=0.05, help="secondi per diagramma del finto PlantUML")
+    parser.add_argument("--startup", type=float, default=0.5, help="secondi di avvio del finto PlantUML")
+    parser.add_argument("--jar", help="plantuml.jar reale (con java nel PATH) invece del sostituto")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as folder:
+        jar_path = args.jar or fake_plantuml.activate(folder, args.startup, args.delay)
+        result = run(jar_path, args.lines, args.blocks, args.repeat, args.format)
+    for name, value in result.items():
+        print(f"{name:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
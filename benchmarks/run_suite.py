@@ -0,0 +1,187 @@
+"""Esegue tutti i benchmark e salva i risultati in JSON, confrontabili tra commit.
+
+Ogni benchmark gira su più dimensioni di corpus sintetico, senza display
+(piattaforma Qt "offscreen") e con il finto PlantUML di fake_plantuml.py.
+Il file prodotto contiene commit, ambiente e una voce per benchmark e
+dimensione ("editor/medium", ...); --compare lo confronta con un
+risultato precedente segnalando i peggioramenti oltre --threshold.
+
+    python benchmarks/run_suite.py [--sizes small,medium] [--output risultati.json]
+    python benchmarks/run_suite.py --compare base.json [--fail-on-regression]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+
+from benchmarks import (
+    corpus, editor_load, export_throughput, fake_plantuml, file_tree_scan, gallery_scroll, highlighter_throughput,
+    preview_latency, server_throughput, startup_time
+)
+
+VERSION = 1
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = ("highlighter", "editor", "file_tree", "preview", "startup", "export", "server", "gallery")
+PREVIEW_LINES = {"small": 50, "medium": 200, "large": 800}  # righe per diagramma
+EXPORT_FILES = {"small": 50, "medium": 200, "large": 500}   # file esportati
+SERVER_FILES = {"small": 50, "medium": 100, "large": 200}   # file renderizzati da ogni editor
+
+
+def git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pyqt": PYQT_VERSION_STR,
+        "qt": QT_VERSION_STR,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(sizes: list, benchmarks: list, repeat: int, delay: float, startup: float) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        jar_path = fake_plantuml.activate(os.path.join(folder, "plantuml"), startup, delay)
+        for size in sizes:
+            lines = editor_load.SIZES[size]
+            if "highlighter" in benchmarks:
+                results[f"highlighter/{size}"] = highlighter_throughput.run(lines, repeat)
+            if "editor" in benchmarks:
+                results[f"editor/{size}"] = editor_load.run(lines, repeat)
+            project = os.path.join(folder, f"corpus-{size}")
+            if {"file_tree", "startup", "export", "server", "gallery"} & set(benchmarks):
+                corpus.generate(project, size)
+            if "file_tree" in benchmarks:
+                results[f"file_tree/{size}"] = file_tree_scan.run(project, repeat)
+            if "preview" in benchmarks:
+                results[f"preview/{size}"] = preview_latency.run(jar_path, PREVIEW_LINES[size],
+                                                                 repeat=max(5, repeat))
+            if "startup" in benchmarks:
+                results[f"startup/{size}"] = startup_time.run(project, repeat=repeat, delay=delay, startup=startup)
+            if "export" in benchmarks:
+                results[f"export/{size}"] = export_throughput.run(jar_path, project, EXPORT_FILES[size])
+            if "server" in benchmarks:
+                results[f"server/{size}"] = server_throughput.run(jar_path, project, SERVER_FILES[size])
+            if "gallery" in benchmarks:
+                results[f"gallery/{size}"] = gallery_scroll.run(jar_path, project)
+            for name in results:
+                if name.endswith(f"/{size}"):
+                    print(f"{name}: {json.dumps(results[name])}", flush=True)
+    return results
+
+
+# =========================
+# CONFRONTO
+# =========================
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{"editor/small": {"load_ms": 3}} -> {"editor/small.load_ms": 3} (solo valori numerici)"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def direction(metric: str) -> int:
+    """+1 se un valore più alto è meglio, -1 se è meglio più basso, 0 se non è una misura di tempo"""
+    if metric.endswith("_per_s") or metric.endswith("speedup"):
+        return 1
+    if metric.endswith("_ms") or ".stages." in metric:
+        return -1
+    return 0
+
+
+def compare(base: dict, current: dict, threshold: float, min_delta_ms: float = 1.0) -> tuple:
+    """Righe del confronto e peggioramenti oltre `threshold` (frazione, es. 0.1).
+
+    Per i tempi una differenza sotto `min_delta_ms` è considerata rumore.
+    """
+    old, new = flatten(base["results"]), flatten(current["results"])
+    rows, regressions = [], []
+    for metric in sorted(set(old) & set(new)):
+        sign = direction(metric)
+        if not sign or not old[metric]:
+            continue
+        change = (new[metric] - old[metric]) / old[metric]
+        worse = -change * sign > threshold
+        if sign < 0 and abs(new[metric] - old[metric]) < min_delta_ms:
+            worse = False
+        rows.append(f"{'!!' if worse else '  '} {metric:<52} {old[metric]:>12} -> {new[metric]:>12}  {change:+.1%}")
+        if worse:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="small,medium", help="dimensioni separate da virgole: "
+                        + ",".join(corpus.SIZES))
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="benchmark da eseguire")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.05, help="secondi per diagramma del finto PlantUML")
+    parser.add_argument("--startup", type=float, default=0.5, help="secondi di avvio del finto PlantUML")
+    parser.add_argument("--output", help="file JSON dei risultati (default: bench-<commit>.json)")
+    parser.add_argument("--compare", help="risultati precedenti con cui confrontare")
+    parser.add_argument("--threshold", type=float, default=0.10, help="peggioramento tollerato (0.10 = 10%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="differenza di tempo considerata rumore")
+    parser.add_argument("--fail-on-regression", action="store_true", help="esce con codice 1 se c'è un peggioramento")
+    args = parser.parse_args()
+
+    sizes = [size for size in args.sizes.split(",") if size]
+    benchmarks = [name for name in args.only.split(",") if name]
+    unknown = [name for name in sizes if name not in corpus.SIZES] + [name for name in benchmarks
+                                                                      if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"valori sconosciuti: {', '.join(unknown)}")
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    env = environment()
+    report = {
+        "version": VERSION,
+        **env,
+        "settings": {"sizes": sizes, "repeat": args.repeat, "delay": args.delay, "startup": args.startup},
+        "results": run_suite(sizes, benchmarks, args.repeat, args.delay, args.startup),
+    }
+    output = args.output or f"bench-{(env['commit'] or 'nogit')[:10]}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Risultati salvati in", output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        rows, regressions = compare(base, report, args.threshold, args.min_delta_ms)
+        print(f"\nConfronto con {(base.get('commit') or '?')[:10]} ({args.compare}):")
+        print("\n".join(rows))
+        if regressions:
+            print(f"\n{len(regressions)} peggioramenti oltre il {args.threshold:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Più editor sullo stesso progetto: JVM proprie contro un server di render condiviso.
+
+Ogni "editor" renderizza gli stessi file del corpus, tutti insieme: prima
+ciascuno con il suo pool di JVM (come senza server), poi tutti tramite un
+RenderServer locale con connessioni keep-alive. Misura anche il costo
+per richiesta con connessione riusata o nuova, e le richieste in
+pipeline contro quelle una alla volta (risposte già in cache nel server).
+
+    python benchmarks/server_throughput.py [--size medium] [--files 100] [--editors 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.dependency_index import absolute_includes
+from app.plantuml_http import PlantUMLServerClient, PlantUMLServerConnection
+from app.plantuml_process import PlantUMLProcessPool, extract_blocks
+from app.project_manager import find_puml_files
+from app.render_server import RenderServer, RenderService
+from benchmarks import corpus, fake_plantuml
+
+
+def render_editors(pools: list, blocks: list) -> float:
+    """Ogni pool renderizza tutti i blocchi (un thread per JVM o connessione), tutti i pool insieme"""
+    def editor(pool):
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            list(executor.map(lambda block: pool.render_block(block), blocks))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=editor, args=(pool,)) for pool in pools]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def request_costs(url: str, blocks: list) -> dict:
+    """ms per richiesta (già in cache nel server) con connessione riusata, nuova o in pipeline"""
+    connection = PlantUMLServerConnection(url)
+    start = time.perf_counter()
+    for block in blocks:
+        connection.render_block(block)
+    keep_alive = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for block in blocks:
+        fresh = PlantUMLServerConnection(url)
+        fresh.render_block(block)
+        fresh.close()
+    reconnect = time.perf_counter() - start
+
+    text = "".join(blocks)
+    start = time.perf_counter()
+    connection.render_all(text)
+    pipelined = time.perf_counter() - start
+    connection.close()
+    return {
+        "keep_alive_ms": round(keep_alive * 1000 / len(blocks), 3),
+        "new_connection_ms": round(reconnect * 1000 / len(blocks), 3),
+        "pipelined_ms": round(pipelined * 1000 / len(blocks), 3),
+    }
+
+
+def run(jar_path: str, project: str, files: int = 100, editors: int = 4, processes: int = 2) -> dict:
+    """`jar_path` viene da fake_plantuml.activate(); `project` è una cartella di corpus"""
+    blocks = []
+    for path in sorted(find_puml_files(project))[:files]:
+        with open(path, "r", encoding="utf-8") as f:
+            # Come editor ed export: gli !include relativi arrivano già assoluti
+            blocks += [absolute_includes(block, path, project) for _, block in extract_blocks(f.read())]
+
+    pools = [PlantUMLProcessPool(jar_path, size=processes) for _ in range(editors)]
+    try:
+        local = render_editors(pools, blocks)
+    finally:
+        for pool in pools:
+            pool.close()
+
+    service = RenderService(jar_path, processes)
+    server = RenderServer(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    clients = [PlantUMLServerClient(server.url, size=processes) for _ in range(editors)]
+    try:
+        shared = render_editors(clients, blocks)
+        stats = service.stats()
+        costs = request_costs(server.url, blocks)
+    finally:
+        for client in clients:
+            client.close()
+        server.shutdown()
+        server.server_close()
+        service.close()
+    return {
+        "editors": editors,
+        "diagrams": len(blocks),
+        "local": {"seconds": round(local, 3), "jvms": editors * processes},
+        "server": {"seconds": round(shared, 3), "jvms": stats["jvms"], "renders": stats["renders"],
+                   "hits": stats["hits"], "connections": stats["connections"]},
+        "speedup": round(local / shared, 2),
+        **costs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=corpus.SIZES, default="medium")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--editors", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=2, help="JVM (o connessioni) per editor")
+    parser.add_argument("--delay", type=float, default=0.05, help="secondi per diagramma del finto PlantUML")
+    parser.add_argument("--startup", type=float, default=0.5, help="secondi di avvio del finto PlantUML")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        jar_path = fake_plantuml.activate(os.path.join(folder, "plantuml"), args.startup, args.delay)
+        project = os.path.join(folder, "corpus")
+        corpus.generate(project, args.size)
+        result = run(jar_path, project, args.files, args.editors, args.processes)
+    for name, value in result.items():
+        print(f"{name:>17}: {value}")
+
+
+if __name__ == "__main__":
+    main()
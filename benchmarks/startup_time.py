@@ -0,0 +1,169 @@
+"""Tempo di avvio dell'editor, dal lancio del processo al primo editing.
+
+Ogni misura avvia un processo Python nuovo (import a freddo), con HOME
+in una cartella temporanea: sessione e cache dei render sono solo quelle
+create dal benchmark. Scenari:
+
+    empty    nessuna sessione salvata: finestra vuota
+    manual   nessuna sessione: progetto e tab aperti a mano (scansione
+             dell'albero e render con debounce, il flusso precedente)
+    restore  sessione salvata da un avvio precedente: albero dall'istantanea,
+             tab riaperti e preview dalla cache
+
+Per ogni scenario la mediana (ms dal lancio) di: import completati,
+finestra mostrata, albero visibile, editor pronto, preview mostrata.
+
+    python benchmarks/startup_time.py [--size medium] [--tabs 5] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks import corpus, fake_plantuml
+
+MARKS = ("imports", "window_shown", "tree_ready", "editor_ready", "preview_ready")
+
+
+# =========================
+# PROCESSO FIGLIO (l'editor)
+# =========================
+def child(mode: str, project: str, tabs: list):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    marks = {}
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QThreadPool
+    app = QApplication(sys.argv[:1])
+    from app.main_window import MainWindow
+    marks["imports"] = time.time()
+
+    window = MainWindow()
+    restored = []
+    window.session_restored.connect(lambda: restored.append(True))
+    window.show()
+    app.processEvents()
+    marks["window_shown"] = time.time()
+
+    def wait_until(predicate, timeout=60.0):
+        deadline = time.time() + timeout
+        while not predicate():
+            if time.time() > deadline:
+                raise TimeoutError("condizione non raggiunta entro il timeout")
+            app.processEvents()
+            time.sleep(0.0005)
+
+    wait_until(lambda: restored)
+    if mode in ("manual", "prime"):
+        window.load_project(project)
+        for path in tabs:
+            window.open_path(path)
+        window.tab_widget.setCurrentIndex(0)
+
+    if mode != "empty":
+        wait_until(lambda: window.file_tree.topLevelItemCount() > 0)
+        marks["tree_ready"] = time.time()
+        editor = window.tab_widget.currentWidget()
+        wait_until(lambda: editor is not None and not editor.loading)
+        marks["editor_ready"] = time.time()
+        wait_until(lambda: editor.render_result is not None
+                   and editor.render_result[1] and all(page is not None for page in editor.render_result[1]))
+        marks["preview_ready"] = time.time()
+
+    if mode == "prime":
+        # Cartelle espanse fino al secondo livello, come dopo un po' di navigazione
+        tree = window.file_tree
+        for _ in range(2):
+            for i in range(tree.topLevelItemCount()):
+                item = tree.topLevelItem(i)
+                item.setExpanded(True)
+                for j in range(item.childCount()):
+                    if item.child(j).data(0, tree.DIR_ROLE):
+                        item.child(j).setExpanded(True)
+            wait_until(lambda: not tree._pending)
+
+    # Scansioni di verifica e indici in background finiscono prima dell'uscita
+    wait_until(lambda: not window.file_tree._pending)
+    QThreadPool.globalInstance().waitForDone()
+    window.index_pool.waitForDone()
+    window.close()
+    print(json.dumps(marks))
+
+
+# =========================
+# PROCESSO PRINCIPALE
+# =========================
+def launch(mode: str, project: str, tabs: list, home: str, workdir: str, env: dict) -> dict:
+    """Avvia l'editor in un processo nuovo; ms dal lancio per ogni tappa raggiunta"""
+    started = time.time()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--project", project, *tabs],
+        cwd=workdir, env={**env, "HOME": home, "USERPROFILE": home}, capture_output=True, text=True,
+        timeout=300,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"avvio '{mode}' fallito:\n{proc.stderr}")
+    marks = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {name: (stamp - started) * 1000 for name, stamp in marks.items()}
+
+
+def run(project: str, tabs: int = 5, repeat: int = 5, delay: float = 0.05, startup: float = 0.5) -> dict:
+    """`project` è una cartella di corpus (il .tsp viene creato se manca)"""
+    if not any(name.endswith(".tsp") for name in os.listdir(project)):
+        with open(os.path.join(project, "bench.tsp"), "w", encoding="utf-8") as f:
+            json.dump({"name": "bench", "version": 1}, f)
+    files = sorted(os.path.join(project, name) for name in os.listdir(project) if name.endswith(".puml"))[:tabs]
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Il jar viene cercato in tools/plantuml.jar rispetto alla cartella di lavoro
+        fake_plantuml.install(os.path.join(folder, "tools"))
+        env = dict(os.environ)
+        env["PATH"] = os.path.join(folder, "tools", "bin") + os.pathsep + env.get("PATH", "")
+        env.update(FAKE_PLANTUML_STARTUP=str(startup), FAKE_PLANTUML_DELAY=str(delay), FAKE_PLANTUML_LINE_DELAY="0")
+        env["PYTHONPATH"] = REPO_DIR + os.pathsep + env.get("PYTHONPATH", "")
+
+        results = {}
+        for mode in ("empty", "manual", "restore"):
+            runs = []
+            for _ in range(repeat):
+                home = tempfile.mkdtemp(dir=folder)
+                if mode == "restore":
+                    # Un avvio precedente lascia sessione e cache dei render
+                    launch("prime", project, files, home, folder, env)
+                runs.append(launch(mode, project, files, home, folder, env))
+            results[mode] = {f"{name}_ms": round(statistics.median(run[name] for run in runs), 1)
+                             for name in MARKS if name in runs[0]}
+    return {"tabs": len(files), **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=corpus.SIZES, default="medium")
+    parser.add_argument("--tabs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=0.05, help="secondi per diagramma del finto PlantUML")
+    parser.add_argument("--startup", type=float, default=0.5, help="secondi di avvio del finto PlantUML")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--project", help=argparse.SUPPRESS)
+    parser.add_argument("tab_files", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.project, args.tab_files)
+        return
+
+    with tempfile.TemporaryDirectory() as project:
+        corpus.generate(project, args.size)
+        result = run(project, args.tabs, args.repeat, args.delay, args.startup)
+    for name, value in result.items():
+        print(f"{name:>8}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from app.main_window import MainWindow
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        # Modalità headless: nessun import di Qt
+        from app.batch_export import main as export_main
+        sys.exit(export_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from app.render_server import main as serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+
+    from PyQt6.QtWidgets import QApplication
+    from app.main_window import MainWindow
+
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()